@@ -1,9 +1,31 @@
 from django.contrib import admin
-from .models import Archivo, Categoria, Tipo, Analizador
+from .models import Archivo, Categoria, Tipo, Analizador, Trabajo, Limite, PerfilArmonico, LimiteArmonico
 
 
 class ArchivoAdmin(admin.ModelAdmin):
-    readonly_fields = ('subido_el',)
+    readonly_fields = ('subido_el', 'tiempos')
+
+
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('nombre_archivo', 'categoria', 'estado',
+                    'creado_el', 'iniciado_el', 'finalizado_el')
+    list_filter = ('estado', 'categoria')
+    readonly_fields = ('creado_el', 'iniciado_el', 'finalizado_el', 'error')
+
+
+class LimiteAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'voltaje_nominal', 'voltaje_inferior',
+                    'voltaje_superior', 'flicker', 'vthd', 'desbalance')
+
+
+class LimiteArmonicoInline(admin.TabularInline):
+    model = LimiteArmonico
+    extra = 1
+
+
+class PerfilArmonicoAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'limite_general')
+    inlines = [LimiteArmonicoInline]
 
 
 # Register your models here.
@@ -11,4 +33,7 @@ admin.site.register(Archivo, ArchivoAdmin)
 admin.site.register(Categoria)
 admin.site.register(Tipo)
 admin.site.register(Analizador)
+admin.site.register(Trabajo, TrabajoAdmin)
+admin.site.register(Limite, LimiteAdmin)
+admin.site.register(PerfilArmonico, PerfilArmonicoAdmin)
 # admin.site.register(ArchivoAdmin)
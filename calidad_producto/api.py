@@ -0,0 +1,442 @@
+import hashlib
+import hmac
+import tempfile
+from datetime import datetime, time
+from functools import wraps
+from django.conf import settings
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.core.files import File
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from .models import Analizador, Archivo, Carga, Categoria, Tipo, Trabajo
+from .resources import cargas, perfilado, series, tiempos
+from .resources.exportacion import escribir_xlsx, filas_resultados, generar_csv
+from .resources.paginacion import TAMANO_PAGINA, paginar
+from .views import ANALIZADOR_AUTOMATICO, obtener_analizador, obtener_perfil_armonico, resolver_analizador
+
+
+# Cantidad máxima de archivos por página que se puede solicitar
+TAMANO_MAXIMO = 500
+
+# Filtros del listado: (parámetro de la consulta, campo del modelo)
+FILTROS = [
+    ('categoria', 'categoria_id'),
+    ('tipo', 'tipo_id'),
+    ('analizador', 'analizador_id'),
+]
+
+# Campos del archivo que se devuelven en el listado y en el detalle
+CAMPOS = ('id', 'archivo', 'subido_el', 'actualizado_el', 'categoria_id', 'tipo_id', 'analizador_id',
+          'voltaje_nominal', 'valor_porcentaje', 'version_depuracion')
+
+
+def error(mensaje, estado=400):
+    """
+    Devuelve un mensaje de error en formato JSON.
+    """
+    return JsonResponse({'error': mensaje}, status=estado)
+
+
+def respuesta_condicional(request, etag, ultima_modificacion, obtener_datos):
+    """
+    Devuelve 304 si el cliente ya tiene la versión actual del recurso, caso contrario
+    obtiene los datos y los devuelve en formato JSON con los encabezados ETag y Last-Modified.
+
+    Parámetros:
+        request (HttpRequest): La solicitud.
+        etag (str): La etiqueta de la versión del recurso, sin comillas.
+        ultima_modificacion (datetime o None): La fecha de la última modificación del recurso.
+        obtener_datos (function): Función que obtiene los datos, solamente se llama si no se devuelve 304.
+            Si devuelve una HttpResponse, por ejemplo un error, se devuelve sin cambios.
+
+    Retorna:
+        HttpResponse: La respuesta 304 o la respuesta JSON.
+    """
+    etag = quote_etag(etag)
+    ultima_modificacion = int(
+        ultima_modificacion.timestamp()) if ultima_modificacion else None
+
+    respuesta = get_conditional_response(
+        request, etag=etag, last_modified=ultima_modificacion)
+    if respuesta is None:
+        datos = obtener_datos()
+        if isinstance(datos, HttpResponse):
+            return datos
+        respuesta = JsonResponse(datos)
+
+    respuesta.headers['ETag'] = etag
+    if ultima_modificacion is not None:
+        respuesta.headers['Last-Modified'] = http_date(ultima_modificacion)
+    return respuesta
+
+
+def marca_tiempo(fecha):
+    """
+    Convierte una fecha en microsegundos para las etiquetas de versión.
+    """
+    return int(fecha.timestamp() * 10 ** 6) if fecha else 0
+
+
+def obtener_fecha(valor, fin=False):
+    """
+    Convierte una fecha 'YYYY-MM-DD' del filtro en una fecha con zona horaria local.
+    Con fin=True se devuelve el final del día.
+    """
+    fecha = datetime.strptime(valor, '%Y-%m-%d').date()
+    return timezone.make_aware(datetime.combine(fecha, time.max if fin else time.min))
+
+
+def filtrar_archivos(parametros):
+    """
+    Aplica los filtros de la consulta al listado de archivos.
+
+    Parámetros:
+        parametros (QueryDict): Los parámetros de la consulta.
+
+    Retorna:
+        QuerySet: Los archivos filtrados.
+    """
+    archivos = Archivo.objects.all()
+
+    for parametro, campo in FILTROS:
+        valor = parametros.get(parametro)
+        if valor:
+            archivos = archivos.filter(**{campo: int(valor)})
+
+    if parametros.get('desde'):
+        archivos = archivos.filter(
+            subido_el__gte=obtener_fecha(parametros['desde']))
+    if parametros.get('hasta'):
+        archivos = archivos.filter(
+            subido_el__lte=obtener_fecha(parametros['hasta'], fin=True))
+
+    return archivos
+
+
+@require_GET
+def lista_archivos(request):
+    """
+    Lista los archivos en formato JSON, paginados con los cursores 'despues' y 'antes'.
+    Filtros: categoria, tipo, analizador (ids), desde y hasta (fechas YYYY-MM-DD) y tamano.
+    """
+    try:
+        archivos = filtrar_archivos(request.GET)
+        tamano = min(int(request.GET.get('tamano', TAMANO_PAGINA)), TAMANO_MAXIMO)
+        if tamano < 1:
+            raise ValueError
+    except ValueError:
+        return error('Los parámetros de la consulta no son válidos.')
+
+    despues = request.GET.get('despues')
+    antes = request.GET.get('antes')
+
+    # La versión del listado depende de los filtros, la cantidad de archivos y la última modificación
+    resumen = archivos.aggregate(
+        cantidad=Count('id'), ultima_modificacion=Max('actualizado_el'))
+
+    # El estado del último trabajo cambia sin modificar el archivo, por eso también se incluyen las
+    # fechas de los trabajos y la cantidad de trabajos en cada estado
+    resumen_trabajos = Trabajo.objects.filter(archivo__in=archivos).aggregate(
+        creado=Max('creado_el'), iniciado=Max('iniciado_el'), finalizado=Max('finalizado_el'),
+        **{estado: Count('id', filter=Q(estado=estado)) for estado, _ in Trabajo.ESTADOS})
+
+    fechas = [resumen['ultima_modificacion'], resumen_trabajos['creado'],
+              resumen_trabajos['iniciado'], resumen_trabajos['finalizado']]
+    estados = [resumen_trabajos[estado] for estado, _ in Trabajo.ESTADOS]
+    etag = hashlib.md5(repr((
+        sorted(request.GET.items()), resumen['cantidad'], [marca_tiempo(fecha) for fecha in fechas], estados
+    )).encode()).hexdigest()
+    ultima_modificacion = max((fecha for fecha in fechas if fecha), default=None)
+
+    def obtener_datos():
+        # Estado del último trabajo de depuración de cada archivo
+        estado_trabajo = Trabajo.objects.filter(
+            archivo=OuterRef('pk')).order_by('-creado_el').values('estado')[:1]
+
+        registros = archivos.values(
+            *CAMPOS,
+            nombre_tipo=F('tipo__nombre'),
+            nombre_analizador=F('analizador__nombre'),
+            # Los archivos cargados de forma única no tienen trabajo y ya están depurados
+            estado=Coalesce(Subquery(estado_trabajo), Value(Trabajo.COMPLETADO)),
+        )
+        resultados, siguiente, anterior = paginar(
+            registros, despues, antes, tamano)
+
+        return {'resultados': resultados, 'siguiente': siguiente, 'anterior': anterior}
+
+    return respuesta_condicional(request, etag, ultima_modificacion, obtener_datos)
+
+
+@require_GET
+def detalle_archivo(request, archivo_id):
+    """
+    Devuelve un archivo y su información depurada en formato JSON.
+    """
+    # Se consulta solamente la versión del archivo, la información se obtiene si no se devuelve 304
+    version = Archivo.objects.filter(id=archivo_id).values(
+        'actualizado_el', 'version_depuracion').first()
+    if version is None:
+        return error('El archivo no existe.', estado=404)
+
+    etag = f"{archivo_id}-{version['version_depuracion']}-{marca_tiempo(version['actualizado_el'])}"
+
+    def obtener_datos():
+        return Archivo.objects.filter(id=archivo_id).values(
+            *CAMPOS,
+            'informacion',
+            nombre_tipo=F('tipo__nombre'),
+            nombre_analizador=F('analizador__nombre'),
+        ).get()
+
+    return respuesta_condicional(request, etag, version['actualizado_el'], obtener_datos)
+
+
+def obtener_momento(valor):
+    """
+    Convierte una fecha y hora ISO 'YYYY-MM-DDTHH:MM' del rango de las series, sin zona horaria
+    como las fechas de los archivos. None si no se indicó.
+    """
+    return datetime.fromisoformat(valor) if valor else None
+
+
+@require_GET
+def series_archivo(request, archivo_id):
+    """
+    Devuelve las series de un archivo reducidas para un gráfico, en lugar de todas sus mediciones.
+    Parámetros: series (nombres separados por comas, por defecto todas), desde y hasta (fecha y hora
+    ISO), ancho (píxeles del gráfico) y metodo (lttb o minmax).
+    """
+    archivo = Archivo.objects.filter(id=archivo_id).only(
+        'archivo', 'categoria_id', 'analizador_id', 'actualizado_el', 'version_depuracion').first()
+    if archivo is None:
+        return error('El archivo no existe.', estado=404)
+
+    try:
+        nombres = request.GET.get('series')
+        parametros = {
+            'nombres': nombres.split(',') if nombres else None,
+            'desde': obtener_momento(request.GET.get('desde')),
+            'hasta': obtener_momento(request.GET.get('hasta')),
+            'ancho': int(request.GET.get('ancho', series.ANCHO)),
+            'metodo': request.GET.get('metodo', series.LTTB),
+        }
+        series.validar_parametros(parametros['ancho'], parametros['metodo'])
+    except ValueError as e:
+        return error(str(e))
+
+    def obtener_datos():
+        # Las series se leen y se reducen solamente si el cliente no tiene la versión actual
+        try:
+            vista = series.obtener_vista(archivo, **parametros)
+        except ValueError as e:
+            return error(str(e))
+        if vista is None:
+            return error('El archivo no tiene series con fecha y hora.', estado=404)
+        return vista
+
+    # Las series solamente cambian al volver a depurar el archivo
+    etag = f"{archivo_id}-{archivo.version_depuracion}-{marca_tiempo(archivo.actualizado_el)}"
+    return respuesta_condicional(request, etag, archivo.actualizado_el, obtener_datos)
+
+
+@require_GET
+def exportar_resultados(request):
+    """
+    Exporta los resultados por métrica de los archivos filtrados, con los mismos filtros del listado.
+    Con formato=csv (por defecto) el contenido se envía mientras se lee de la base de datos. Con
+    formato=xlsx el libro se escribe primero en un archivo temporal y luego se envía.
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in ('csv', 'xlsx'):
+        return error('El formato debe ser csv o xlsx.')
+
+    try:
+        archivos = filtrar_archivos(request.GET)
+    except ValueError:
+        return error('Los parámetros de la consulta no son válidos.')
+
+    nombre = f'resultados_{timezone.localdate():%Y%m%d}.{formato}'
+    filas = filas_resultados(archivos)
+
+    if formato == 'csv':
+        respuesta = StreamingHttpResponse(
+            generar_csv(filas), content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return respuesta
+
+    # El archivo temporal se elimina al cerrarse, cuando termina la respuesta
+    temporal = tempfile.TemporaryFile()
+    escribir_xlsx(filas, temporal)
+    temporal.seek(0)
+    return FileResponse(
+        temporal, as_attachment=True, filename=nombre,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+
+@require_GET
+def perfilar_archivo(request, archivo_id):
+    """
+    Vuelve a depurar un archivo con cProfile y tracemalloc y devuelve las funciones más costosas
+    y los sitios de mayor asignación de memoria, sin guardar ningún resultado. Solamente para el
+    personal. Parámetros: orden (propio, acumulado o llamadas) y lineas.
+    """
+    if not request.user.is_staff:
+        return error('Solamente el personal puede perfilar archivos.', estado=403)
+
+    archivo = Archivo.objects.filter(id=archivo_id).first()
+    if archivo is None:
+        return error('El archivo no existe.', estado=404)
+
+    try:
+        lineas = int(request.GET.get('lineas', perfilado.LINEAS))
+        reporte = perfilado.perfilar_archivo(
+            archivo, request.GET.get('orden', 'propio'), lineas)
+    except ValueError as e:
+        return error(str(e))
+
+    return JsonResponse(reporte)
+
+
+@require_GET
+def metricas(request):
+    """
+    Devuelve los histogramas de los tiempos de la depuración por formato y etapa, en el
+    formato de texto de Prometheus.
+    """
+    return HttpResponse(tiempos.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- CARGAS POR PARTES ---
+
+def estado_carga(carga, estado=200):
+    """
+    Devuelve los bytes recibidos de una carga, desde donde el cliente debe continuar.
+    """
+    return JsonResponse({'id': str(carga.id), 'recibido': carga.recibido, 'tamano': carga.tamano}, status=estado)
+
+
+def token_valido(request):
+    """
+    Verifica que la solicitud tenga uno de los tokens de TOKENS_CARGAS en el encabezado
+    'Authorization: Bearer <token>'. Sin tokens configurados ninguna solicitud es válida.
+    """
+    esquema, _, token = request.headers.get('Authorization', '').partition(' ')
+    if esquema.lower() != 'bearer' or not token:
+        return False
+    return any(hmac.compare_digest(token.encode(), valido.encode())
+               for valido in getattr(settings, 'TOKENS_CARGAS', ()))
+
+
+def requiere_token(vista):
+    """
+    Permite la vista solamente a los clientes con un token de cargas. Los clientes son scripts sin
+    sesión ni cookie de CSRF, por eso la vista se exime de CSRF: sin el token en el encabezado, que
+    un navegador no envía por su cuenta, la solicitud se rechaza.
+    """
+    @csrf_exempt
+    @wraps(vista)
+    def vista_con_token(request, *args, **kwargs):
+        if not token_valido(request):
+            return error('Se requiere un token de cargas válido.', estado=401)
+        return vista(request, *args, **kwargs)
+
+    return vista_con_token
+
+
+def obtener_numero(valor, tipo=float):
+    """
+    Convierte un valor opcional del formulario, None si no se indicó.
+    """
+    return tipo(valor) if valor not in (None, '') else None
+
+
+@requiere_token
+@require_POST
+def iniciar_carga(request):
+    """
+    Inicia una carga por partes. Campos: nombre, tamano (bytes), categoria, tipo, analizador
+    (id o 'auto'), y opcionalmente voltaje_nominal, valor_porcentaje y perfil_armonico (id).
+    """
+    try:
+        categoria = Categoria.objects.get(id=request.POST.get('categoria'))
+        tipo = Tipo.objects.get(id=request.POST.get('tipo'))
+        perfil_armonico = obtener_perfil_armonico(request.POST.get('perfil_armonico'))
+        analizador = request.POST.get('analizador', '')
+        if analizador != ANALIZADOR_AUTOMATICO:
+            analizador = str(obtener_analizador(analizador).id)
+
+        carga = cargas.iniciar_carga(
+            request.POST.get('nombre', ''),
+            int(request.POST.get('tamano', 0)),
+            categoria, tipo, analizador,
+            voltaje_nominal=obtener_numero(request.POST.get('voltaje_nominal')),
+            valor_porcentaje=obtener_numero(request.POST.get('valor_porcentaje')),
+            perfil_armonico=perfil_armonico,
+        )
+    except (Categoria.DoesNotExist, Tipo.DoesNotExist, Analizador.DoesNotExist, ValueError) as e:
+        return error(str(e))
+
+    return estado_carga(carga, estado=201)
+
+
+@requiere_token
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def parte_carga(request, carga_id):
+    """
+    GET devuelve los bytes recibidos para retomar la carga, PUT agrega el cuerpo de la solicitud
+    a partir del parámetro 'desplazamiento' y DELETE cancela la carga.
+    """
+    carga = get_object_or_404(Carga, id=carga_id)
+
+    if request.method == 'GET':
+        return estado_carga(carga)
+
+    if request.method == 'DELETE':
+        cargas.eliminar_carga(carga)
+        return HttpResponse(status=204)
+
+    try:
+        desplazamiento = int(request.GET.get('desplazamiento', ''))
+        longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return error('El desplazamiento y la longitud de la parte deben ser números.')
+
+    try:
+        # El cuerpo se lee por bloques directamente de la solicitud, sin cargarlo en memoria
+        carga = cargas.escribir_parte(carga.id, desplazamiento, request, longitud)
+    except ValueError as e:
+        # El cliente debe continuar desde los bytes recibidos
+        carga.refresh_from_db()
+        return JsonResponse({'error': str(e), 'recibido': carga.recibido}, status=409)
+
+    return estado_carga(carga)
+
+
+@requiere_token
+@require_POST
+def finalizar_carga(request, carga_id):
+    """
+    Verifica el SHA-256 de la carga completa (campo sha256), guarda el archivo y encola su depuración.
+    """
+    carga = get_object_or_404(Carga.objects.select_related('categoria', 'tipo'), id=carga_id)
+
+    try:
+        hash_sha256 = cargas.verificar_carga(carga, request.POST.get('sha256', ''))
+
+        # Con la detección automática, el analizador se detecta a partir del archivo temporal
+        with File(open(cargas.ruta_carga(carga), 'rb'), name=carga.nombre_archivo) as archivo:
+            analizador = resolver_analizador(
+                archivo, carga.analizador, carga.categoria_id)
+
+        nuevo_archivo, trabajo = cargas.finalizar_carga(carga, analizador, hash_sha256)
+    except (ValueError, Analizador.DoesNotExist) as e:
+        return error(str(e))
+
+    return JsonResponse({'archivo': nuevo_archivo.id, 'trabajo': trabajo.id}, status=201)
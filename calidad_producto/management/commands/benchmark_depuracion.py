@@ -0,0 +1,229 @@
+import io
+import os
+import json
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from calidad_producto import views
+from calidad_producto.models import Tipo
+from calidad_producto.resources import depuracion_armonico as arm
+from calidad_producto.resources import depuracion_tendencia as ten
+from calidad_producto.resources import formatos, lectura, matriz, perfiles, sinteticos
+from calidad_producto.resources.procesamiento import DEPURACIONES
+
+
+# Categorías por su nombre en las opciones
+CATEGORIAS = {
+    'tendencia': formatos.TENDENCIA,
+    'armonico': formatos.ARMONICO,
+}
+
+# Vista a la que redirige la depuración de cada categoría
+REDIRECCIONES = {
+    formatos.TENDENCIA: 'vista_tendencias',
+    formatos.ARMONICO: 'vista_armonicos',
+}
+
+# Porcentaje de la depuración de armónicos, igual que en las vistas
+VALOR_PORCENTAJE = 5
+
+
+def medir(funcion, repeticiones):
+    """
+    Ejecuta una función varias veces y obtiene el menor tiempo y la memoria máxima asignada
+    en una ejecución adicional con tracemalloc, que no se incluye en el tiempo.
+
+    Retorna:
+        dict: Los segundos y los bytes de memoria máxima.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcion()
+        _, memoria = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'segundos': min(tiempos), 'memoria': memoria}
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo y la memoria de cada etapa de la depuración con archivos sintéticos de cada analizador.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=5000,
+                            help='Cantidad de filas de mediciones de cada archivo.')
+        parser.add_argument('--fases', type=int, default=3,
+                            help='Cantidad de fases de los archivos.')
+        parser.add_argument('--ordenes', type=int, default=25,
+                            help='Orden máximo de los armónicos.')
+        parser.add_argument('--columnas-extra', type=int, default=0,
+                            help='Columnas adicionales que no se utilizan en la depuración.')
+        parser.add_argument('--analizadores', nargs='+', default=['SONEL', 'AEMC', 'METREL'],
+                            help='Analizadores a medir.')
+        parser.add_argument('--categorias', nargs='+', choices=list(CATEGORIAS), default=list(CATEGORIAS),
+                            help='Categorías a medir.')
+        parser.add_argument('--extensiones', nargs='+', choices=['.xlsx', '.xls'], default=['.xlsx'],
+                            help='Extensiones de los archivos. Los .xls requieren xlwt.')
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Cantidad de veces que se ejecuta cada etapa, se informa el menor tiempo.')
+        parser.add_argument('--vista', action='store_true',
+                            help='Medir también la carga completa desde la vista, sin conservar los cambios en la base de datos.')
+        parser.add_argument('--guardar',
+                            help='Guardar los resultados como línea base en este archivo JSON.')
+        parser.add_argument('--comparar',
+                            help='Comparar los resultados con la línea base de este archivo JSON.')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento de tiempo permitido respecto a la línea base (0.2 = 20 %%).')
+
+    def handle(self, *args, **options):
+        base = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+
+        resultados = {}
+        with tempfile.TemporaryDirectory() as carpeta:
+            for analizador in options['analizadores']:
+                for nombre_categoria in options['categorias']:
+                    for extension in options['extensiones']:
+                        categoria = CATEGORIAS[nombre_categoria]
+                        ruta = os.path.join(carpeta, sinteticos.nombre_libro(analizador, categoria, extension))
+                        clave = os.path.basename(ruta)
+
+                        try:
+                            resultados[clave] = self.medir_archivo(
+                                ruta, analizador, categoria, carpeta, options)
+                        except ValueError as e:
+                            raise CommandError(str(e))
+
+                        self.mostrar(clave, resultados[clave], base)
+
+        if options['guardar']:
+            with open(options['guardar'], 'w', encoding='utf-8') as archivo:
+                json.dump({'filas': options['filas'], 'resultados': resultados}, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {options['guardar']}"))
+
+        if base is not None:
+            regresiones = self.comparar(resultados, base, options['tolerancia'])
+            if regresiones:
+                raise CommandError(f'Etapas más lentas que la línea base: {", ".join(regresiones)}')
+            self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base.'))
+
+    def medir_archivo(self, ruta, analizador, categoria, carpeta, options):
+        """
+        Genera el archivo de un analizador y mide cada etapa de su depuración.
+        """
+        formato = formatos.obtener_formato(analizador, categoria)
+        if formato is None:
+            raise ValueError(f'El analizador {analizador} no tiene formato para esta categoría.')
+
+        # Con la vista se utilizan los nombres de columnas del analizador guardado en la base de datos
+        perfil = perfiles.obtener_perfil(nombre=analizador) if options['vista'] else None
+        nombres = perfil.valores_columna() if perfil else sinteticos.COLUMNAS_TENDENCIA[analizador]
+
+        sinteticos.generar_libro(
+            ruta, analizador, categoria, filas=options['filas'], fases=options['fases'],
+            ordenes=options['ordenes'], columnas_extra=options['columnas_extra'], nombres=nombres)
+
+        repeticiones = options['repeticiones']
+        etapas = {}
+
+        def leer():
+            for _ in lectura.iterar_filas(ruta):
+                pass
+
+        etapas['lectura'] = medir(leer, repeticiones)
+
+        # Encabezado original, sin normalizar
+        filas = lectura.iterar_filas(ruta)
+        for _ in range(formato.fila_encabezado):
+            next(filas)
+        encabezado = list(next(filas))[formato.columnas]
+        filas.close()
+
+        etapas['encabezado'] = medir(lambda: formato.normalizar_nombres(encabezado), repeticiones)
+
+        def convertir():
+            matriz.eliminar_matriz(ruta)
+            matriz.guardar_matriz(ruta, formato)
+
+        etapas['conversion'] = medir(convertir, repeticiones)
+
+        # Los mensajes impresos por la depuración no se incluyen en la salida
+        with redirect_stdout(io.StringIO()):
+            if categoria == formatos.TENDENCIA:
+                df = matriz.leer_matriz(ruta, formato, requeridas=nombres.values()).fillna(0)
+                etapas['informacion'] = medir(
+                    lambda: ten.obtener_informacion(df, nombres), repeticiones)
+            else:
+                df = matriz.leer_matriz(ruta, formato).fillna(0)
+                etapas['informacion'] = medir(
+                    lambda: arm.obtener_informacion(df, VALOR_PORCENTAJE), repeticiones)
+
+            if options['vista']:
+                if perfil is None:
+                    raise ValueError(f'El analizador {analizador} no existe en la base de datos.')
+                etapas['vista'] = medir(
+                    lambda: self.cargar_desde_vista(ruta, perfil, categoria, carpeta), repeticiones)
+
+        return etapas
+
+    def cargar_desde_vista(self, ruta, perfil, categoria, carpeta):
+        """
+        Carga un archivo con la misma función que utilizan las vistas de carga única. Los archivos
+        se guardan en una carpeta temporal y los cambios en la base de datos se revierten.
+        """
+        tipo = Tipo.objects.order_by('id').first()
+        if tipo is None:
+            raise ValueError('No existen tipos en la base de datos.')
+
+        with open(ruta, 'rb') as archivo:
+            request = RequestFactory().post('/', {'tipo': tipo.id, 'archivo_unico': archivo})
+        request._messages = CookieStorage(request)
+
+        with override_settings(MEDIA_ROOT=os.path.join(carpeta, 'media')), transaction.atomic():
+            respuesta = views.procesar_archivo_unico(
+                request, categoria, tipo.id, perfil.id,
+                VALOR_PORCENTAJE if categoria == formatos.ARMONICO else None,
+                DEPURACIONES[categoria], REDIRECCIONES[categoria])
+            transaction.set_rollback(True)
+
+        if respuesta.status_code != 302:
+            mensajes = [str(mensaje) for mensaje in request._messages]
+            raise ValueError(f'La vista no procesó el archivo: {mensajes}')
+
+    def mostrar(self, clave, etapas, base):
+        """
+        Muestra el tiempo y la memoria de cada etapa, y la variación respecto a la línea base.
+        """
+        self.stdout.write(clave)
+        anteriores = (base or {}).get('resultados', {}).get(clave, {})
+        for etapa, medida in etapas.items():
+            linea = f"  {etapa:<12} {medida['segundos'] * 1000:10.2f} ms {medida['memoria'] / 2 ** 20:10.2f} MiB"
+            if etapa in anteriores:
+                variacion = medida['segundos'] / anteriores[etapa]['segundos'] - 1
+                linea += f' {variacion:+8.1%}'
+            self.stdout.write(linea)
+
+    def comparar(self, resultados, base, tolerancia):
+        """
+        Obtiene las etapas cuyo tiempo supera el de la línea base más la tolerancia.
+        """
+        regresiones = []
+        for clave, etapas in resultados.items():
+            for etapa, medida in etapas.items():
+                anterior = base['resultados'].get(clave, {}).get(etapa)
+                if anterior and medida['segundos'] > anterior['segundos'] * (1 + tolerancia):
+                    regresiones.append(f'{clave} {etapa}')
+        return regresiones
@@ -0,0 +1,55 @@
+import timeit
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from calidad_producto.resources import depuracion_tendencia as ten
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de las métricas de tendencia por columna contra el cálculo en una sola pasada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=50000,
+                            help='Cantidad de filas del DataFrame sintético.')
+        parser.add_argument('--repeticiones', type=int, default=10,
+                            help='Cantidad de veces que se ejecuta cada cálculo.')
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        repeticiones = options['repeticiones']
+        generador = np.random.default_rng(0)
+
+        # Columnas trifásicas con valores alrededor de los límites
+        valores_columna = {
+            clave_columna: clave_columna for _, clave_columna, _ in ten.METRICAS}
+        df = pd.DataFrame({
+            'voltaje_a': generador.normal(120, 6, filas),
+            'voltaje_b': generador.normal(120, 6, filas),
+            'voltaje_c': generador.normal(120, 6, filas),
+            'flicker_a': generador.gamma(2, 0.4, filas),
+            'flicker_b': generador.gamma(2, 0.4, filas),
+            'flicker_c': generador.gamma(2, 0.4, filas),
+            'vthd_a': generador.gamma(4, 1.5, filas),
+            'vthd_b': generador.gamma(4, 1.5, filas),
+            'vthd_c': generador.gamma(4, 1.5, filas),
+            'desbalance': generador.gamma(2, 0.6, filas),
+        })
+
+        por_columna = ten.obtener_informacion_por_columna(df, valores_columna)
+        una_pasada = ten.obtener_informacion(df, valores_columna)
+
+        if por_columna != una_pasada:
+            self.stderr.write(self.style.ERROR(
+                f'Los resultados no coinciden:\n{por_columna}\n{una_pasada}'))
+            return
+
+        tiempo_columna = min(timeit.repeat(
+            lambda: ten.obtener_informacion_por_columna(df, valores_columna), number=1, repeat=repeticiones))
+        tiempo_pasada = min(timeit.repeat(
+            lambda: ten.obtener_informacion(df, valores_columna), number=1, repeat=repeticiones))
+
+        self.stdout.write(f'Filas: {filas}')
+        self.stdout.write(f'Por columna: {tiempo_columna * 1000:.2f} ms')
+        self.stdout.write(f'Una pasada: {tiempo_pasada * 1000:.2f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'Aceleración: {tiempo_columna / tiempo_pasada:.1f}x'))
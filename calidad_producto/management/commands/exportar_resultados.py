@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from calidad_producto.api import filtrar_archivos
+from calidad_producto.resources.exportacion import TAMANO_BLOQUE, escribir_xlsx, filas_resultados, generar_csv
+
+
+class Command(BaseCommand):
+    help = 'Exporta los resultados por métrica de los archivos a un archivo CSV o XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida',
+                            help='Ruta del archivo de salida, el formato se obtiene de la extensión (.csv o .xlsx).')
+        parser.add_argument('--categoria', type=int,
+                            help='Exportar solamente los archivos de esta categoría.')
+        parser.add_argument('--tipo', type=int,
+                            help='Exportar solamente los archivos de este tipo.')
+        parser.add_argument('--analizador', type=int,
+                            help='Exportar solamente los archivos de este analizador.')
+        parser.add_argument('--desde',
+                            help='Exportar los archivos subidos desde esta fecha (YYYY-MM-DD).')
+        parser.add_argument('--hasta',
+                            help='Exportar los archivos subidos hasta esta fecha (YYYY-MM-DD).')
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE,
+                            help='Cantidad de filas que se obtienen de la base de datos en cada bloque.')
+
+    def handle(self, *args, **options):
+        salida = options['salida']
+
+        filtros = {parametro: options[parametro] for parametro in (
+            'categoria', 'tipo', 'analizador', 'desde', 'hasta') if options[parametro] is not None}
+        try:
+            archivos = filtrar_archivos(filtros)
+        except ValueError:
+            raise CommandError('Las fechas deben tener el formato YYYY-MM-DD.')
+
+        # Contar las filas a medida que se escriben
+        total = 0
+
+        def contar(filas):
+            nonlocal total
+            for fila in filas:
+                total += 1
+                yield fila
+
+        filas = contar(filas_resultados(archivos, options['bloque']))
+        inicio = time.perf_counter()
+
+        if salida.endswith('.csv'):
+            with open(salida, 'w', encoding='utf-8', newline='') as archivo_csv:
+                for linea in generar_csv(filas):
+                    archivo_csv.write(linea)
+        elif salida.endswith('.xlsx'):
+            escribir_xlsx(filas, salida)
+        else:
+            raise CommandError('La salida debe ser un archivo .csv o .xlsx.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Filas exportadas: {total} en {time.perf_counter() - inicio:.2f} s'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from calidad_producto.resources import formatos, sinteticos
+
+
+class Command(BaseCommand):
+    help = 'Genera archivos sintéticos de tendencia y armónicos de cada analizador para pruebas y mediciones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('carpeta',
+                            help='Carpeta donde se escriben los archivos.')
+        parser.add_argument('--filas', type=int, default=5000,
+                            help='Cantidad de filas de mediciones de cada archivo.')
+        parser.add_argument('--fases', type=int, default=3,
+                            help='Cantidad de fases de los archivos.')
+        parser.add_argument('--ordenes', type=int, default=25,
+                            help='Orden máximo de los armónicos.')
+        parser.add_argument('--columnas-extra', type=int, default=0,
+                            help='Columnas adicionales que no se utilizan en la depuración.')
+        parser.add_argument('--ruido', type=float, default=0.01,
+                            help='Proporción de celdas vacías o con texto.')
+        parser.add_argument('--analizadores', nargs='+', default=['SONEL', 'AEMC', 'METREL'],
+                            help='Analizadores de los archivos.')
+        parser.add_argument('--extensiones', nargs='+', choices=['.xlsx', '.xls'], default=['.xlsx'],
+                            help='Extensiones de los archivos. Los .xls requieren xlwt.')
+        parser.add_argument('--semilla', type=int, default=0,
+                            help='Semilla del generador de números aleatorios.')
+
+    def handle(self, *args, **options):
+        try:
+            rutas = sinteticos.generar_carpeta(
+                options['carpeta'], analizadores=options['analizadores'],
+                categorias=(formatos.TENDENCIA, formatos.ARMONICO), extensiones=options['extensiones'],
+                filas=options['filas'], fases=options['fases'], ordenes=options['ordenes'],
+                columnas_extra=options['columnas_extra'], ruido=options['ruido'], semilla=options['semilla'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for ruta in rutas:
+            self.stdout.write(ruta)
+        self.stdout.write(self.style.SUCCESS(f'Archivos generados: {len(rutas)}'))
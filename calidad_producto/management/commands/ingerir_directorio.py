@@ -0,0 +1,207 @@
+import os
+import time
+import hashlib
+from concurrent.futures import Future, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from calidad_producto.models import PerfilArmonico, Tipo
+from calidad_producto.resources import formatos, ingesta, perfiles
+from calidad_producto.resources import depuracion_armonico as arm
+from calidad_producto.resources import depuracion_tendencia as ten
+from calidad_producto.resources.procesamiento import crear_ejecutor, mensaje_error
+
+
+def ejecutar_aqui(funcion, *argumentos):
+    """
+    Ejecuta una función en el proceso actual y devuelve su resultado como un futuro terminado,
+    para depurar sin el grupo de procesos.
+    """
+    futuro = Future()
+    try:
+        futuro.set_result(funcion(*argumentos))
+    except Exception as e:
+        futuro.set_exception(e)
+    return futuro
+
+
+class Command(BaseCommand):
+    help = 'Ingiere los archivos xlsx y xls de un árbol de carpetas, depurándolos en un grupo de procesos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta',
+                            help='Carpeta con los archivos a ingerir.')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Cantidad de archivos que se depuran al mismo tiempo. 0 para depurar en este proceso.')
+        parser.add_argument('--lote', type=int, default=100,
+                            help='Cantidad de archivos que se guardan en cada transacción.')
+        parser.add_argument('--tipo', type=int,
+                            help='Tipo de los archivos cuya ruta no indica el tipo.')
+        parser.add_argument('--categoria', type=int,
+                            help='Categoría de los archivos cuya ruta no indica la categoría. Sin esta opción se detecta del contenido.')
+        parser.add_argument('--analizador',
+                            help='Nombre del analizador de los archivos cuya ruta no lo indica. Sin esta opción se detecta del contenido.')
+        parser.add_argument('--voltaje-nominal', type=float, default=120,
+                            help='Voltaje nominal de los puntos de medición.')
+        parser.add_argument('--porcentaje', type=float, default=5,
+                            help='Porcentaje de la depuración de armónicos.')
+        parser.add_argument('--perfil-armonico', type=int,
+                            help='Perfil con los límites por orden de los armónicos. Sin esta opción se utiliza el porcentaje como límite.')
+        parser.add_argument('--punto-control',
+                            help='Archivo donde se guarda el avance. Por defecto se crea en la carpeta actual.')
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Ignorar el avance guardado y recorrer la carpeta desde el inicio.')
+
+    def handle(self, *args, **options):
+        ruta = os.path.abspath(options['ruta'])
+        if not os.path.isdir(ruta):
+            raise CommandError(f'La carpeta {ruta} no existe.')
+
+        ruta_control = options['punto_control'] or os.path.abspath(
+            f'.ingerir_{hashlib.md5(ruta.encode()).hexdigest()[:8]}.json')
+
+        # Nombres normalizados de los tipos y analizadores para inferirlos de la ruta
+        tipos = {ingesta.normalizar_texto(tipo.nombre): tipo.id for tipo in Tipo.objects.all()}
+        analizadores = {ingesta.normalizar_texto(perfil.nombre): perfil.nombre
+                        for perfil in perfiles.listar_perfiles()}
+        if options['analizador'] and perfiles.obtener_perfil(nombre=options['analizador']) is None:
+            raise CommandError(f"El analizador {options['analizador']} no existe.")
+
+        rutas = ingesta.buscar_archivos(ruta)
+        totales = {'archivos': 0, 'filas': 0, 'omitidos': 0, 'errores': 0}
+        ultimo = None
+        # Rutas relativas de los archivos que fallaron, se reintentan en la siguiente ejecución
+        fallidos = set()
+
+        control = None if options['reiniciar'] else ingesta.leer_punto_control(ruta_control, ruta)
+        if control is not None:
+            ultimo = control['ultimo']
+            totales.update(control['totales'])
+            # Los archivos fallidos que ya no existen no se reintentan
+            fallidos = set(control['fallidos']).intersection(rutas)
+            rutas = [relativa for relativa in rutas if relativa > ultimo or relativa in fallidos]
+            self.stdout.write(f'Continuando después de {ultimo}, reintentando {len(fallidos)} con error')
+
+        self.stdout.write(f'Archivos por ingerir: {len(rutas)}')
+
+        try:
+            limites_armonico = arm.obtener_limites(options['perfil_armonico'])
+        except PerfilArmonico.DoesNotExist:
+            raise CommandError(f"El perfil de armónicos {options['perfil_armonico']} no existe.")
+
+        # Los límites se consultan una sola vez por tipo
+        limites = {}
+
+        ejecutor = crear_ejecutor(options['procesos']) if options['procesos'] > 0 else None
+        # La velocidad se calcula con los archivos y filas de esta ejecución
+        iniciales = dict(totales)
+        inicio = time.perf_counter()
+
+        try:
+            for posicion in range(0, len(rutas), options['lote']):
+                bloque = rutas[posicion:posicion + options['lote']]
+                # Los archivos reintentados dejan de contar como fallidos hasta que vuelvan a fallar
+                fallidos.difference_update(bloque)
+                datos = self.ingerir_bloque(
+                    ruta, bloque, ejecutor, tipos, analizadores, limites, limites_armonico, totales, fallidos, options)
+
+                ingesta.guardar_lote(datos, options['voltaje_nominal'],
+                                     perfil_armonico_id=options['perfil_armonico'])
+
+                totales['archivos'] += len(datos)
+                totales['filas'] += sum(dato['filas'] for dato in datos)
+                totales['errores'] = len(fallidos)
+
+                # Guardar el avance después de confirmar la transacción del bloque. Un bloque de
+                # archivos reintentados no hace retroceder la última ruta ingerida
+                ultimo = max(ultimo or bloque[-1], bloque[-1])
+                ingesta.guardar_punto_control(ruta_control, ruta, ultimo, totales, fallidos)
+                self.mostrar_avance(totales, iniciales, time.perf_counter() - inicio)
+        finally:
+            if ejecutor is not None:
+                ejecutor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingesta completa: {totales['archivos']} archivos, {totales['filas']} filas, "
+            f"{totales['omitidos']} omitidos, {totales['errores']} con error"))
+
+    def ingerir_bloque(self, ruta, bloque, ejecutor, tipos, analizadores, limites, limites_armonico, totales, fallidos,
+                       options):
+        """
+        Depura un bloque de archivos en el grupo de procesos y devuelve los datos de los que terminaron bien.
+        Los archivos con el mismo contenido y la misma categoría que otro del bloque se omiten antes de copiarlos.
+        Las rutas de los archivos con error se agregan a fallidos.
+        """
+        futuros = {}
+        datos = []
+        # Contenido y categoría de los archivos enviados y de los ya depurados del bloque
+        enviados = set()
+        ingeridos = set()
+
+        for relativa in bloque:
+            categoria_id, tipo_id, analizador = ingesta.inferir_desde_ruta(
+                relativa, tipos, analizadores)
+            tipo_id = tipo_id or options['tipo']
+            if tipo_id is None:
+                fallidos.add(relativa)
+                self.stderr.write(f'{relativa}: la ruta no indica el tipo, use --tipo.')
+                continue
+
+            if tipo_id not in limites:
+                limites[tipo_id] = {
+                    formatos.ARMONICO: limites_armonico,
+                    formatos.TENDENCIA: ten.obtener_limites(tipo_id, options['voltaje_nominal']),
+                }
+
+            ruta_archivo = os.path.join(ruta, relativa)
+            categoria_id = categoria_id or options['categoria']
+            try:
+                hash_sha256 = ingesta.calcular_hash_ruta(ruta_archivo)
+            except OSError as e:
+                fallidos.add(relativa)
+                self.stderr.write(f'{relativa}: {mensaje_error(e)}')
+                continue
+
+            if (hash_sha256, categoria_id) in enviados:
+                totales['omitidos'] += 1
+                continue
+            enviados.add((hash_sha256, categoria_id))
+
+            argumentos = (ruta_archivo, hash_sha256, categoria_id, analizador or options['analizador'],
+                          limites[tipo_id], options['porcentaje'])
+
+            enviar = ejecutor.submit if ejecutor is not None else ejecutar_aqui
+            futuros[enviar(ingesta.ingerir_archivo, *argumentos)] = (relativa, tipo_id)
+
+        for futuro in as_completed(futuros):
+            relativa, tipo_id = futuros[futuro]
+            try:
+                dato = futuro.result()
+            except Exception as e:
+                fallidos.add(relativa)
+                self.stderr.write(f'{relativa}: {mensaje_error(e)}')
+                continue
+
+            if dato is None:
+                totales['omitidos'] += 1
+            elif (dato['hash_sha256'], dato['categoria_id']) in ingeridos:
+                # La categoría se detectó del contenido y coincide con la de otro archivo del bloque
+                ingesta.descartar_archivo(dato['archivo'])
+                totales['omitidos'] += 1
+            else:
+                ingeridos.add((dato['hash_sha256'], dato['categoria_id']))
+                dato['tipo_id'] = tipo_id
+                datos.append(dato)
+
+        return datos
+
+    def mostrar_avance(self, totales, iniciales, segundos):
+        """
+        Muestra los archivos y filas ingeridos y la velocidad de la ingesta, sin contar los
+        archivos y filas de las ejecuciones anteriores.
+        """
+        segundos = max(segundos, 1e-9)
+        archivos = totales['archivos'] - iniciales['archivos']
+        filas = totales['filas'] - iniciales['filas']
+        self.stdout.write(
+            f"Archivos: {totales['archivos']} ({archivos / segundos:.1f} archivos/s), "
+            f"filas: {totales['filas']} ({filas / segundos:.0f} filas/s), "
+            f"omitidos: {totales['omitidos']}, errores: {totales['errores']}")
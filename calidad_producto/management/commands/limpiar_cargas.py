@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from calidad_producto.resources.cargas import eliminar_cargas_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Elimina las cargas por partes abandonadas y sus archivos temporales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=48,
+                            help='Eliminar las cargas que no recibieron partes en estas horas.')
+
+    def handle(self, *args, **options):
+        cantidad = eliminar_cargas_vencidas(options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'Cargas eliminadas: {cantidad}'))
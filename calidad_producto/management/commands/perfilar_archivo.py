@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from calidad_producto.models import Archivo
+from calidad_producto.resources import perfilado
+
+
+class Command(BaseCommand):
+    help = ('Vuelve a depurar un archivo con cProfile y tracemalloc y muestra las funciones más costosas '
+            'y los sitios de mayor asignación de memoria, sin guardar ningún resultado.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', type=int,
+                            help='Id del archivo a perfilar.')
+        parser.add_argument('--orden', choices=sorted(perfilado.ORDENES), default='propio',
+                            help='Criterio para ordenar las funciones.')
+        parser.add_argument('--lineas', type=int, default=perfilado.LINEAS,
+                            help='Cantidad de funciones y de sitios de memoria a mostrar.')
+
+    def handle(self, *args, **options):
+        archivo = Archivo.objects.filter(id=options['archivo']).first()
+        if archivo is None:
+            raise CommandError('El archivo no existe.')
+
+        try:
+            reporte = perfilado.perfilar_archivo(
+                archivo, options['orden'], options['lineas'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo perfilar el archivo: {e}')
+
+        self.stdout.write(
+            f"Archivo {reporte['archivo']} ({reporte['formato']}): {reporte['segundos']:.3f} s")
+        for etapa, segundos in reporte['tiempos'].items():
+            self.stdout.write(f'  {etapa:<12} {segundos:10.4f} s')
+
+        self.stdout.write('\nFunciones más costosas:')
+        self.stdout.write(f"  {'llamadas':>10} {'propio (s)':>11} {'acumulado (s)':>14}  función")
+        for funcion in reporte['funciones']:
+            self.stdout.write(
+                f"  {funcion['llamadas']:>10} {funcion['tiempo_propio']:>11.4f} "
+                f"{funcion['tiempo_acumulado']:>14.4f}  {funcion['funcion']} ({funcion['ubicacion']})")
+
+        memoria = reporte['memoria']
+        self.stdout.write(f"\nMemoria máxima: {memoria['pico'] / 2 ** 20:.1f} MiB")
+        for etapa, pico in memoria['picos'].items():
+            self.stdout.write(f'  {etapa:<12} {pico / 2 ** 20:10.1f} MiB')
+
+        self.stdout.write(f"\nSitios de mayor asignación al terminar la etapa '{memoria['etapa']}':")
+        for sitio in memoria['sitios']:
+            self.stdout.write(
+                f"  {sitio['bytes'] / 2 ** 20:8.2f} MiB {sitio['bloques']:>8} bloques  {sitio['ubicacion']}")
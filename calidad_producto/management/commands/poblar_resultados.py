@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from calidad_producto.models import Archivo
+from calidad_producto.resources.resultados import guardar_resultados
+from calidad_producto.resources.resumenes import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Llena la tabla de resultados por métrica a partir de la información guardada de los archivos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Cantidad de archivos que se procesan en cada bloque.')
+        parser.add_argument('--reemplazar', action='store_true',
+                            help='Volver a generar los resultados de los archivos que ya los tienen.')
+        parser.add_argument('--resumenes', action='store_true',
+                            help='Volver a calcular los resúmenes mensuales desde la tabla de resultados al terminar.')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        archivos = Archivo.objects.exclude(informacion={}).only(
+            'id', 'categoria_id', 'tipo_id', 'analizador_id', 'subido_el', 'informacion').order_by('id')
+        if not options['reemplazar']:
+            archivos = archivos.filter(resultados__isnull=True)
+
+        # Recorrer los archivos por id, así cada bloque es una consulta independiente
+        ultimo_id = 0
+        total_archivos = 0
+        total_resultados = 0
+
+        while True:
+            bloque = list(archivos.filter(id__gt=ultimo_id)[:lote])
+            if not bloque:
+                break
+
+            total_resultados += guardar_resultados(bloque)
+            total_archivos += len(bloque)
+            ultimo_id = bloque[-1].id
+
+            self.stdout.write(
+                f'Archivos procesados: {total_archivos}, resultados guardados: {total_resultados}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Resultados guardados: {total_resultados} de {total_archivos} archivos'))
+
+        if options['resumenes']:
+            cantidad = reconstruir_resumenes()
+            self.stdout.write(self.style.SUCCESS(
+                f'Resúmenes reconstruidos: {cantidad}'))
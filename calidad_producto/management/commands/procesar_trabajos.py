@@ -0,0 +1,68 @@
+import threading
+from django.core.management.base import BaseCommand
+from calidad_producto.resources import trabajos
+from calidad_producto.resources.procesamiento import crear_ejecutor
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de depuración pendientes con un grupo de hilos locales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=2,
+                            help='Cantidad de trabajos que se procesan al mismo tiempo.')
+        parser.add_argument('--procesos', type=int, default=0,
+                            help='Depurar en un grupo de procesos con este límite de concurrencia. 0 para usar solamente hilos.')
+        parser.add_argument('--intervalo', type=float, default=2,
+                            help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Terminar cuando no queden trabajos pendientes.')
+        parser.add_argument('--recuperar', action='store_true',
+                            help='Volver a encolar los trabajos que quedaron en proceso.')
+        parser.add_argument('--recuperar-despues', type=float, default=None,
+                            help='Minutos en proceso tras los que se recupera un trabajo. Por defecto RECUPERAR_TRABAJOS_MINUTOS.')
+
+    def handle(self, *args, **options):
+        if options['recuperar']:
+            recuperados = trabajos.recuperar_trabajos(options['recuperar_despues'])
+            self.stdout.write(f'Trabajos recuperados: {recuperados}')
+
+        detener = threading.Event()
+        resultados = []
+        ejecutor = None
+
+        if options['procesos'] > 0:
+            # Un solo hilo reclama lotes de trabajos y los reparte entre los procesos
+            ejecutor = crear_ejecutor(options['procesos'])
+            cantidad_hilos = 1
+            self.stdout.write(
+                f"Procesando trabajos con {options['procesos']} proceso(s)...")
+        else:
+            cantidad_hilos = max(1, options['hilos'])
+            self.stdout.write(
+                f'Procesando trabajos con {cantidad_hilos} hilo(s)...')
+
+        def procesador():
+            resultados.append(trabajos.procesar_cola(
+                detener, options['intervalo'], options['una_vez'], ejecutor, options['procesos']))
+
+        hilos = [threading.Thread(target=procesador, daemon=True)
+                 for _ in range(cantidad_hilos)]
+
+        for hilo in hilos:
+            hilo.start()
+
+        try:
+            for hilo in hilos:
+                while hilo.is_alive():
+                    hilo.join(0.5)
+        except KeyboardInterrupt:
+            # Esperar a que terminen los trabajos en curso
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+        finally:
+            if ejecutor is not None:
+                ejecutor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Trabajos ejecutados: {sum(resultados)}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from calidad_producto.models import Archivo
+from calidad_producto.resources.procesamiento import reevaluar_tendencias
+
+
+class Command(BaseCommand):
+    help = 'Vuelve a evaluar los archivos de tendencia guardados con los límites configurados, sin volver a leer el Excel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', type=int,
+                            help='Evaluar solamente los archivos de este tipo.')
+        parser.add_argument('--voltaje', type=float,
+                            help='Evaluar solamente los archivos con este voltaje nominal.')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Cantidad de archivos que se guardan en cada bloque.')
+
+    def handle(self, *args, **options):
+        # Categoría 2: Tendencia
+        archivos = Archivo.objects.filter(categoria_id=2).order_by('id')
+
+        if options['tipo'] is not None:
+            archivos = archivos.filter(tipo_id=options['tipo'])
+        if options['voltaje'] is not None:
+            archivos = archivos.filter(voltaje_nominal=options['voltaje'])
+
+        actualizados, errores = reevaluar_tendencias(archivos, options['lote'])
+
+        for archivo_id, error in errores.items():
+            self.stderr.write(f'Archivo {archivo_id}: {error}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archivos actualizados: {actualizados}, con error: {len(errores)}'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('valor_porcentaje', models.FloatField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20)),
+                ('creado_el', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_el', models.DateTimeField(blank=True, null=True)),
+                ('finalizado_el', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('archivo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to='calidad_producto.archivo')),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calidad_producto.categoria')),
+            ],
+        ),
+    ]
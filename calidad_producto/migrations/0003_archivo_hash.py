@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0002_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivo',
+            name='hash_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='archivo',
+            name='valor_porcentaje',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivo',
+            name='version_depuracion',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
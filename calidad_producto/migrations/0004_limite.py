@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0003_archivo_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivo',
+            name='voltaje_nominal',
+            field=models.FloatField(default=120),
+        ),
+        migrations.CreateModel(
+            name='Limite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('voltaje_nominal', models.FloatField()),
+                ('voltaje_inferior', models.FloatField()),
+                ('voltaje_superior', models.FloatField()),
+                ('flicker', models.FloatField(default=1)),
+                ('vthd', models.FloatField(default=8)),
+                ('desbalance', models.FloatField(default=2)),
+                ('tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calidad_producto.tipo')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='limite',
+            constraint=models.UniqueConstraint(fields=('tipo', 'voltaje_nominal'), name='limite_tipo_voltaje_unico'),
+        ),
+    ]
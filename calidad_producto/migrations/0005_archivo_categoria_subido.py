@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0004_limite'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivo',
+            index=models.Index(fields=['categoria', 'subido_el', 'id'], name='archivo_categoria_subido'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copiar_subido_el(apps, schema_editor):
+    # Los archivos existentes no han cambiado desde que se subieron
+    Archivo = apps.get_model('calidad_producto', 'Archivo')
+    Archivo.objects.update(actualizado_el=models.F('subido_el'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0005_archivo_categoria_subido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivo',
+            name='actualizado_el',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_subido_el, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0006_archivo_actualizado_el'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoMetrica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subido_el', models.DateTimeField()),
+                ('metrica', models.CharField(max_length=50)),
+                ('fase', models.CharField(blank=True, default='', max_length=10)),
+                ('orden', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('columna', models.CharField(blank=True, default='', max_length=100)),
+                ('valor', models.FloatField()),
+                ('conteo', models.PositiveIntegerField(blank=True, null=True)),
+                ('archivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados', to='calidad_producto.archivo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metrica', 'fase', 'valor'], name='resultado_metrica_valor'), models.Index(fields=['metrica', 'fase', 'subido_el'], name='resultado_metrica_subido')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0007_resultadometrica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('metrica', models.CharField(max_length=50)),
+                ('mediciones', models.IntegerField(default=0)),
+                ('cumplen', models.IntegerField(default=0)),
+                ('suma_valor', models.FloatField(default=0)),
+                ('analizador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calidad_producto.analizador')),
+                ('tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calidad_producto.tipo')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='resumen',
+            constraint=models.UniqueConstraint(fields=('mes', 'analizador', 'tipo', 'metrica'), name='resumen_mes_unico'),
+        ),
+    ]
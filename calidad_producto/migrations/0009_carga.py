@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 18:57
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0008_resumen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Carga',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('recibido', models.PositiveBigIntegerField(default=0)),
+                ('analizador', models.CharField(max_length=20)),
+                ('voltaje_nominal', models.FloatField(blank=True, null=True)),
+                ('valor_porcentaje', models.FloatField(blank=True, null=True)),
+                ('creado_el', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_el', models.DateTimeField(auto_now=True)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calidad_producto.categoria')),
+                ('tipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='calidad_producto.tipo')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0009_carga'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TiempoEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('formato', models.CharField(max_length=50)),
+                ('etapa', models.CharField(max_length=20)),
+                ('cubeta', models.PositiveSmallIntegerField()),
+                ('conteo', models.PositiveBigIntegerField(default=0)),
+                ('suma', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivo',
+            name='tiempos',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddConstraint(
+            model_name='tiempoetapa',
+            constraint=models.UniqueConstraint(fields=('formato', 'etapa', 'cubeta'), name='tiempo_etapa_unico'),
+        ),
+    ]
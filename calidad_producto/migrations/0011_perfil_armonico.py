@@ -0,0 +1,45 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0010_tiempos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilArmonico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('limite_general', models.FloatField(default=5)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LimiteArmonico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveSmallIntegerField()),
+                ('limite', models.FloatField()),
+                ('perfil', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='limites', to='calidad_producto.perfilarmonico')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivo',
+            name='perfil_armonico',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='calidad_producto.perfilarmonico'),
+        ),
+        migrations.AddField(
+            model_name='carga',
+            name='perfil_armonico',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='calidad_producto.perfilarmonico'),
+        ),
+        migrations.AddConstraint(
+            model_name='limitearmonico',
+            constraint=models.UniqueConstraint(fields=('perfil', 'orden'), name='limite_armonico_orden_unico'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0011_perfil_armonico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivo',
+            name='firma_limites',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
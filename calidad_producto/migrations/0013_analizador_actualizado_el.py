@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0012_archivo_firma_limites'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analizador',
+            name='actualizado_el',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
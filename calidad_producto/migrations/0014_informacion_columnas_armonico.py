@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Categoría de los armónicos y claves de la información que no son columnas
+ARMONICO = 1
+COLUMNAS = 'columnas'
+CLAVES = ('estadisticas', 'ventanas')
+
+
+def convertir(apps, funcion):
+    Archivo = apps.get_model('calidad_producto', 'Archivo')
+    pendientes = []
+    for archivo in Archivo.objects.filter(categoria_id=ARMONICO).exclude(informacion={}).only(
+            'id', 'informacion').iterator(chunk_size=500):
+        archivo.informacion = funcion(archivo.informacion)
+        pendientes.append(archivo)
+        if len(pendientes) >= 500:
+            Archivo.objects.bulk_update(pendientes, ['informacion'])
+            pendientes = []
+    Archivo.objects.bulk_update(pendientes, ['informacion'])
+
+
+def agrupar_columnas(apps, schema_editor):
+    # Las columnas reportadas estaban en el primer nivel, junto a las estadísticas y las ventanas
+    convertir(apps, lambda informacion: {
+        COLUMNAS: {clave: valor for clave, valor in informacion.items() if clave not in CLAVES},
+        **{clave: informacion[clave] for clave in CLAVES if clave in informacion},
+    })
+
+
+def separar_columnas(apps, schema_editor):
+    convertir(apps, lambda informacion: {
+        **informacion.get(COLUMNAS, {}),
+        **{clave: informacion[clave] for clave in CLAVES if clave in informacion},
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calidad_producto', '0013_analizador_actualizado_el'),
+    ]
+
+    operations = [
+        migrations.RunPython(agrupar_columnas, separar_columnas),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 
 
@@ -24,6 +25,71 @@ class Tipo(models.Model):
         return self.nombre
 
 
+class Limite(models.Model):
+    tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE)
+    voltaje_nominal = models.FloatField()
+    voltaje_inferior = models.FloatField()
+    voltaje_superior = models.FloatField()
+    flicker = models.FloatField(default=1)
+    vthd = models.FloatField(default=8)
+    desbalance = models.FloatField(default=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tipo', 'voltaje_nominal'], name='limite_tipo_voltaje_unico')
+        ]
+
+    def como_limites(self):
+        """
+        Devuelve los límites con la misma forma que depuracion_tendencia.LIMITES.
+        """
+        return {
+            'voltaje': (self.voltaje_inferior, self.voltaje_superior),
+            'flicker': (None, self.flicker),
+            'vthd': (None, self.vthd),
+            'desbalance': (None, self.desbalance),
+        }
+
+    def __str__(self):
+        return f'{self.tipo} {self.voltaje_nominal:g} V'
+
+
+class PerfilArmonico(models.Model):
+    nombre = models.CharField(max_length=100, unique=True)
+    # Límite de las columnas sin orden de armónico o cuyo orden no tiene un límite propio
+    limite_general = models.FloatField(default=5)
+
+    def como_limites(self):
+        """
+        Devuelve los límites con la forma que utiliza depuracion_armonico.limites_columnas.
+        """
+        return {
+            'general': self.limite_general,
+            'ordenes': {limite.orden: limite.limite for limite in self.limites.all()},
+        }
+
+    def __str__(self):
+        return self.nombre
+
+
+class LimiteArmonico(models.Model):
+    perfil = models.ForeignKey(
+        PerfilArmonico, on_delete=models.CASCADE, related_name='limites')
+    orden = models.PositiveSmallIntegerField()
+    # Límite del armónico en porcentaje de la fundamental
+    limite = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['perfil', 'orden'], name='limite_armonico_orden_unico')
+        ]
+
+    def __str__(self):
+        return f'{self.perfil} H{self.orden}: {self.limite:g} %'
+
+
 class Analizador(models.Model):
     nombre = models.CharField(max_length=50)
     voltaje_a = models.CharField(max_length=50)
@@ -36,6 +102,8 @@ class Analizador(models.Model):
     vthd_b = models.CharField(max_length=50)
     vthd_c = models.CharField(max_length=50, blank=True, null=True)
     desbalance = models.CharField(max_length=50, blank=True, null=True)
+    # Los procesos que depuran comparan esta fecha para recargar su registro de perfiles
+    actualizado_el = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre
@@ -44,10 +112,156 @@ class Analizador(models.Model):
 class Archivo(models.Model):
     archivo = models.FileField(upload_to=cargar_a)
     subido_el = models.DateTimeField(auto_now_add=True)
+    actualizado_el = models.DateTimeField(auto_now=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
     tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE)
     analizador = models.ForeignKey(Analizador, on_delete=models.CASCADE)
     informacion = models.JSONField(default=dict)
+    hash_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    voltaje_nominal = models.FloatField(default=120)
+    valor_porcentaje = models.FloatField(blank=True, null=True)
+    version_depuracion = models.PositiveIntegerField(default=0)
+    # SHA-256 de los límites con los que se depuró, ver procesamiento.firma_limites
+    firma_limites = models.CharField(max_length=64, blank=True)
+    # Límites por orden de los armónicos, None para comparar todas las columnas con valor_porcentaje
+    perfil_armonico = models.ForeignKey(
+        PerfilArmonico, on_delete=models.PROTECT, blank=True, null=True)
+    # Segundos de cada etapa de la depuración y la clave del formato, ver resources/tiempos.py
+    tiempos = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            # Listados por categoría paginados por fecha de subida e id
+            models.Index(fields=['categoria', 'subido_el', 'id'],
+                         name='archivo_categoria_subido'),
+        ]
 
     def __str__(self):
         return self.archivo.name
+
+
+class Trabajo(models.Model):
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (COMPLETADO, 'Completado'),
+        (ERROR, 'Error'),
+    ]
+
+    archivo = models.ForeignKey(
+        Archivo, on_delete=models.SET_NULL, blank=True, null=True, related_name='trabajos')
+    nombre_archivo = models.CharField(max_length=255)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
+    valor_porcentaje = models.FloatField(blank=True, null=True)
+    estado = models.CharField(
+        max_length=20, choices=ESTADOS, default=PENDIENTE, db_index=True)
+    creado_el = models.DateTimeField(auto_now_add=True)
+    iniciado_el = models.DateTimeField(blank=True, null=True)
+    finalizado_el = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f'{self.nombre_archivo} ({self.estado})'
+
+
+class ResultadoMetrica(models.Model):
+    archivo = models.ForeignKey(
+        Archivo, on_delete=models.CASCADE, related_name='resultados')
+    # Copia de Archivo.subido_el para filtrar por periodo sin unir con el archivo
+    subido_el = models.DateTimeField()
+    metrica = models.CharField(max_length=50)
+    fase = models.CharField(max_length=10, blank=True, default='')
+    orden = models.PositiveSmallIntegerField(blank=True, null=True)
+    columna = models.CharField(max_length=100, blank=True, default='')
+    valor = models.FloatField()
+    conteo = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['metrica', 'fase', 'valor'],
+                         name='resultado_metrica_valor'),
+            models.Index(fields=['metrica', 'fase', 'subido_el'],
+                         name='resultado_metrica_subido'),
+        ]
+
+    def __str__(self):
+        return f'{self.archivo_id} {self.metrica} {self.fase}: {self.valor}'
+
+
+class Resumen(models.Model):
+    # Primer día del mes en que se subieron los archivos
+    mes = models.DateField()
+    analizador = models.ForeignKey(Analizador, on_delete=models.CASCADE)
+    tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE)
+    metrica = models.CharField(max_length=50)
+    # Cantidad de resultados (archivo y fase), cuántos cumplen y la suma de sus valores
+    mediciones = models.IntegerField(default=0)
+    cumplen = models.IntegerField(default=0)
+    suma_valor = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mes', 'analizador', 'tipo', 'metrica'], name='resumen_mes_unico')
+        ]
+
+    def porcentaje_cumplimiento(self):
+        """
+        Porcentaje de resultados que cumplen con el límite.
+        """
+        return round(self.cumplen / self.mediciones * 100, 2) if self.mediciones else None
+
+    def promedio_valor(self):
+        """
+        Porcentaje de excedencia promedio de los resultados.
+        """
+        return round(self.suma_valor / self.mediciones, 4) if self.mediciones else None
+
+    def __str__(self):
+        return f'{self.mes:%Y-%m} {self.analizador} {self.tipo} {self.metrica}'
+
+
+class TiempoEtapa(models.Model):
+    # Clave del formato del archivo (Formato.clave) y etapa de la depuración
+    formato = models.CharField(max_length=50)
+    etapa = models.CharField(max_length=20)
+    # Posición de la cubeta en tiempos.CUBETAS, len(CUBETAS) para los tiempos mayores a la última
+    cubeta = models.PositiveSmallIntegerField()
+    # Cantidad de tiempos de la cubeta y su suma en segundos
+    conteo = models.PositiveBigIntegerField(default=0)
+    suma = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['formato', 'etapa', 'cubeta'], name='tiempo_etapa_unico')
+        ]
+
+    def __str__(self):
+        return f'{self.formato} {self.etapa} [{self.cubeta}]: {self.conteo}'
+
+
+class Carga(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nombre_archivo = models.CharField(max_length=255)
+    # Tamaño total del archivo y bytes ya escritos en el archivo temporal
+    tamano = models.PositiveBigIntegerField()
+    recibido = models.PositiveBigIntegerField(default=0)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
+    tipo = models.ForeignKey(Tipo, on_delete=models.CASCADE)
+    # Id del analizador, o 'auto' para detectarlo al finalizar la carga
+    analizador = models.CharField(max_length=20)
+    voltaje_nominal = models.FloatField(blank=True, null=True)
+    valor_porcentaje = models.FloatField(blank=True, null=True)
+    perfil_armonico = models.ForeignKey(
+        PerfilArmonico, on_delete=models.SET_NULL, blank=True, null=True)
+    creado_el = models.DateTimeField(auto_now_add=True)
+    actualizado_el = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.nombre_archivo} ({self.recibido}/{self.tamano})'
@@ -0,0 +1,261 @@
+import os
+import uuid
+import shutil
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from calidad_producto.models import Archivo, Carga
+from calidad_producto.resources.procesamiento import preparar_archivo
+from calidad_producto.resources.trabajos import encolar_trabajo
+
+
+# Cantidad de bytes que se leen de la solicitud o del disco en cada paso
+TAMANO_BLOQUE = 1024 * 1024
+
+# Extensiones de los archivos que se pueden cargar
+EXTENSIONES = ('.xlsx', '.xls')
+
+
+def carpeta_cargas():
+    """
+    Obtiene la carpeta de los archivos temporales, CARGAS_ROOT o la carpeta 'cargas' de MEDIA_ROOT.
+    """
+    return str(getattr(settings, 'CARGAS_ROOT', os.path.join(settings.MEDIA_ROOT, 'cargas')))
+
+
+def ruta_carga(carga):
+    """
+    Obtiene la ruta del archivo temporal de una carga, con la extensión del archivo original.
+    """
+    return os.path.join(carpeta_cargas(), f'{carga.id}{os.path.splitext(carga.nombre_archivo)[1].lower()}')
+
+
+def iniciar_carga(nombre_archivo, tamano, categoria, tipo, analizador, voltaje_nominal=None, valor_porcentaje=None,
+                  perfil_armonico=None):
+    """
+    Crea una carga y su archivo temporal vacío.
+
+    Parámetros:
+        nombre_archivo (str): El nombre del archivo original.
+        tamano (int): El tamaño total del archivo en bytes.
+        categoria (Categoria): La categoría del archivo.
+        tipo (Tipo): El tipo del archivo.
+        analizador (str): El id del analizador o 'auto' para detectarlo al finalizar.
+        voltaje_nominal (float o None): El voltaje nominal del punto de medición.
+        valor_porcentaje (float o None): El valor del porcentaje a utilizar en la depuración.
+        perfil_armonico (PerfilArmonico o None): Los límites por orden de los armónicos.
+
+    Retorna:
+        Carga: La carga creada.
+    """
+    nombre_archivo = os.path.basename(nombre_archivo)
+    if not nombre_archivo.lower().endswith(EXTENSIONES):
+        raise ValueError('Por favor, seleccione un archivo .xlsx o .xls.')
+    if tamano <= 0:
+        raise ValueError('El tamaño del archivo debe ser mayor que cero.')
+
+    carga = Carga.objects.create(
+        nombre_archivo=nombre_archivo, tamano=tamano, categoria=categoria, tipo=tipo,
+        analizador=analizador, voltaje_nominal=voltaje_nominal, valor_porcentaje=valor_porcentaje,
+        perfil_armonico=perfil_armonico)
+
+    os.makedirs(carpeta_cargas(), exist_ok=True)
+    open(ruta_carga(carga), 'wb').close()
+
+    return carga
+
+
+def validar_parte(carga, desplazamiento, longitud):
+    """
+    Verifica que una parte continúe los bytes recibidos de la carga y no supere su tamaño.
+    """
+    if desplazamiento < 0 or desplazamiento > carga.recibido:
+        raise ValueError(
+            f'La parte debe comenzar en el byte {carga.recibido} o antes.')
+    if desplazamiento + longitud > carga.tamano:
+        raise ValueError('La parte supera el tamaño del archivo.')
+
+
+def recibir_parte(carga, flujo, longitud):
+    """
+    Lee una parte de la solicitud en un archivo propio, sin mantener abierta una transacción
+    mientras llega el contenido. Si la conexión se corta, se conservan los bytes leídos.
+
+    Retorna:
+        tuple: La ruta del archivo de la parte, los bytes leídos y el error de lectura, None si
+        la parte llegó completa.
+    """
+    ruta_parte = f'{ruta_carga(carga)}.{uuid.uuid4().hex}.parte'
+    leidos = 0
+    error_lectura = None
+
+    with open(ruta_parte, 'wb') as parte:
+        try:
+            while leidos < longitud:
+                bloque = flujo.read(min(TAMANO_BLOQUE, longitud - leidos))
+                if not bloque:
+                    break
+                parte.write(bloque)
+                leidos += len(bloque)
+        except OSError as e:
+            # La conexión se cortó, el error se devuelve después de guardar los bytes leídos
+            error_lectura = e
+
+    return ruta_parte, leidos, error_lectura
+
+
+def escribir_parte(carga_id, desplazamiento, flujo, longitud):
+    """
+    Escribe una parte de la carga en su archivo temporal a partir del desplazamiento indicado.
+    El desplazamiento puede ser menor que los bytes recibidos para volver a enviar una parte
+    cuya respuesta se perdió, el contenido posterior se descarta. Si la conexión se corta a la
+    mitad, se conservan los bytes escritos y la carga se retoma desde ellos.
+
+    La parte se recibe primero en un archivo propio y la carga se bloquea solamente para
+    verificar el desplazamiento, copiar la parte al archivo temporal y actualizar los bytes
+    recibidos, así un cliente lento no mantiene bloqueada la fila mientras envía la parte.
+
+    Parámetros:
+        carga_id (UUID): El id de la carga.
+        desplazamiento (int): La posición de la parte en el archivo.
+        flujo (archivo): El contenido de la parte, se lee por bloques.
+        longitud (int): El tamaño de la parte en bytes.
+
+    Retorna:
+        Carga: La carga con los bytes recibidos actualizados.
+    """
+    # Rechazar la parte antes de recibirla si no continúa la carga
+    carga = Carga.objects.get(id=carga_id)
+    validar_parte(carga, desplazamiento, longitud)
+
+    ruta_parte, leidos, error_lectura = recibir_parte(carga, flujo, longitud)
+    try:
+        with transaction.atomic():
+            # Bloquear la carga para que dos partes no se escriban al mismo tiempo. Otra parte
+            # pudo llegar mientras se recibía esta, por eso se vuelve a verificar
+            carga = Carga.objects.select_for_update().get(id=carga_id)
+            validar_parte(carga, desplazamiento, longitud)
+
+            with open(ruta_carga(carga), 'r+b') as temporal, open(ruta_parte, 'rb') as parte:
+                temporal.seek(desplazamiento)
+                shutil.copyfileobj(parte, temporal, TAMANO_BLOQUE)
+                # Descartar lo que había después, por ejemplo una parte anterior incompleta
+                temporal.truncate()
+
+            carga.recibido = desplazamiento + leidos
+            carga.save(update_fields=['recibido', 'actualizado_el'])
+    finally:
+        os.remove(ruta_parte)
+
+    if error_lectura is not None:
+        raise error_lectura
+
+    return carga
+
+
+def calcular_hash_carga(carga):
+    """
+    Calcula el SHA-256 del archivo temporal de una carga, leyéndolo por bloques.
+    """
+    sha256 = hashlib.sha256()
+    with open(ruta_carga(carga), 'rb') as temporal:
+        for bloque in iter(lambda: temporal.read(TAMANO_BLOQUE), b''):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+def verificar_carga(carga, hash_sha256):
+    """
+    Verifica que la carga esté completa y que su contenido coincida con el hash del cliente.
+
+    Retorna:
+        str: El hash del contenido.
+    """
+    if carga.recibido != carga.tamano:
+        raise ValueError(
+            f'La carga está incompleta: {carga.recibido} de {carga.tamano} bytes.')
+
+    calculado = calcular_hash_carga(carga)
+    if calculado != hash_sha256.strip().lower():
+        raise ValueError('El SHA-256 del archivo no coincide con el contenido recibido.')
+
+    return calculado
+
+
+def finalizar_carga(carga, analizador, hash_sha256):
+    """
+    Mueve el archivo temporal a la carpeta de archivos, sin copiarlo, crea el Archivo y encola
+    su depuración.
+
+    Parámetros:
+        carga (Carga): La carga verificada con verificar_carga.
+        analizador (PerfilAnalizador): El analizador del archivo.
+        hash_sha256 (str): El hash del contenido.
+
+    Retorna:
+        tuple: El Archivo creado y el Trabajo de su depuración.
+    """
+    ruta_temporal = ruta_carga(carga)
+
+    with transaction.atomic():
+        # Eliminar la carga primero, si se finaliza dos veces al mismo tiempo la segunda espera y falla
+        if not Carga.objects.filter(id=carga.id).delete()[0]:
+            raise ValueError('La carga ya se finalizó.')
+
+        # Obtener un nombre libre en la carpeta de la categoría y mover el archivo
+        nombre = default_storage.get_available_name(
+            Archivo.archivo.field.generate_filename(Archivo(categoria=carga.categoria), carga.nombre_archivo))
+        ruta_final = default_storage.path(nombre)
+        os.makedirs(os.path.dirname(ruta_final), exist_ok=True)
+        os.replace(ruta_temporal, ruta_final)
+
+        try:
+            nuevo_archivo = preparar_archivo(
+                nombre, carga.categoria, carga.tipo, analizador, carga.voltaje_nominal, hash_sha256,
+                carga.perfil_armonico)
+
+            nuevo_archivo.save()
+            trabajo = encolar_trabajo(nuevo_archivo, carga.valor_porcentaje)
+
+            # Con la deduplicación se reutiliza el archivo existente y se descarta el movido, solamente
+            # después de confirmar la transacción para poder devolverlo a la carpeta temporal si falla
+            if nuevo_archivo.archivo.name != nombre:
+                transaction.on_commit(lambda: os.remove(ruta_final))
+
+        except Exception:
+            # Devolver el archivo a la carpeta temporal para poder volver a finalizar la carga
+            if os.path.exists(ruta_final):
+                os.replace(ruta_final, ruta_temporal)
+            raise
+
+    return nuevo_archivo, trabajo
+
+
+def eliminar_carga(carga):
+    """
+    Cancela una carga y elimina su archivo temporal.
+    """
+    ruta_temporal = ruta_carga(carga)
+    carga.delete()
+    if os.path.exists(ruta_temporal):
+        os.remove(ruta_temporal)
+
+
+def eliminar_cargas_vencidas(horas=48):
+    """
+    Elimina las cargas que no recibieron partes en las últimas horas, junto con sus archivos temporales.
+
+    Retorna:
+        int: La cantidad de cargas eliminadas.
+    """
+    vencidas = Carga.objects.filter(
+        actualizado_el__lt=timezone.now() - timedelta(hours=horas))
+
+    cantidad = 0
+    for carga in vencidas.iterator():
+        eliminar_carga(carga)
+        cantidad += 1
+    return cantidad
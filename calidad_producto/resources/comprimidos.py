@@ -0,0 +1,121 @@
+import os
+import zipfile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+
+# Extensiones de los libros que se depuran dentro de un archivo zip
+EXTENSIONES_LIBRO = ('.xlsx', '.xls')
+
+# Cantidad de bytes que se descomprimen en cada paso
+TAMANO_BLOQUE = 1024 * 1024
+
+# Límites por defecto de un zip, para no llenar el disco con un zip malicioso
+MAX_MIEMBROS = 1000
+MAX_BYTES_MIEMBRO = 200 * 1024 * 1024
+
+
+def es_zip(archivo):
+    """
+    Indica si un archivo subido es un archivo zip, por su extensión.
+    """
+    return archivo.name.lower().endswith('.zip')
+
+
+def miembro_omitido(info):
+    """
+    Indica si un miembro del zip no es un libro a depurar: archivos ocultos, metadatos de macOS
+    y archivos temporales de Excel.
+    """
+    nombre = os.path.basename(info.filename)
+    return (
+        info.filename.startswith('__MACOSX/')
+        or nombre.startswith(('.', '~$'))
+        or not nombre.lower().endswith(EXTENSIONES_LIBRO)
+    )
+
+
+def limites_zip():
+    """
+    Obtiene la cantidad máxima de miembros de un zip y el tamaño máximo descomprimido de cada
+    miembro, de ZIP_MAX_MIEMBROS y ZIP_MAX_BYTES_MIEMBRO en la configuración.
+    """
+    return (getattr(settings, 'ZIP_MAX_MIEMBROS', MAX_MIEMBROS),
+            getattr(settings, 'ZIP_MAX_BYTES_MIEMBRO', MAX_BYTES_MIEMBRO))
+
+
+def copiar_miembro(miembro, destino, limite):
+    """
+    Descomprime un miembro por bloques en el destino. El tamaño declarado en el zip puede ser
+    falso, por eso se cuentan los bytes copiados y se detiene al superar el límite.
+
+    Retorna:
+        bool: True si el miembro se copió completo sin superar el límite.
+    """
+    copiados = 0
+    while True:
+        bloque = miembro.read(min(TAMANO_BLOQUE, limite + 1 - copiados))
+        if not bloque:
+            return True
+        copiados += len(bloque)
+        if copiados > limite:
+            return False
+        destino.write(bloque)
+
+
+def iterar_miembros(archivo_zip):
+    """
+    Recorre los libros de un archivo zip uno por uno, sin extraer el zip completo en el disco
+    ni en la memoria. Cada miembro se descomprime por bloques en un archivo temporal, igual que
+    un archivo subido grande, así openpyxl puede leerlo y al guardarlo solamente se mueve.
+
+    Parámetros:
+        archivo_zip (UploadedFile): El archivo zip recibido en la solicitud.
+
+    Retorna:
+        generator: Tuplas (nombre del miembro, TemporaryUploadedFile, error). El archivo es None si
+        el miembro se omite o no se pudo descomprimir, en ese caso el error indica el motivo.
+
+    Lanza:
+        ValueError: Si el zip tiene más miembros que el límite de la configuración.
+    """
+    max_miembros, max_bytes = limites_zip()
+
+    with zipfile.ZipFile(archivo_zip) as contenedor:
+        miembros = contenedor.infolist()
+        if len(miembros) > max_miembros:
+            raise ValueError(
+                f'El zip tiene {len(miembros)} miembros, el máximo es {max_miembros}.')
+
+        for info in miembros:
+            if info.is_dir():
+                continue
+
+            if miembro_omitido(info):
+                yield info.filename, None, None
+                continue
+
+            if info.file_size > max_bytes:
+                yield info.filename, None, f'Descomprimido ocupa {info.file_size} bytes, el máximo es {max_bytes}.'
+                continue
+
+            temporal = TemporaryUploadedFile(
+                os.path.basename(info.filename), 'application/octet-stream', info.file_size, None)
+            try:
+                try:
+                    with contenedor.open(info) as miembro:
+                        completo = copiar_miembro(miembro, temporal, max_bytes)
+                except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+                    # Miembro dañado, cifrado o con una compresión no soportada
+                    yield info.filename, None, str(e)
+                    continue
+
+                if not completo:
+                    yield info.filename, None, f'Descomprimido supera el máximo de {max_bytes} bytes.'
+                    continue
+
+                temporal.seek(0)
+                yield info.filename, temporal, None
+            finally:
+                # El archivo temporal ya no existe si se movió al guardarlo
+                temporal.close()
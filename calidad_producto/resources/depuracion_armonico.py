@@ -1,107 +1,57 @@
+import numpy as np
 import pandas as pd
+from calidad_producto.models import PerfilArmonico
+from calidad_producto.resources import estadisticas, formatos, matriz, series, tiempos, ventanas
+from calidad_producto.resources.resultados import fase_columna, orden_columna
 
 
-def leer_archivo(ruta_archivo, hoja=0, encabezado=None):
+def obtener_limites(perfil_id):
     """
-    Lee un archivo xlsx o xls y devuelve un DataFrame.
-
-    Parámetros:
-        ruta_archivo (str): La ruta del archivo xlsx o xls.
-        hoja (str o int): Nombre o índice de la hoja a leer. Por defecto es 0 (primera hoja).
-        encabezado (int o None): La fila a utilizar como encabezado (0-indexado). None para no usar encabezado.
-
-    Retorna:
-        DataFrame o None: El DataFrame leído o None si ocurre un error.
+    Obtiene los límites por orden de un perfil de armónicos. Si el archivo no tiene perfil
+    se devuelve None y todas las columnas se comparan con el valor del porcentaje.
     """
-    try:
-        if ruta_archivo.endswith('.xlsx'):
-            df = pd.read_excel(ruta_archivo, header=encabezado,
-                               sheet_name=hoja, engine='openpyxl')
-        elif ruta_archivo.endswith('.xls'):
-            df = pd.read_excel(ruta_archivo, header=encabezado,
-                               sheet_name=hoja, engine='xlrd')
-        else:
-            print("El formato del archivo no es soportado.")
-            return None
-    except FileNotFoundError:
-        print("El archivo no se encontró.")
+    if perfil_id is None:
         return None
-    except Exception as e:
-        print(f"Ocurrió un error al leer el archivo: {e}")
-        return None
-    return df
-
-
-def seleccionar_filas_columnas(df, filas, columnas):
-    """
-    Selecciona el rango de filas y columnas necesarias de un DataFrame.
-
-    Parámetros:
-        df (DataFrame): El DataFrame original.
-        filas (slice): Rango de filas a seleccionar.
-        columnas (slice): Rango de columnas a seleccionar.
+    return PerfilArmonico.objects.prefetch_related('limites').get(id=perfil_id).como_limites()
 
-    Retorna:
-        DataFrame: El DataFrame resultante con las filas y columnas seleccionadas.
-    """
-    df_seleccionado = df.iloc[filas, columnas]
-    return df_seleccionado
 
-
-def ajustar_encabezado(df):
+def limites_columnas(columnas, limites, valor_porcentaje):
     """
-    Ajusta el encabezado de un DataFrame.
+    Obtiene el límite de cada columna a partir del orden de armónico de su encabezado normalizado.
 
     Parámetros:
-        df (DataFrame): El DataFrame con los datos.
+        columnas (Index): Los nombres de las columnas.
+        limites (dict o None): Límites del perfil, obtenidos con PerfilArmonico.como_limites. None
+        para utilizar el valor del porcentaje en todas las columnas.
+        valor_porcentaje (float): El límite único cuando no se indica un perfil.
 
     Retorna:
-        DataFrame: El DataFrame con el encabezado ajustado.
+        ndarray: Un límite por columna, en el orden de las columnas.
     """
-    df.columns = df.iloc[0]
-    df = df[1:]  # Eliminar la primera fila
-    df.reset_index(drop=True, inplace=True)  # Reiniciar los índices
-    return df
+    if limites is None:
+        return np.full(len(columnas), valor_porcentaje, dtype=np.float64)
 
-
-def normalizar_encabezados_sonel(df):
-    """
-    Normaliza los encabezados de un DataFrame eliminando sufijos específicos, reemplazando 'instant' por 'inst',
-    y eliminando el contenido dentro de los corchetes al final de los nombres de las columnas.
-
-    Parámetros:
-        df (DataFrame): El DataFrame con los datos.
-
-    Retorna:
-        DataFrame: El DataFrame con los encabezados normalizados.
-    """
-    # Eliminar sufijos como ". <número> min"
-    df.columns = df.columns.str.replace(r'\.\s*\d+\s*min', '', regex=True)
-
-    # Reemplazar 'instant' por 'inst'
-    df.columns = df.columns.str.replace(r'\binstant\b', 'inst', regex=True)
-
-    # Eliminar el contenido dentro de corchetes y los corchetes mismos
-    df.columns = df.columns.str.replace(r'\[.*?\]', '', regex=True)
-
-    # Eliminar posibles espacios en blanco al final de los nombres de las columnas
-    df.columns = df.columns.str.strip()
-
-    return df
+    ordenes = limites['ordenes']
+    return np.array([
+        ordenes.get(orden_columna(columna) if isinstance(columna, str) else None, limites['general'])
+        for columna in columnas
+    ], dtype=np.float64)
 
 
 def contar_valores_mayores(df, numero):
     """
-    Cuenta cuántos valores mayores que un número específico hay por columna.
+    Cuenta cuántos valores mayores que un número específico hay por columna. Con un vector de
+    límites, cada columna se compara con su propio límite en una sola pasada sobre la matriz.
 
     Parámetros:
         df (DataFrame): El DataFrame con los datos.
-        numero (int o float): El número a comparar.
+        numero (int, float o ndarray): El número a comparar, o un límite por columna.
 
     Retorna:
         Series: La cantidad de valores mayores a 'numero' por columna.
     """
-    valores_mayores = (df > numero).sum()
+    valores_mayores = pd.Series(
+        (df.to_numpy() > numero).sum(axis=0), index=df.columns)
     return valores_mayores
 
 
@@ -120,7 +70,7 @@ def calcular_porcentaje_valores_mayores(valores_mayores, total_filas):
     return porcentaje_valores_mayores
 
 
-def obtener_informacion_mayor(df_seleccionado, valores_mayores, porcentaje_valores_mayores, valor_porcentaje):
+def obtener_informacion_mayor(df_seleccionado, valores_mayores, porcentaje_valores_mayores, valor_porcentaje, limites=None):
     """
     Obtiene un conjunto de datos de información general con valores mayores a un porcentaje específico.
 
@@ -129,6 +79,7 @@ def obtener_informacion_mayor(df_seleccionado, valores_mayores, porcentaje_valor
         valores_mayores (Series): La cantidad de valores mayores a un número específico por columna.
         porcentaje_valores_mayores (Series): El porcentaje de valores mayores a un número específico por columna.
         valor_porcentaje (int): El porcentaje mínimo para considerar un valor mayor, en este caso 5.
+        limites (Series o None): El límite con el que se comparó cada columna.
 
     Retorna:    
         informacion (dict): Un diccionario con la información general de columnas con valores mayores al porcentaje especificado.
@@ -137,7 +88,8 @@ def obtener_informacion_mayor(df_seleccionado, valores_mayores, porcentaje_valor
     informacion = {
         columna: {
             'conteo': int(valores_mayores[columna]),
-            'porcentaje': float(porcentaje_valores_mayores[columna].round(5))
+            'porcentaje': float(porcentaje_valores_mayores[columna].round(5)),
+            **({'limite': float(limites[columna])} if limites is not None else {}),
         }
         for columna in df_seleccionado.columns
         if porcentaje_valores_mayores[columna] > valor_porcentaje
@@ -145,176 +97,167 @@ def obtener_informacion_mayor(df_seleccionado, valores_mayores, porcentaje_valor
     return informacion
 
 
-def obtener_informacion(df, valor_porcentaje):
+def columnas_armonicos(df):
     """
-    Extrae la información relevante del DataFrame procesado.
-
-    Parámetros:
-        df (DataFrame): El DataFrame procesado.
-        valores_columna (dict): Diccionario con los nombres de las columnas.
+    Obtiene la primera columna de cada nombre que indica el orden del armónico.
 
     Retorna:
-        informacion (dict): Un diccionario con la información extraída.
+        dict: La posición y el orden de cada columna, por nombre de columna.
     """
-
-    # Contar valores mayores a 5 por columna
-    valores_mayores = contar_valores_mayores(
-        df, valor_porcentaje)
-
-    # Calcular porcentaje de valores mayores a 5 por columna
-    total_filas = df.shape[0]  # Número total de filas
-    porcentaje_valores_mayores = calcular_porcentaje_valores_mayores(
-        valores_mayores, total_filas)
-
-    informacion = obtener_informacion_mayor(
-        df, valores_mayores, porcentaje_valores_mayores, valor_porcentaje)
-
-    return informacion
+    columnas = {}
+    for posicion, columna in enumerate(df.columns):
+        orden = orden_columna(columna) if isinstance(columna, str) else None
+        if orden is not None and columna not in columnas:
+            columnas[columna] = (posicion, orden)
+    return columnas
 
 
-def sonel(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), valor_porcentaje=0):
+def obtener_estadisticas(df):
     """
-    Función principal para analizar un archivo de Sonel monofásico.
+    Calcula el percentil 95, el máximo y el promedio de todas las columnas de armónicos a la vez,
+    sobre la matriz numérica y sin recorrer las columnas una por una. Las celdas vacías no son
+    mediciones, por eso el DataFrame debe conservar los NaN.
 
     Parámetros:
-        ruta_archivo (str): La ruta del archivo xlsx o xls.
-        filas (slice): Rango de filas a seleccionar. Por defecto selecciona todas las filas.
-        columnas (slice): Rango de columnas a seleccionar. Por defecto selecciona todas las columnas.
-        valor_porcentaje (int): El porcentaje mínimo para considerar un valor mayor. Por defecto es 0.
+        df (DataFrame): El DataFrame con los datos, sin reemplazar los valores vacíos.
 
     Retorna:
-        dict, dict: Dos diccionarios con la información general y los resultados de valores mayores.
+        dict: Las estadísticas por nombre de columna, con el orden y la fase del armónico. Las
+        columnas sin valores no se incluyen.
     """
+    columnas = columnas_armonicos(df)
+    if not columnas or df.empty:
+        return {}
 
-    # Leer el archivo
-    df = leer_archivo(ruta_archivo)
-
-    # Si el dataframe es None, mostrar un mensaje de error y salir
-    if df is None:
-        print("No se pudo leer el archivo.")
-        return None
-
-    # Procesamiento del DataFrame
-    print("\nDF")
-    print(df)
-
-    # Seleccionar las filas y columnas deseadas
-    df_seleccionado = seleccionar_filas_columnas(df, filas, columnas)
+    matriz_armonicos = df.iloc[:, [posicion for posicion, _ in columnas.values()]].to_numpy(
+        dtype=np.float64)
+    percentiles, maximos, promedios = estadisticas.calcular_estadisticas(
+        matriz_armonicos)
 
-    # Ajustar el encabezado del DataFrame
-    df_seleccionado = ajustar_encabezado(df_seleccionado)
+    return {
+        columna: {
+            'orden': orden,
+            'fase': fase_columna(columna),
+            'p95': round(percentil, 5),
+            'maximo': round(maximo, 5),
+            'promedio': round(promedio, 5),
+        }
+        for (columna, (_, orden)), percentil, maximo, promedio in zip(
+            columnas.items(), percentiles.tolist(), maximos.tolist(), promedios.tolist())
+        if not np.isnan(percentil)
+    }
 
-    # Normalizar enbacezados SONEL
-    df_seleccionado = normalizar_encabezados_sonel(df_seleccionado)
 
-    # Convertir los datos a tipo numérico y llenar NaN con 0
-    df_seleccionado = df_seleccionado.apply(
-        pd.to_numeric, errors='coerce').fillna(0)
+def obtener_ventanas(df, limites_columna):
+    """
+    Calcula el porcentaje de muestras sobre el límite de las columnas de armónicos en cada ventana
+    de tiempo, a partir de la fecha y hora de las filas en el índice del DataFrame.
 
-    print("\nDF Resultante")
-    print(df_seleccionado)
+    Parámetros:
+        df (DataFrame): El DataFrame con los datos y la fecha y hora de las filas como índice.
+        limites_columna (ndarray): El límite de cada columna del DataFrame.
 
-    # Obtener informacion procesada
-    informacion = obtener_informacion(df_seleccionado, valor_porcentaje)
+    Retorna:
+        dict: Los porcentajes por ventana, vacío si las filas no tienen fecha.
+    """
+    columnas = columnas_armonicos(df)
+    if not columnas or df.empty:
+        return {}
 
-    return informacion
+    posiciones = [posicion for posicion, _ in columnas.values()]
+    mayores = df.iloc[:, posiciones].to_numpy(dtype=np.float64) > limites_columna[posiciones]
+    return ventanas.calcular_ventanas(df.index, mayores, list(columnas))
 
 
-def aemc(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), valor_porcentaje=0):
+def obtener_informacion(df, valor_porcentaje, limites=None):
     """
-    Función principal para analizar un archivo de AEMC monofásico o trifásico.
+    Extrae la información relevante del DataFrame procesado.
 
     Parámetros:
-        ruta_archivo (str): La ruta del archivo xlsx o xls.
-        filas (slice): Rango de filas a seleccionar. Por defecto selecciona todas las filas.
-        columnas (slice): Rango de columnas a seleccionar. Por defecto selecciona todas las columnas.
-        valor_porcentaje (int): El porcentaje mínimo para considerar un valor mayor. Por defecto es 0.
+        df (DataFrame): El DataFrame procesado, con los valores vacíos como NaN.
+        valor_porcentaje (float): El porcentaje de muestras sobre el límite a partir del cual se
+        reporta una columna. Sin perfil también es el límite de todas las columnas.
+        limites (dict o None): Límites por orden del perfil de armónicos, None para no utilizar perfil.
 
     Retorna:
-        dict: Diccionario con la información general que conrresponde a los valores mayores.
+        informacion (dict): Un diccionario con las columnas reportadas en formatos.COLUMNAS_ARMONICO
+        y las estadísticas en estadisticas.CLAVE. Si el índice del DataFrame es la fecha y hora de
+        las filas, incluye los porcentajes por ventana de tiempo en ventanas.CLAVE.
     """
 
-    # Leer el archivo
-    df = leer_archivo(ruta_archivo)
+    # Las estadísticas se calculan sin los valores vacíos, antes de reemplazarlos
+    estadisticas_armonicos = obtener_estadisticas(df)
 
-    # Si el dataframe es None, mostrar un mensaje de error y salir
-    if df is None:
-        print("No se pudo leer el archivo.")
-        return None
-
-    # Procesamiento del DataFrame
-    print("\nDF")
-    print(df)
-
-    # Seleccionar las filas y columnas deseadas
-    df_seleccionado = seleccionar_filas_columnas(df, filas, columnas)
+    # Llenar NaN con 0, las celdas vacías no superan el límite
+    df = df.fillna(0)
 
-    # Ajustar el encabezado del DataFrame
-    df_seleccionado = ajustar_encabezado(df_seleccionado)
+    # Contar los valores mayores al límite de cada columna
+    limites_columna = limites_columnas(df.columns, limites, valor_porcentaje)
+    valores_mayores = contar_valores_mayores(df, limites_columna)
 
-    # Convertir los datos a tipo numérico y llenar NaN con 0
-    df_seleccionado = df_seleccionado.apply(
-        pd.to_numeric, errors='coerce').fillna(0)
+    # Calcular porcentaje de valores mayores a 5 por columna
+    total_filas = df.shape[0]  # Número total de filas
+    porcentaje_valores_mayores = calcular_porcentaje_valores_mayores(
+        valores_mayores, total_filas)
 
-    # Eliminar la primera fila y resetear los índices
-    df_seleccionado = df_seleccionado.iloc[1:]
-    df_seleccionado.reset_index(drop=True, inplace=True)
+    informacion = {
+        formatos.COLUMNAS_ARMONICO: obtener_informacion_mayor(
+            df, valores_mayores, porcentaje_valores_mayores, valor_porcentaje,
+            pd.Series(limites_columna, index=df.columns) if limites is not None else None),
+    }
 
-    print("\nDataFrame Resultante")
-    print(df_seleccionado)
+    # Estadísticas por orden y fase de todas las columnas de armónicos
+    if estadisticas_armonicos:
+        informacion[estadisticas.CLAVE] = estadisticas_armonicos
 
-    # Obtener informacion procesada
-    informacion = obtener_informacion(df_seleccionado, valor_porcentaje)
+    # Porcentajes de las columnas de armónicos en cada ventana de tiempo
+    if isinstance(df.index, pd.DatetimeIndex):
+        por_ventana = obtener_ventanas(df, limites_columna)
+        if por_ventana:
+            informacion[ventanas.CLAVE] = por_ventana
 
     return informacion
 
 
-def metrel(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), valor_porcentaje=0):
+def procesar(ruta_archivo, formato, valor_porcentaje=0, limites=None):
     """
-    Función principal para analizar un archivo de Metrel monofásico o trifásico.
+    Función principal para analizar un archivo de armónicos según el formato de su analizador.
 
     Parámetros:
         ruta_archivo (str): La ruta del archivo xlsx o xls.
-        filas (slice): Rango de filas a seleccionar. Por defecto selecciona todas las filas.
-        columnas (slice): Rango de columnas a seleccionar. Por defecto selecciona todas las columnas.
+        formato (Formato): El formato del archivo, obtenido de formatos.FORMATOS.
         valor_porcentaje (int): El porcentaje mínimo para considerar un valor mayor. Por defecto es 0.
+        limites (dict o None): Límites por orden del perfil de armónicos, None para no utilizar perfil.
 
     Retorna:
         dict: Diccionario con la información general que conrresponde a los valores mayores.
     """
 
-    # Leer el archivo
-    df = leer_archivo(ruta_archivo)
+    tiempos.etiquetar(formato.clave)
+
+    # Leer el archivo a partir de la fila de encabezado y con las columnas del formato
+    df_seleccionado = matriz.leer_matriz(ruta_archivo, formato)
 
     # Si el dataframe es None, mostrar un mensaje de error y salir
-    if df is None:
+    if df_seleccionado is None:
         print("No se pudo leer el archivo.")
         return None
 
-    # Procesamiento del DataFrame
-    print("\nDF")
-    print(df)
-
-    # Seleccionar las filas y columnas deseadas
-    df_seleccionado = seleccionar_filas_columnas(df, filas, columnas)
-
-    # Ajustar el encabezado del DataFrame
-    df_seleccionado = ajustar_encabezado(df_seleccionado)
-
-    # Convertir los datos a tipo numérico y llenar NaN con 0
-    df_seleccionado = df_seleccionado.apply(
-        pd.to_numeric, errors='coerce').fillna(0)
+    # Guardar el THD de cada fase para los gráficos, solamente si las filas tienen fecha
+    with tiempos.etapa('matriz'):
+        if isinstance(df_seleccionado.index, pd.DatetimeIndex):
+            series.guardar_desde_dataframe(
+                ruta_archivo, df_seleccionado, series.series_armonico(df_seleccionado))
 
-    print("\nDF Resultante")
-    print(df_seleccionado)
-
-    # Obtener informacion procesada
-    informacion = obtener_informacion(df_seleccionado, valor_porcentaje)
+    with tiempos.etapa('calculo'):
+        # Obtener informacion procesada
+        informacion = obtener_informacion(
+            df_seleccionado, valor_porcentaje, limites)
 
     return informacion
 
 
-def tipo_analizador(analizador, ruta_archivo, valor_porcentaje):
+def tipo_analizador(analizador, ruta_archivo, valor_porcentaje, limites=None):
     """
     Función que selecciona el tipo de analizador a utilizar.
 
@@ -322,41 +265,16 @@ def tipo_analizador(analizador, ruta_archivo, valor_porcentaje):
         analizador (str): El tipo de analizador a utilizar.
         ruta_archivo (str): La ruta del archivo xlsx o xls.
         valor_porcentaje (int): El porcentaje mínimo para considerar un valor mayor.
+        limites (dict o None): Límites por orden del perfil de armónicos, None para no utilizar perfil.
 
     Retorna:
         tuple: Una tupla con la información general y los resultados de valores mayores.
     """
 
-    def manejador_sonel():
-        print("Analizando archivo con Sonel...")
-        filas = slice(None, None)
-        columnas = slice(3, None)
-        return sonel(ruta_archivo, filas, columnas, valor_porcentaje)
-
-    def manejador_aemc():
-        print("Analizando archivo con AEMC...")
-        filas = slice(1, None)
-        columnas = slice(2, None)
-        return aemc(ruta_archivo, filas, columnas, valor_porcentaje)
-
-    def manejar_metrel():
-        print("Analizando archivo con Metrel ...")
-        filas = slice(None, None)
-        columnas = slice(None, None)
-        return metrel(ruta_archivo, filas, columnas, valor_porcentaje)
-
-    def manejador_no_soportado():
+    # Obtener el formato del archivo del analizador
+    formato = formatos.obtener_formato(analizador, formatos.ARMONICO)
+    if formato is None:
         print("Analizador no soportado.")
         return None
 
-    # Diccionario de manejadores
-    manejadores = {
-        "SONEL": manejador_sonel,
-        "AEMC": manejador_aemc,
-        "METREL": manejar_metrel
-    }
-
-    # Seleccionar el manejador adecuado y si no se encuentra, mostrar un mensaje de error
-    manejador = manejadores.get(analizador, manejador_no_soportado)
-
-    return manejador()
+    return procesar(ruta_archivo, formato, valor_porcentaje, limites)
@@ -1,137 +1,31 @@
+import numpy as np
 import pandas as pd
-from calidad_producto.models import Analizador
-
-def leer_archivo(ruta_archivo, hoja=0, encabezado=None):
-    """
-    Lee un archivo xlsx o xls y devuelve un DataFrame.
-
-    Parámetros:
-    ruta_archivo (str): La ruta del archivo xlsx o xls.
-    hoja (str o int): Nombre o índice de la hoja a leer. Por defecto es 0 (primera hoja).
-    encabezado (int o None): La fila a utilizar como encabezado (0-indexado). None para no usar encabezado.
-
-    Retorna:
-    DataFrame o None: El DataFrame leído o None si ocurre un error.
-    """
-    try:
-        if ruta_archivo.endswith('.xlsx'):
-            df = pd.read_excel(ruta_archivo, header=encabezado,
-                               sheet_name=hoja, engine='openpyxl')
-        elif ruta_archivo.endswith('.xls'):
-            df = pd.read_excel(ruta_archivo, header=encabezado,
-                               sheet_name=hoja, engine='xlrd')
-        else:
-            print("El formato del archivo no es soportado.")
-            return None
-    except FileNotFoundError:
-        print("El archivo no se encontró.")
-        return None
-    except Exception as e:
-        print(f"Ocurrió un error al leer el archivo: {e}")
-        return None
-    return df
-
-
-def seleccionar_filas_columnas(df, filas, columnas):
-    """
-    Selecciona el rango de filas y columnas necesarias de un DataFrame.
-
-    Parámetros:
-    df (DataFrame): El DataFrame original.
-    filas (slice): Rango de filas a seleccionar.
-    columnas (slice): Rango de columnas a seleccionar.
-
-    Retorna:
-    DataFrame: El DataFrame resultante con las filas y columnas seleccionadas.
-    """
-    df_seleccionado = df.iloc[filas, columnas]
-    return df_seleccionado
-
-
-def ajustar_encabezado(df):
-    """
-    Ajusta el encabezado de un DataFrame.
-
-    Parámetros:
-    df (DataFrame): El DataFrame con los datos.
-
-    Retorna:
-    DataFrame: El DataFrame con el encabezado ajustado.
-    """
-    df.columns = df.iloc[0]
-    df = df[1:]  # Eliminar la primera fila
-    df.reset_index(drop=True, inplace=True)  # Reiniciar los índices
-    return df
-
-
-def normalizar_encabezados_sonel(df):
-    """
-    Normaliza los encabezados de un DataFrame eliminando sufijos específicos, reemplazando 'instant' por 'inst',
-    y eliminando el contenido dentro de los corchetes al final de los nombres de las columnas.
-
-    Parámetros:
-        df (DataFrame): El DataFrame con los datos.
-
-    Retorna:
-        DataFrame: El DataFrame con los encabezados normalizados.
-    """
-    # Eliminar sufijos como ". <número> min"
-    df.columns = df.columns.str.replace(r'\.\s*\d+\s*min', '', regex=True)
-
-    # Reemplazar 'instant' por 'inst'
-    df.columns = df.columns.str.replace(r'\binstant\b', 'inst', regex=True)
-
-    # Eliminar el contenido dentro de corchetes y los corchetes mismos
-    df.columns = df.columns.str.replace(r'\[.*?\]', '', regex=True)
-
-    # Eliminar posibles espacios en blanco al final de los nombres de las columnas
-    df.columns = df.columns.str.strip()
-
-    return df
-
-
-def normalizar_encabezados_aemc(df):
-    """
-    Normaliza los encabezados de un DataFrame eliminando sufijos específicos. Para el caso del analizador
-    AEMC, se eliminan los sufijos el encabezado de desbiacion, ya que tienen "()" y el contenido
-    de estas.
-
-    Parámetros:
-        df (DataFrame): El DataFrame con los datos.
-
-    Retorna:
-        DataFrame: El DataFrame con los encabezados normalizados.
-    """
-
-    # Eliminar el contenido dentro de los paréntesis y los paréntesis mismos
-    df.columns = df.columns.str.replace(r'\(.*?\)', '', regex=True)
-
-    # Eliminar posibles espacios en blanco al final de los nombres de las columnas
-    df.columns = df.columns.str.strip()
-
-    return df
-
-
-def normalizar_encabezados_metrel(df):
-    """
-    Normaliza los encabezados de un DataFrame eliminando sufijos específicos. Para el caso del analizador
-    AEMC, se eliminan los sufijos el encabezado, ya que tienen "()" y "[]" y el contenido
-    de estas.
-
-    Parámetros:
-        df (DataFrame): El DataFrame con los datos.
-
-    Retorna:
-        DataFrame: El DataFrame con los encabezados normalizados.
-    """
-
-    # Eliminar el contenido dentro de los corchetes y los corchetes mismos
-    df.columns = df.columns.str.replace(r'\[.*?\]', '', regex=True)
-
-    # Eliminar posibles espacios en blanco al final de los nombres de las columnas
-    df.columns = df.columns.str.strip()
-
-    return df
+from calidad_producto.models import Analizador, Limite
+from calidad_producto.resources import formatos, matriz, perfiles, series, tiempos, ventanas
+
+
+# Límites de cada métrica como (inferior, superior). Un valor excede el límite si es
+# menor al inferior o mayor al superior; None indica que no hay límite.
+LIMITES = {
+    'voltaje': (110.4, 129.5),
+    'flicker': (None, 1),
+    'vthd': (None, 8),
+    'desbalance': (None, 2),
+}
+
+# Métricas de la información: (clave de la información, clave de la columna, métrica)
+METRICAS = [
+    ('desviacion_voltaje_fase_a', 'voltaje_a', 'voltaje'),
+    ('desviacion_voltaje_fase_b', 'voltaje_b', 'voltaje'),
+    ('desviacion_voltaje_fase_c', 'voltaje_c', 'voltaje'),
+    ('flicker_fase_a', 'flicker_a', 'flicker'),
+    ('flicker_fase_b', 'flicker_b', 'flicker'),
+    ('flicker_fase_c', 'flicker_c', 'flicker'),
+    ('vthd_fase_a', 'vthd_a', 'vthd'),
+    ('vthd_fase_b', 'vthd_b', 'vthd'),
+    ('vthd_fase_c', 'vthd_c', 'vthd'),
+    ('desbalance', 'desbalance', 'desbalance'),
+]
 
 
 def calcular_porcentaje_desviacion(df, columna):
@@ -202,10 +96,103 @@ def calcular_porcentaje_vthd(df, columna):
     return round(porcentaje_vthd, 4)
 
 
-def obtener_informacion(df, valores_columna):
+def fuera_de_limite(valores, inferiores, superiores):
+    """
+    Obtiene la matriz booleana de los valores fuera de límite de todas las columnas.
+    """
+    return (valores > superiores) | (valores < inferiores)
+
+
+def calcular_excedencias(valores, inferiores, superiores, fuera=None):
+    """
+    Calcula en una sola pasada vectorizada los valores fuera de límite, los valores válidos
+    y el porcentaje de excedencia de todas las columnas.
+
+    Parámetros:
+        valores (ndarray): Matriz 2D de flotantes, una columna por métrica y fase.
+        inferiores (ndarray): Límite inferior de cada columna, -inf si no tiene.
+        superiores (ndarray): Límite superior de cada columna, inf si no tiene.
+        fuera (ndarray o None): Los valores fuera de límite ya obtenidos con fuera_de_limite.
+
+    Retorna:
+        tuple: Los conteos fuera de límite, los conteos válidos y los porcentajes por columna.
+    """
+    if fuera is None:
+        fuera = fuera_de_limite(valores, inferiores, superiores)
+    excedidos = fuera.sum(axis=0)
+    validos = valores.shape[0] - np.isnan(valores).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        porcentajes = excedidos / validos * 100
+
+    return excedidos, validos, porcentajes
+
+
+def obtener_informacion(df, valores_columna, limites=None):
     """
     Extrae la información relevante del DataFrame procesado.
 
+    Parámetros:
+        df (DataFrame): El DataFrame procesado.
+        valores_columna (dict): Diccionario con los nombres de las columnas.
+        limites (dict o None): Límites de cada métrica. None para utilizar LIMITES.
+
+    Retorna:
+        informacion (dict): Un diccionario con la información extraída. Si el índice del DataFrame es
+        la fecha y hora de las filas, incluye los porcentajes por ventana de tiempo en ventanas.CLAVE.
+    """
+    limites = limites or LIMITES
+
+    claves = []
+    columnas = []
+    inferiores = []
+    superiores = []
+
+    for clave, clave_columna, metrica in METRICAS:
+        columna = valores_columna.get(clave_columna)
+        if not columna:
+            continue
+
+        if columna not in df.columns:
+            print(f"La columna '{columna}' no se encuentra en el DataFrame.")
+            continue
+
+        inferior, superior = limites[metrica]
+        claves.append(clave)
+        columnas.append(columna)
+        inferiores.append(-np.inf if inferior is None else inferior)
+        superiores.append(np.inf if superior is None else superior)
+
+    if not claves:
+        return {}
+
+    # Todas las columnas seleccionadas en una sola matriz
+    valores = df[columnas].to_numpy(dtype=np.float64)
+
+    inferiores, superiores = np.array(inferiores), np.array(superiores)
+    fuera = fuera_de_limite(valores, inferiores, superiores)
+    _, _, porcentajes = calcular_excedencias(
+        valores, inferiores, superiores, fuera)
+
+    informacion = {
+        clave: round(float(porcentaje), 4)
+        for clave, porcentaje in zip(claves, porcentajes)
+    }
+
+    # Los mismos porcentajes en cada ventana de tiempo
+    if isinstance(df.index, pd.DatetimeIndex):
+        por_ventana = ventanas.calcular_ventanas(df.index, fuera, claves)
+        if por_ventana:
+            informacion[ventanas.CLAVE] = por_ventana
+
+    return informacion
+
+
+def obtener_informacion_por_columna(df, valores_columna):
+    """
+    Extrae la información relevante del DataFrame procesado, calculando cada métrica por separado.
+    Se conserva como referencia para comparar los resultados y tiempos de obtener_informacion.
+
     Parámetros:
         df (DataFrame): El DataFrame procesado.
         valores_columna (dict): Diccionario con los nombres de las columnas.
@@ -275,214 +262,91 @@ def calular_desbalance(df, columna):
     return round(porcentaje_desvalance, 4)
 
 
-def sonel(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), valores_columna=None):
+def procesar(ruta_archivo, formato, valores_columna, limites=None):
     """
-    Procesa un archivo Sonel y extrae la información relevante.
+    Procesa un archivo de tendencia según el formato de su analizador y extrae la información relevante.
 
     Parámetros:
         ruta_archivo (str): Ruta al archivo a procesar.
-        filas (slice): Filtro para seleccionar las filas deseadas.
-        columnas (slice): Filtro para seleccionar las columnas deseadas.
+        formato (Formato): El formato del archivo, obtenido de formatos.FORMATOS.
         valores_columna (dict): Diccionario con los nombres de las columnas.
+        limites (dict o None): Límites de cada métrica. None para utilizar LIMITES.
 
     Retorna:
         informacion (dict): Un diccionario con la información procesada.
     """
 
-    # Leer el archivo
-    df = leer_archivo(ruta_archivo)
-
-    # Si el dataframe es None, mostrar un mensaje de error y salir
-    if df is None:
-        print("No se pudo leer el archivo.")
-        return None
-
-    # Seleccionar las filas y columnas deseadas
-    df_seleccionado = seleccionar_filas_columnas(df, filas, columnas)
-
-    # Ajustar el encabezado del DataFrame
-    df_seleccionado = ajustar_encabezado(df_seleccionado)
-
-    # Normalizar enbacezados SONEL
-    df_seleccionado = normalizar_encabezados_sonel(df_seleccionado)
-
-    # Convertir los datos a tipo numérico y llenar NaN con 0
-    df_seleccionado = df_seleccionado.apply(
-        pd.to_numeric, errors='coerce').fillna(0)
-
-    # Obtener información procesada
-    informacion = obtener_informacion(df_seleccionado, valores_columna)
-
-    return informacion
-
-
-def aemc(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), valores_columna=None):
-    """
-    Procesa un archivo AEMC y extrae la información relevante.
-
-    Parámetros:
-        ruta_archivo (str): Ruta al archivo a procesar.
-        filas (slice): Filtro para seleccionar las filas deseadas.
-        columnas (slice): Filtro para seleccionar las columnas deseadas.
-        valores_columna (dict): Diccionario con los nombres de las columnas.
-
-    Retorna:
-        informacion (dict): Un diccionario con la información procesada.
-    """
+    tiempos.etiquetar(formato.clave)
 
-    # Leer el archivo
-    df = leer_archivo(ruta_archivo)
+    # Leer solamente las columnas que requiere el analizador
+    df_seleccionado = matriz.leer_matriz(
+        ruta_archivo, formato, requeridas=valores_columna.values())
 
     # Si el dataframe es None, mostrar un mensaje de error y salir
-    if df is None:
+    if df_seleccionado is None:
         print("No se pudo leer el archivo.")
         return None
 
-    # Seleccionar las filas y columnas deseadas
-    df_seleccionado = seleccionar_filas_columnas(df, filas, columnas)
+    # Guardar las series de los gráficos antes de reemplazar los valores vacíos
+    with tiempos.etapa('matriz'):
+        series.guardar_desde_dataframe(
+            ruta_archivo, df_seleccionado, series.series_tendencia(df_seleccionado, valores_columna))
 
-    # Ajustar el encabezado del DataFrame
-    df_seleccionado = ajustar_encabezado(df_seleccionado)
+    with tiempos.etapa('calculo'):
+        # Llenar NaN con 0
+        df_seleccionado = df_seleccionado.fillna(0)
 
-    # Eliminar la 1da y la 2era fila y resetear los indices
-    df_seleccionado = df_seleccionado.iloc[1:]
-    df_seleccionado = df_seleccionado.iloc[1:]
-    df_seleccionado.reset_index(drop=True, inplace=True)
-
-    # Normalizar encabezados AEMC
-    df_seleccionado = normalizar_encabezados_aemc(df_seleccionado)
-
-    # Convertir los datos a tipo numérico y llenar NaN con 0
-    df_seleccionado = df_seleccionado.apply(
-        pd.to_numeric, errors='coerce').fillna(0)
-
-    # Obtener la inoformación procesada
-    informacion = obtener_informacion(df_seleccionado, valores_columna)
+        # Obtener información procesada
+        informacion = obtener_informacion(
+            df_seleccionado, valores_columna, limites)
 
     return informacion
 
 
-def metrel(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), valores_columna=None):
+def obtener_valores_columna(analizador):
     """
-    Procesa un archivo METREL y extrae la información relevante.
-
-    Parámetros:
-        ruta_archivo (str): Ruta al archivo a procesar.
-        filas (slice): Filtro para seleccionar las filas deseadas.
-        columnas (slice): Filtro para seleccionar las columnas deseadas.
-        valores_columna (dict): Diccionario con los nombres de las columnas.
-
-    Retorna:
-        informacion (dict): Un diccionario con la información procesada.
+    Obtiene los valores de columna del analizador desde el registro de perfiles,
+    sin consultar la base de datos una vez cargado el registro.
     """
+    perfil = perfiles.obtener_perfil(nombre=analizador)
+    if perfil is None:
+        raise Analizador.DoesNotExist(
+            f"El analizador '{analizador}' no existe.")
+    return perfil.valores_columna()
 
-    # Leer el archivo
-    df = leer_archivo(ruta_archivo)
-
-    # Si el dataframe es None, mostrar un mensaje de error, caso contrario se procesa.
-    if df is None:
-        print("No se pudo leer el archivo.")
-        return None
-
-    # Seleccionar las filas y columnas deseadas
-    df_seleccionado = seleccionar_filas_columnas(df, filas, columnas)
-
-    # Ajustar el encabezado del DataFrame
-    df_seleccionado = ajustar_encabezado(df_seleccionado)
-
-    # Eliminar la 1da fila y resetear los indices
-    df_seleccionado = df_seleccionado.iloc[1:]
-    df_seleccionado.reset_index(drop=True, inplace=True)
-
-    # Normalizar encabezados METREL
-    df_seleccionado = normalizar_encabezados_metrel(df_seleccionado)
-
-    # Convertir los datos a tipo numérico y llenar NaN con 0
-    df_seleccionado = df_seleccionado.apply(
-        pd.to_numeric, errors='coerce').fillna(0)
-
-    # Obtener información procesada
-    informacion = obtener_informacion(df_seleccionado, valores_columna)
 
-    return informacion
-
-
-def obtener_valores_columna(analizador):
+def obtener_limites(tipo_id, voltaje_nominal):
     """
-    Obtiene los valores de columna del analizador desde la base de datos.
+    Obtiene los límites configurados para un tipo y un voltaje nominal. Si no existen,
+    se utilizan los límites por defecto de LIMITES.
     """
-    analizador_obj = Analizador.objects.get(nombre=analizador)
-    return {
-        'voltaje_a': analizador_obj.voltaje_a,
-        'voltaje_b': analizador_obj.voltaje_b,
-        'voltaje_c': analizador_obj.voltaje_c,
-        'flicker_a': analizador_obj.flicker_a,
-        'flicker_b': analizador_obj.flicker_b,
-        'flicker_c': analizador_obj.flicker_c,
-        'vthd_a': analizador_obj.vthd_a,
-        'vthd_b': analizador_obj.vthd_b,
-        'vthd_c': analizador_obj.vthd_c,
-        'desbalance': analizador_obj.desbalance
-    }
+    limite = Limite.objects.filter(
+        tipo_id=tipo_id, voltaje_nominal=voltaje_nominal).first()
+    return limite.como_limites() if limite is not None else LIMITES
 
 
-def tipo_analizador(analizador, ruta_archivo):
+def tipo_analizador(analizador, ruta_archivo, valores_columna=None, limites=None):
     """
     Función que selecciona el tipo de analizador a utilizar.
 
     Parámetros:
         analizador (str): El tipo de analizador a utilizar.
         ruta_archivo (str): La ruta del archivo xlsx o xls.
+        valores_columna (dict o None): Los nombres de las columnas del analizador. None para obtenerlos de la base de datos.
+        limites (dict o None): Límites de cada métrica. None para utilizar LIMITES.
 
     Retorna:
         tuple: Una tupla con la información general y los resultados de valores mayores.
     """
 
-    def manejador_sonel():
-        print("Analizando archivo con Sonel...")
-        filas = slice(None, None)
-        columnas = slice(2, None)
-
-        # Obtener los valores de las columnas del analizador
-        valores_columna = obtener_valores_columna(analizador)
-
-        # Obtener la información
-        return sonel(ruta_archivo, filas, columnas, valores_columna)
-
-    def manejador_aemc():
-        print("Analizando archivo con AEMC...")
-        filas = slice(1, None)
-        columnas = slice(2, None)
-
-        # Obtener los valores de las columnas del analizador
-        valores_columna = obtener_valores_columna(analizador)
-
-        # Obtener la información
-        return aemc(ruta_archivo, filas, columnas, valores_columna)
-
-    def manejador_metrel():
-        print("Analizando archivo con METREL...")
-        filas = slice(None, None)
-        columnas = slice(None, None)
-
-        # Obtener los valores de las columnas del analizador
-        valores_columna = obtener_valores_columna(analizador)
-
-        # Obtener la información
-        return metrel(ruta_archivo, filas, columnas, valores_columna)
-
-    def manejador_no_soportado():
+    # Obtener el formato del archivo del analizador
+    formato = formatos.obtener_formato(analizador, formatos.TENDENCIA)
+    if formato is None:
         print("Analizador no soportado.")
         return None
 
-    # Diccionario de manejadores
-    manejadores = {
-        "SONEL": manejador_sonel,
-        "AEMC": manejador_aemc,
-        "METREL": manejador_metrel
-    }
-
-    # Seleccionar el manejador adecuado y si no se encuentra, mostrar un mensaje de error
-    manejador = manejadores.get(analizador, manejador_no_soportado)
+    # Obtener los valores de las columnas del analizador
+    if valores_columna is None:
+        valores_columna = obtener_valores_columna(analizador)
 
-    return manejador()
\ No newline at end of file
+    return procesar(ruta_archivo, formato, valores_columna, limites)
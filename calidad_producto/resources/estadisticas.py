@@ -0,0 +1,85 @@
+import numpy as np
+
+
+# Percentil que se calcula por orden y fase de los armónicos
+PERCENTIL = 95
+
+# Clave de la información de armónicos donde se guardan las estadísticas por columna
+CLAVE = 'estadisticas'
+
+
+def percentil_columnas(matriz, percentil=PERCENTIL):
+    """
+    Calcula un percentil de todas las columnas de una matriz a la vez. np.partition solamente
+    ordena alrededor de las posiciones necesarias, y el resultado se interpola entre las dos
+    posiciones más cercanas, igual que np.percentile.
+
+    Parámetros:
+        matriz (ndarray): Matriz de dos dimensiones con al menos una fila y sin valores vacíos.
+        percentil (float): El percentil a calcular, entre 0 y 100.
+
+    Retorna:
+        ndarray: El percentil de cada columna.
+    """
+    posicion = (matriz.shape[0] - 1) * percentil / 100
+    inferior = int(np.floor(posicion))
+    superior = int(np.ceil(posicion))
+
+    particion = np.partition(matriz, sorted({inferior, superior}), axis=0)
+    return particion[inferior] + (particion[superior] - particion[inferior]) * (posicion - inferior)
+
+
+def percentil_columnas_vacios(matriz, validos, percentil=PERCENTIL):
+    """
+    Calcula un percentil de todas las columnas de una matriz con valores vacíos, igual que
+    np.nanpercentile. Cada columna tiene otra cantidad de valores, por eso la matriz se ordena
+    completa (los NaN quedan al final) y se toman las posiciones de cada columna.
+
+    Parámetros:
+        matriz (ndarray): Matriz de dos dimensiones.
+        validos (ndarray): Cantidad de valores no vacíos de cada columna, al menos uno.
+        percentil (float): El percentil a calcular, entre 0 y 100.
+
+    Retorna:
+        ndarray: El percentil de cada columna.
+    """
+    posicion = (validos - 1) * percentil / 100
+    inferior = np.floor(posicion).astype(np.int64)
+    superior = np.ceil(posicion).astype(np.int64)
+
+    ordenada = np.sort(matriz, axis=0)
+    valores_inferiores = np.take_along_axis(ordenada, inferior[None, :], axis=0)[0]
+    valores_superiores = np.take_along_axis(ordenada, superior[None, :], axis=0)[0]
+    return valores_inferiores + (valores_superiores - valores_inferiores) * (posicion - inferior)
+
+
+def calcular_estadisticas(matriz, percentil=PERCENTIL):
+    """
+    Calcula el percentil, el máximo y el promedio de todas las columnas de una matriz. Los
+    valores vacíos (NaN) no se consideran, una columna sin valores no tiene estadísticas.
+
+    Parámetros:
+        matriz (ndarray): Matriz de dos dimensiones con al menos una fila.
+        percentil (float): El percentil a calcular, entre 0 y 100.
+
+    Retorna:
+        tuple: Arreglos con el percentil, el máximo y el promedio de cada columna, NaN en las
+        columnas sin valores.
+    """
+    vacios = np.isnan(matriz)
+    if not vacios.any():
+        return percentil_columnas(matriz, percentil), matriz.max(axis=0), matriz.mean(axis=0)
+
+    validos = matriz.shape[0] - vacios.sum(axis=0)
+    con_valores = validos > 0
+
+    percentiles = np.full(matriz.shape[1], np.nan)
+    maximos = np.full(matriz.shape[1], np.nan)
+    promedios = np.full(matriz.shape[1], np.nan)
+    if con_valores.any():
+        columnas = matriz[:, con_valores]
+        percentiles[con_valores] = percentil_columnas_vacios(columnas, validos[con_valores], percentil)
+        maximos[con_valores] = np.where(vacios[:, con_valores], -np.inf, columnas).max(axis=0)
+        promedios[con_valores] = np.where(vacios[:, con_valores], 0, columnas).sum(axis=0) / validos[con_valores]
+
+    return percentiles, maximos, promedios
@@ -0,0 +1,98 @@
+import csv
+from openpyxl import Workbook
+from django.utils.timezone import localtime
+from calidad_producto.models import ResultadoMetrica
+
+
+# Cantidad de filas que se obtienen de la base de datos en cada bloque
+TAMANO_BLOQUE = 2000
+
+# Columnas de la exportación: (encabezado, campo de ResultadoMetrica)
+COLUMNAS = [
+    ('archivo_id', 'archivo_id'),
+    ('archivo', 'archivo__archivo'),
+    ('subido_el', 'subido_el'),
+    ('categoria', 'archivo__categoria__nombre'),
+    ('tipo', 'archivo__tipo__nombre'),
+    ('analizador', 'archivo__analizador__nombre'),
+    ('voltaje_nominal', 'archivo__voltaje_nominal'),
+    ('metrica', 'metrica'),
+    ('fase', 'fase'),
+    ('orden', 'orden'),
+    ('columna', 'columna'),
+    ('valor', 'valor'),
+    ('conteo', 'conteo'),
+]
+
+ENCABEZADO = [encabezado for encabezado, _ in COLUMNAS]
+
+# Posición de la fecha de subida en cada fila
+POSICION_FECHA = ENCABEZADO.index('subido_el')
+
+
+def filas_resultados(archivos, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recorre los resultados por métrica de los archivos con un cursor del servidor, sin cargar
+    todas las filas en memoria.
+
+    Parámetros:
+        archivos (QuerySet): Los archivos a exportar.
+        tamano_bloque (int): Cantidad de filas que se obtienen en cada bloque.
+
+    Retorna:
+        generator: Las filas como listas de valores, en el orden de ENCABEZADO.
+    """
+    resultados = ResultadoMetrica.objects.filter(
+        archivo__in=archivos.values('id')
+    ).order_by('archivo_id', 'id').values_list(*[campo for _, campo in COLUMNAS])
+
+    for fila in resultados.iterator(chunk_size=tamano_bloque):
+        fila = list(fila)
+        fila[POSICION_FECHA] = localtime(
+            fila[POSICION_FECHA]).replace(tzinfo=None)
+        yield fila
+
+
+class Eco:
+    """
+    Archivo que devuelve lo que se escribe en él, para que csv.writer genere cada línea
+    sin acumularla en un búfer.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(filas):
+    """
+    Genera el contenido CSV línea por línea, comenzando por el encabezado. La primera línea
+    incluye la marca BOM para que Excel reconozca la codificación UTF-8.
+
+    Parámetros:
+        filas (iterable): Las filas obtenidas con filas_resultados.
+
+    Retorna:
+        generator: Las líneas del CSV.
+    """
+    escritor = csv.writer(Eco())
+    yield '\ufeff' + escritor.writerow(ENCABEZADO)
+    for fila in filas:
+        fila[POSICION_FECHA] = fila[POSICION_FECHA].isoformat(sep=' ')
+        yield escritor.writerow(fila)
+
+
+def escribir_xlsx(filas, destino):
+    """
+    Escribe las filas en un libro xlsx con el modo de solo escritura de openpyxl, que no
+    conserva las celdas en memoria.
+
+    Parámetros:
+        filas (iterable): Las filas obtenidas con filas_resultados.
+        destino (str o archivo): La ruta o el archivo donde se guarda el libro.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Resultados')
+    hoja.append(ENCABEZADO)
+    for fila in filas:
+        hoja.append(fila)
+    libro.save(destino)
@@ -0,0 +1,220 @@
+import re
+from dataclasses import dataclass, field
+from calidad_producto.resources import lectura
+
+
+# Categorías de los archivos (ids de Categoria)
+ARMONICO = 1
+TENDENCIA = 2
+
+# Clave de la información de armónicos con el conteo y el porcentaje de las columnas reportadas.
+# Las columnas se guardan aparte de las estadísticas y las ventanas, así sus nombres no se mezclan
+COLUMNAS_ARMONICO = 'columnas'
+
+# Cantidad de filas que se leen para detectar el formato de un archivo
+FILAS_DETECCION = 8
+
+
+def regla(patron, reemplazo=''):
+    """
+    Crea una regla de normalización de encabezados con la expresión regular ya compilada.
+    """
+    return re.compile(patron), reemplazo
+
+
+# Reglas de normalización de los encabezados
+REGLAS_SONEL = (
+    # Eliminar sufijos como ". <número> min"
+    regla(r'\.\s*\d+\s*min'),
+    # Reemplazar 'instant' por 'inst'
+    regla(r'\binstant\b', 'inst'),
+    # Eliminar el contenido dentro de corchetes y los corchetes mismos
+    regla(r'\[.*?\]'),
+)
+
+REGLAS_AEMC = (
+    # Eliminar el contenido dentro de los paréntesis y los paréntesis mismos
+    regla(r'\(.*?\)'),
+)
+
+REGLAS_METREL = (
+    # Eliminar el contenido dentro de los corchetes y los corchetes mismos
+    regla(r'\[.*?\]'),
+)
+
+# Firmas para detectar el fabricante en las primeras filas del archivo
+FIRMA_SONEL = (re.compile(r'(?i)\bsonel\b|\bavg\.?\s*\d+\s*min\b'),)
+FIRMA_AEMC = (re.compile(r'(?i)\baemc\b|\bpowerpad\b|\(\s*[a-z%]*\s*\)\s*$'),)
+# Además del nombre, METREL se reconoce por la fase pegada al nombre de la columna, por ejemplo 'U1 Rms' y 'Pst1'
+FIRMA_METREL = (re.compile(r'(?i)\bmetrel\b|\bpowerq\b|^\s*(u\d\s*rms|pst\d|uthd\d)\b'),)
+
+# Firmas para distinguir el archivo de tendencia del archivo de armónicos
+FIRMA_TENDENCIA = re.compile(r'(?i)\bpst\d?\b|flicker|\b[uv]?thd\d?\b|unbalance|desbalance')
+FIRMA_ARMONICO = re.compile(r'(?i)\b(h|harm\w*)\s*0?\d{1,2}\b')
+
+
+@dataclass(frozen=True)
+class Formato:
+    """
+    Describe cómo se recorta y normaliza el archivo exportado por un analizador.
+
+    Atributos:
+        clave (str): Identificador único del formato.
+        analizador (str): Nombre del analizador, igual que en Analizador.nombre.
+        categoria (int): ARMONICO o TENDENCIA.
+        fila_encabezado (int): Fila donde se encuentra el encabezado (0-indexado).
+        columnas (slice): Rango de columnas con mediciones.
+        filas_descartadas (int): Filas a eliminar después del encabezado.
+        reglas (tuple): Reglas (expresión compilada, reemplazo) para normalizar los encabezados.
+        recortar (bool): Eliminar espacios al inicio y al final de los encabezados.
+        firma (tuple): Expresiones que identifican al fabricante en las primeras filas.
+        fechas (tuple): Posiciones de la columna de fecha y de la columna de hora, o de una sola
+            columna con ambas. Vacío si el archivo no tiene fechas.
+    """
+    clave: str
+    analizador: str
+    categoria: int
+    fila_encabezado: int
+    columnas: slice
+    filas_descartadas: int = 0
+    reglas: tuple = field(default=(), repr=False)
+    recortar: bool = True
+    firma: tuple = field(default=(), repr=False)
+    fechas: tuple = ()
+
+    @property
+    def filas(self):
+        """
+        Rango de filas a seleccionar, la primera fila es el encabezado.
+        """
+        return slice(self.fila_encabezado or None, None)
+
+    def normalizar_nombre(self, nombre):
+        """
+        Normaliza el nombre de una columna. Los nombres que no son texto no se pueden normalizar.
+        """
+        if not self.reglas and not self.recortar:
+            return nombre
+        if not isinstance(nombre, str):
+            return None
+        for patron, reemplazo in self.reglas:
+            nombre = patron.sub(reemplazo, nombre)
+        return nombre.strip() if self.recortar else nombre
+
+    def normalizar_nombres(self, nombres):
+        """
+        Normaliza una lista de nombres de columnas.
+        """
+        return [self.normalizar_nombre(nombre) for nombre in nombres]
+
+    def normalizar(self, df):
+        """
+        Normaliza los encabezados de un DataFrame.
+        """
+        df.columns = self.normalizar_nombres(list(df.columns))
+        return df
+
+
+# Registro de formatos. Para agregar un fabricante o una variante de firmware basta con agregar su descriptor.
+FORMATOS = (
+    Formato('SONEL-tendencia', 'SONEL', TENDENCIA, 0, slice(2, None),
+            reglas=REGLAS_SONEL, firma=FIRMA_SONEL, fechas=(0, 1)),
+    Formato('AEMC-tendencia', 'AEMC', TENDENCIA, 1, slice(2, None),
+            filas_descartadas=2, reglas=REGLAS_AEMC, firma=FIRMA_AEMC, fechas=(0, 1)),
+    Formato('METREL-tendencia', 'METREL', TENDENCIA, 0, slice(None, None),
+            filas_descartadas=1, reglas=REGLAS_METREL, firma=FIRMA_METREL),
+    Formato('SONEL-armonico', 'SONEL', ARMONICO, 0, slice(3, None),
+            reglas=REGLAS_SONEL, firma=FIRMA_SONEL, fechas=(0, 1)),
+    Formato('AEMC-armonico', 'AEMC', ARMONICO, 1, slice(2, None),
+            filas_descartadas=1, recortar=False, firma=FIRMA_AEMC, fechas=(0, 1)),
+    Formato('METREL-armonico', 'METREL', ARMONICO, 0, slice(None, None),
+            recortar=False, firma=FIRMA_METREL),
+)
+
+
+def obtener_formato(analizador, categoria):
+    """
+    Obtiene el formato de un analizador para una categoría.
+
+    Parámetros:
+        analizador (str): Nombre del analizador.
+        categoria (int): ARMONICO o TENDENCIA.
+
+    Retorna:
+        Formato o None: El formato o None si el analizador no está soportado.
+    """
+    for formato in FORMATOS:
+        if formato.analizador == analizador and formato.categoria == categoria:
+            return formato
+    return None
+
+
+def puntuar_formato(formato, filas):
+    """
+    Calcula qué tan bien coinciden las primeras filas de un archivo con un formato.
+
+    Parámetros:
+        formato (Formato): El formato a evaluar.
+        filas (list): Las primeras filas del archivo.
+
+    Retorna:
+        int: La puntuación, 0 si el archivo no coincide con el formato.
+    """
+    if len(filas) <= formato.fila_encabezado:
+        return 0
+
+    encabezado = [nombre for nombre in formato.normalizar_nombres(
+        filas[formato.fila_encabezado][formato.columnas]) if nombre]
+    encabezado = [nombre for nombre in encabezado if isinstance(nombre, str)]
+    if not encabezado:
+        return 0
+
+    # El encabezado debe corresponder a la categoría del formato
+    firma_categoria = FIRMA_TENDENCIA if formato.categoria == TENDENCIA else FIRMA_ARMONICO
+    coincidencias_categoria = sum(
+        1 for nombre in encabezado if firma_categoria.search(nombre))
+    if not coincidencias_categoria:
+        return 0
+
+    # El fabricante se busca en todas las celdas de texto de las primeras filas
+    textos = [str(valor) for fila in filas for valor in fila
+              if isinstance(valor, str)]
+    coincidencias_firma = sum(
+        1 for patron in formato.firma if any(patron.search(texto) for texto in textos))
+
+    return coincidencias_firma * 1000 + coincidencias_categoria
+
+
+def detectar_formato(archivo, categoria=None, hoja=0):
+    """
+    Detecta el formato de un archivo leyendo solamente sus primeras filas.
+
+    Parámetros:
+        archivo (str o archivo): La ruta o el archivo subido xlsx o xls.
+        categoria (int o None): Limitar la detección a ARMONICO o TENDENCIA.
+        hoja (str o int): Nombre o índice de la hoja a leer.
+
+    Retorna:
+        Formato o None: El formato con mayor puntuación o None si ninguno coincide.
+    """
+    filas = []
+    try:
+        for fila in lectura.iterar_filas(archivo, hoja):
+            filas.append(fila)
+            if len(filas) >= FILAS_DETECCION:
+                break
+    except Exception as e:
+        print(f"No se pudo detectar el formato del archivo: {e}")
+        return None
+    finally:
+        if hasattr(archivo, 'seek'):
+            archivo.seek(0)
+
+    candidatos = [formato for formato in FORMATOS
+                  if categoria is None or formato.categoria == categoria]
+    puntuaciones = [(puntuar_formato(formato, filas), formato)
+                    for formato in candidatos]
+    puntuacion, formato = max(puntuaciones, key=lambda par: par[0],
+                              default=(0, None))
+
+    return formato if puntuacion > 0 else None
@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from calidad_producto.models import Archivo
+from calidad_producto.resources import estadisticas, ventanas
+from calidad_producto.resources.formatos import ARMONICO, COLUMNAS_ARMONICO, TENDENCIA
+
+
+# Plantillas del fragmento de detalle de cada categoría: {categoria_id: plantilla}
+PLANTILLAS = {
+    ARMONICO: 'armonicos/armonico_tabla.html',
+    TENDENCIA: 'tendencias/tendencia_tabla.html',
+}
+
+
+def clave_detalle(archivo_id):
+    """
+    Obtiene la clave en la caché del fragmento de detalle de un archivo.
+    """
+    return f'detalle_archivo:{archivo_id}'
+
+
+def version_resultado(version_depuracion, actualizado_el):
+    """
+    Obtiene la versión del resultado de un archivo, cambia cada vez que se guarda su información.
+    """
+    return f'{version_depuracion}-{int(actualizado_el.timestamp() * 10 ** 6) if actualizado_el else 0}'
+
+
+def formatear_tendencia(informacion):
+    """
+    Formatea el nombre de la columna, eliminando los "_", capitalizando, y redondeando los valores.
+    """
+    return {
+        columna.replace('_', ' ').capitalize(): f"{round(datos, 4)}" if isinstance(datos, (int, float)) else datos
+        for columna, datos in informacion.items()
+    }
+
+
+def ordenar_estadisticas(informacion):
+    """
+    Obtiene las estadísticas por orden y fase de la información de armónicos, ordenadas por orden y fase.
+    """
+    por_columna = informacion.get(estadisticas.CLAVE, {})
+    return sorted(
+        ({'columna': columna, **datos} for columna, datos in por_columna.items()),
+        key=lambda datos: (datos['orden'], datos['fase']))
+
+
+def obtener_detalle(archivo_id, categoria_id):
+    """
+    Obtiene el fragmento HTML con el detalle de un archivo desde la caché. Primero se consulta
+    solamente la versión del resultado, la información se lee y se formatea si el fragmento no
+    está en la caché o corresponde a una versión anterior.
+
+    Parámetros:
+        archivo_id (int): El id del archivo.
+        categoria_id (int): La categoría que se espera del archivo.
+
+    Retorna:
+        str o None: El fragmento HTML, o None si el archivo no existe.
+    """
+    registro = Archivo.objects.filter(id=archivo_id, categoria_id=categoria_id).values(
+        'version_depuracion', 'actualizado_el').first()
+    if registro is None:
+        return None
+
+    version = version_resultado(
+        registro['version_depuracion'], registro['actualizado_el'])
+
+    # La caché local es de cada proceso, por eso se comprueba la versión además de invalidarla
+    guardado = cache.get(clave_detalle(archivo_id))
+    if guardado is not None and guardado[0] == version:
+        return mark_safe(guardado[1])
+
+    archivo = Archivo.objects.only('archivo', 'informacion').get(id=archivo_id)
+
+    # Mostrar solamente el nombre del archivo, sin el "archivo/" al inicio
+    nombre_archivo = archivo.archivo.url.split('/')[-1]
+
+    # Los resultados por ventana de tiempo no se muestran en la tabla
+    estadisticas_armonicos = []
+    if categoria_id == TENDENCIA:
+        archivo_info = formatear_tendencia({clave: valor for clave, valor in archivo.informacion.items()
+                                            if clave != ventanas.CLAVE})
+    else:
+        archivo_info = archivo.informacion.get(COLUMNAS_ARMONICO, {})
+        estadisticas_armonicos = ordenar_estadisticas(archivo.informacion)
+
+    fragmento = render_to_string(PLANTILLAS[categoria_id], {
+        'nombre_archivo': nombre_archivo, 'archivo_info': archivo_info,
+        'estadisticas': estadisticas_armonicos})
+    cache.set(clave_detalle(archivo_id), (version, fragmento))
+
+    return mark_safe(fragmento)
+
+
+def invalidar_detalles(archivos_id):
+    """
+    Elimina de la caché los fragmentos de detalle de los archivos, cuando cambia su información
+    o se eliminan.
+    """
+    cache.delete_many([clave_detalle(archivo_id) for archivo_id in archivos_id])
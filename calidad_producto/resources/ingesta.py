@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import time
+import hashlib
+import unicodedata
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from calidad_producto.models import Archivo
+from calidad_producto.resources import formatos, matriz, perfiles, tiempos
+from calidad_producto.resources.procesamiento import CALCULOS, VERSION_DEPURACION, firma_limites
+from calidad_producto.resources.resultados import guardar_resultados
+
+
+# Extensiones de los archivos que se ingieren
+EXTENSIONES = ('.xlsx', '.xls')
+
+# Palabras de la ruta que indican la categoría del archivo, en singular y plural
+PALABRAS_CATEGORIA = {
+    'armonico': formatos.ARMONICO,
+    'armonicos': formatos.ARMONICO,
+    'tendencia': formatos.TENDENCIA,
+    'tendencias': formatos.TENDENCIA,
+}
+
+# Separadores de las palabras dentro de una carpeta o del nombre de un archivo
+SEPARADOR_PALABRAS = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar_texto(texto):
+    """
+    Convierte un texto a minúsculas y sin tildes para comparar las partes de una ruta.
+    """
+    texto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter)).lower()
+
+
+def buscar_archivos(ruta):
+    """
+    Recorre un árbol de carpetas y obtiene los libros que contiene, ordenados por su ruta
+    relativa para que cada ejecución los recorra en el mismo orden.
+
+    Parámetros:
+        ruta (str): La carpeta a recorrer.
+
+    Retorna:
+        list: Las rutas relativas de los archivos xlsx o xls.
+    """
+    encontrados = []
+    for carpeta, subcarpetas, archivos in os.walk(ruta):
+        # No entrar en carpetas ocultas
+        subcarpetas[:] = [nombre for nombre in subcarpetas if not nombre.startswith('.')]
+
+        for nombre in archivos:
+            if nombre.startswith(('.', '~$')) or not nombre.lower().endswith(EXTENSIONES):
+                continue
+            encontrados.append(os.path.relpath(
+                os.path.join(carpeta, nombre), ruta))
+
+    return sorted(encontrados)
+
+
+def palabras_ruta(ruta_relativa):
+    """
+    Obtiene las palabras normalizadas de cada carpeta y del nombre del archivo sin su extensión,
+    por ejemplo "Tendencias/SONEL_PQM-702/punto_1.xlsx" da [('tendencias',), ('sonel', 'pqm', '702'),
+    ('punto', '1')].
+    """
+    partes = os.path.normpath(os.path.splitext(ruta_relativa)[0]).split(os.sep)
+    return [tuple(palabra for palabra in SEPARADOR_PALABRAS.split(normalizar_texto(parte)) if palabra)
+            for parte in partes]
+
+
+def buscar_en_ruta(partes, nombres):
+    """
+    Busca los nombres que aparecen como palabras completas en alguna parte de la ruta. Un nombre
+    de varias palabras debe aparecer con sus palabras seguidas, así 'sonel' no coincide con
+    'sonelx' ni 'monofasico' con una carpeta que solamente la contiene como parte de otra palabra.
+
+    Parámetros:
+        partes (list): Las palabras de cada parte de la ruta, obtenidas con palabras_ruta.
+        nombres (dict): Los valores por su nombre normalizado.
+
+    Retorna:
+        El valor del nombre encontrado, None si no se encontró o si la ruta indica valores distintos.
+    """
+    encontrados = set()
+    for nombre, valor in nombres.items():
+        buscadas = tuple(palabra for palabra in SEPARADOR_PALABRAS.split(nombre) if palabra)
+        if not buscadas:
+            continue
+        if any(palabras[inicio:inicio + len(buscadas)] == buscadas
+               for palabras in partes for inicio in range(len(palabras) - len(buscadas) + 1)):
+            encontrados.add(valor)
+
+    # Con valores distintos la ruta es ambigua, se deja detectar del contenido o de las opciones
+    return encontrados.pop() if len(encontrados) == 1 else None
+
+
+def inferir_desde_ruta(ruta_relativa, tipos, analizadores):
+    """
+    Infiere la categoría, el tipo y el analizador de un archivo a partir de las carpetas y
+    el nombre del archivo, por ejemplo "Tendencias/Trifásico/SONEL/punto_1.xlsx". Los nombres
+    deben aparecer como palabras completas de una carpeta o del nombre del archivo.
+
+    Parámetros:
+        ruta_relativa (str): La ruta del archivo dentro de la carpeta ingerida.
+        tipos (dict): Los ids de los tipos por su nombre normalizado.
+        analizadores (dict): Los nombres de los analizadores por su nombre normalizado.
+
+    Retorna:
+        tuple: (categoria_id, tipo_id, nombre del analizador), None en los que no se encontraron
+        o son ambiguos.
+    """
+    partes = palabras_ruta(ruta_relativa)
+
+    categoria_id = buscar_en_ruta(partes, PALABRAS_CATEGORIA)
+    tipo_id = buscar_en_ruta(partes, tipos)
+    analizador = buscar_en_ruta(partes, analizadores)
+
+    return categoria_id, tipo_id, analizador
+
+
+def calcular_hash_ruta(ruta_archivo):
+    """
+    Calcula el SHA-256 de un archivo del disco, leyéndolo por partes.
+    """
+    sha256 = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as archivo:
+        for parte in iter(lambda: archivo.read(1024 * 1024), b''):
+            sha256.update(parte)
+    return sha256.hexdigest()
+
+
+def descartar_archivo(nombre):
+    """
+    Elimina la copia de un archivo que no se guardó, junto con su matriz y sus series.
+    """
+    ruta_guardada = default_storage.path(nombre)
+    default_storage.delete(nombre)
+    matriz.eliminar_matriz(ruta_guardada)
+
+
+def ingerir_archivo(ruta_archivo, hash_sha256, categoria_id, analizador, limites, valor_porcentaje):
+    """
+    Copia un archivo a la carpeta de archivos y calcula su información, sin crear el Archivo.
+    Se ejecuta en los procesos del grupo, cada uno con su propia conexión a la base de datos.
+    El archivo solamente se copia si su contenido no se ingirió antes en la misma categoría.
+
+    Parámetros:
+        ruta_archivo (str): La ruta del archivo original.
+        hash_sha256 (str): El hash del contenido, calculado con calcular_hash_ruta.
+        categoria_id (int o None): La categoría inferida de la ruta, None para detectarla.
+        analizador (str o None): El nombre del analizador inferido de la ruta, None para detectarlo.
+        limites (dict): Los límites de cada categoría, {categoria_id: límites}, para el tipo del archivo.
+        valor_porcentaje (float): El porcentaje de los armónicos.
+
+    Retorna:
+        dict o None: Los datos del archivo, None si su contenido ya se ingirió en la misma categoría.
+    """
+    # Detectar el analizador o la categoría a partir del contenido
+    if analizador is None or categoria_id is None:
+        formato = formatos.detectar_formato(ruta_archivo, categoria_id)
+        if formato is None:
+            raise ValueError('No se pudo detectar el analizador del archivo.')
+        analizador = analizador or formato.analizador
+        categoria_id = categoria_id or formato.categoria
+
+    perfil = perfiles.obtener_perfil(nombre=analizador)
+    if perfil is None:
+        raise ValueError(f'El analizador {analizador} no existe.')
+
+    # Una nueva ejecución sobre la misma carpeta no duplica los archivos
+    if Archivo.objects.filter(hash_sha256=hash_sha256, categoria_id=categoria_id).exists():
+        return None
+
+    # Guardar una copia en la carpeta de la categoría, el almacenamiento evita los nombres repetidos
+    nombre = Archivo.archivo.field.generate_filename(
+        Archivo(categoria_id=categoria_id), os.path.basename(ruta_archivo))
+    with open(ruta_archivo, 'rb') as origen:
+        nombre = default_storage.save(nombre, File(origen))
+    ruta_guardada = default_storage.path(nombre)
+
+    porcentaje = valor_porcentaje if categoria_id == formatos.ARMONICO else None
+
+    try:
+        with tiempos.medir_depuracion() as medidos:
+            informacion = CALCULOS[categoria_id](
+                perfil.nombre, ruta_guardada, porcentaje, perfil.valores_columna(), limites[categoria_id])
+        if informacion is None:
+            raise ValueError('No se pudo obtener la información del archivo.')
+    except Exception:
+        descartar_archivo(nombre)
+        raise
+
+    return {
+        'archivo': nombre,
+        'hash_sha256': hash_sha256,
+        'categoria_id': categoria_id,
+        'analizador_id': perfil.id,
+        'informacion': informacion,
+        'firma_limites': firma_limites(limites[categoria_id]),
+        'valor_porcentaje': porcentaje,
+        'filas': matriz.contar_filas(ruta_guardada),
+        'tiempos': medidos,
+    }
+
+
+def guardar_lote(datos, voltaje_nominal, lote=500, perfil_armonico_id=None):
+    """
+    Crea los Archivos de un lote con una inserción en bloque y guarda sus resultados por
+    métrica en la misma transacción. Si la transacción falla, se eliminan las copias de los
+    archivos para no dejarlas sin su Archivo.
+
+    Parámetros:
+        datos (list): Los datos obtenidos con ingerir_archivo, con el 'tipo_id' de cada archivo.
+        voltaje_nominal (float): El voltaje nominal de los archivos.
+        lote (int): Cantidad de archivos por cada inserción.
+        perfil_armonico_id (int o None): El perfil de armónicos con el que se depuraron los armónicos.
+
+    Retorna:
+        list: Los archivos creados.
+    """
+    archivos = [
+        Archivo(
+            archivo=dato['archivo'],
+            categoria_id=dato['categoria_id'],
+            tipo_id=dato['tipo_id'],
+            analizador_id=dato['analizador_id'],
+            informacion=dato['informacion'],
+            hash_sha256=dato['hash_sha256'],
+            voltaje_nominal=voltaje_nominal,
+            valor_porcentaje=dato['valor_porcentaje'],
+            perfil_armonico_id=perfil_armonico_id if dato['categoria_id'] == formatos.ARMONICO else None,
+            version_depuracion=VERSION_DEPURACION,
+            firma_limites=dato['firma_limites'],
+            tiempos=dato['tiempos'],
+        )
+        for dato in datos
+    ]
+
+    try:
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            Archivo.objects.bulk_create(archivos, batch_size=lote)
+            guardar_resultados(archivos)
+
+            tiempos.repartir(archivos, 'guardado', time.perf_counter() - inicio)
+            tiempos.registrar_tiempos(archivos)
+    except Exception:
+        for dato in datos:
+            descartar_archivo(dato['archivo'])
+        raise
+
+    return archivos
+
+
+def leer_punto_control(ruta_control, ruta):
+    """
+    Obtiene el avance de una ingesta anterior de la misma carpeta: la última ruta relativa
+    guardada, las rutas que fallaron y los totales. None si no existe.
+    """
+    if not os.path.exists(ruta_control):
+        return None
+    with open(ruta_control, encoding='utf-8') as archivo:
+        control = json.load(archivo)
+    if control.get('ruta') != ruta:
+        return None
+    return {
+        'ultimo': control['ultimo'],
+        'fallidos': control.get('fallidos', []),
+        'totales': control.get('totales', {}),
+    }
+
+
+def guardar_punto_control(ruta_control, ruta, ultimo, totales, fallidos=()):
+    """
+    Guarda la última ruta relativa ingerida, las rutas que fallaron para reintentarlas en la
+    siguiente ejecución y los totales. Se escribe en un archivo temporal y se reemplaza, así una
+    interrupción no deja el punto de control incompleto.
+    """
+    temporal = f'{ruta_control}.{os.getpid()}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump({'ruta': ruta, 'ultimo': ultimo, 'fallidos': sorted(fallidos), 'totales': totales}, archivo)
+    os.replace(temporal, ruta_control)
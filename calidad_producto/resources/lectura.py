@@ -0,0 +1,378 @@
+import math
+import time
+from datetime import date, datetime, time as hora_dia, timedelta
+import numpy as np
+import pandas as pd
+import xlrd
+from openpyxl import load_workbook
+from pandas.errors import EmptyDataError
+from calidad_producto.resources import tiempos
+
+
+# Cantidad de filas que se reservan por bloque al leer el archivo
+TAMANO_BLOQUE = 4096
+
+# Formatos de las fechas y horas guardadas como texto, en el orden en que se prueban
+FORMATOS_FECHA = ('%d/%m/%Y', '%Y-%m-%d', '%d.%m.%Y', '%d-%m-%Y')
+FORMATOS_HORA = ('%H:%M:%S', '%H:%M', '%H:%M:%S.%f')
+FORMATOS_FECHA_HORA = tuple(f'{fecha} {hora}' for fecha in FORMATOS_FECHA for hora in FORMATOS_HORA)
+
+# Las fechas y horas se guardan como segundos desde EPOCA, sin zona horaria
+EPOCA = datetime(1970, 1, 1)
+
+# Las fechas numéricas de Excel son días desde 1899-12-30, 25569 corresponde a EPOCA
+DIA_EPOCA_EXCEL = 25569
+SEGUNDOS_DIA = 86400
+
+
+def iterar_filas(ruta_archivo, hoja=0):
+    """
+    Recorre las filas de un archivo xlsx o xls sin cargar toda la hoja en memoria.
+
+    Parámetros:
+        ruta_archivo (str o archivo): La ruta o el archivo abierto (por ejemplo un archivo subido) xlsx o xls.
+        hoja (str o int): Nombre o índice de la hoja a leer. Por defecto es 0 (primera hoja).
+
+    Retorna:
+        generator: Las filas de la hoja como tuplas de valores, las celdas vacías son None.
+    """
+    nombre = ruta_archivo if isinstance(ruta_archivo, str) else ruta_archivo.name
+
+    if nombre.endswith('.xlsx'):
+        libro = load_workbook(ruta_archivo, read_only=True, data_only=True)
+        try:
+            hoja_libro = libro.worksheets[hoja] if isinstance(
+                hoja, int) else libro[hoja]
+            for fila in hoja_libro.iter_rows(values_only=True):
+                yield fila
+        finally:
+            libro.close()
+
+    elif nombre.endswith('.xls'):
+        if isinstance(ruta_archivo, str):
+            libro = xlrd.open_workbook(ruta_archivo, on_demand=True)
+        else:
+            libro = xlrd.open_workbook(
+                file_contents=ruta_archivo.read(), on_demand=True)
+        try:
+            hoja_libro = libro.sheet_by_index(hoja) if isinstance(
+                hoja, int) else libro.sheet_by_name(hoja)
+            for indice in range(hoja_libro.nrows):
+                yield tuple(None if valor == '' else valor for valor in hoja_libro.row_values(indice))
+        finally:
+            libro.release_resources()
+
+    else:
+        raise ValueError("El formato del archivo no es soportado.")
+
+
+def convertir_numero(valor):
+    """
+    Convierte el valor de una celda a flotante, igual que pd.to_numeric con errors='coerce'.
+
+    Parámetros:
+        valor: El valor de la celda.
+
+    Retorna:
+        float: El valor numérico o NaN si no se puede convertir.
+    """
+    if valor is None:
+        return math.nan
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if isinstance(valor, str):
+        try:
+            return float(valor)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def interpretar_texto(texto, formatos_texto):
+    """
+    Interpreta un texto con el primer formato de fecha u hora que coincida.
+
+    Retorna:
+        datetime o None: La fecha interpretada o None si ningún formato coincide.
+    """
+    texto = texto.strip()
+    for formato_texto in formatos_texto:
+        try:
+            return datetime.strptime(texto, formato_texto)
+        except ValueError:
+            continue
+    return None
+
+
+def convertir_fecha(valor):
+    """
+    Convierte el valor de una celda de fecha, o de fecha y hora, a segundos desde EPOCA.
+
+    Parámetros:
+        valor: El valor de la celda, un datetime, un date, un número de Excel o un texto.
+
+    Retorna:
+        float: Los segundos desde EPOCA o NaN si no se puede interpretar.
+    """
+    if isinstance(valor, datetime):
+        return (valor - EPOCA).total_seconds()
+    if isinstance(valor, date):
+        return (datetime.combine(valor, hora_dia()) - EPOCA).total_seconds()
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (valor - DIA_EPOCA_EXCEL) * SEGUNDOS_DIA
+    if isinstance(valor, str):
+        fecha = interpretar_texto(valor, FORMATOS_FECHA_HORA + FORMATOS_FECHA)
+        if fecha is not None:
+            return (fecha - EPOCA).total_seconds()
+    return math.nan
+
+
+def convertir_hora(valor):
+    """
+    Convierte el valor de una celda de hora a segundos desde la medianoche.
+
+    Parámetros:
+        valor: El valor de la celda, un time, un timedelta, una fracción de día de Excel o un texto.
+
+    Retorna:
+        float: Los segundos desde la medianoche o NaN si no se puede interpretar.
+    """
+    if isinstance(valor, datetime):
+        valor = valor.time()
+    if isinstance(valor, hora_dia):
+        return valor.hour * 3600 + valor.minute * 60 + valor.second + valor.microsecond / 10 ** 6
+    if isinstance(valor, timedelta):
+        return valor.total_seconds()
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (valor % 1) * SEGUNDOS_DIA
+    if isinstance(valor, str):
+        momento = interpretar_texto(valor, FORMATOS_HORA)
+        if momento is not None:
+            return convertir_hora(momento)
+    return math.nan
+
+
+def marca_tiempo(fila, fechas, conocidas):
+    """
+    Obtiene la fecha y hora de una fila en segundos desde EPOCA.
+
+    Parámetros:
+        fila (tuple): Los valores de la fila.
+        fechas (tuple): La posición de la columna de fecha y, si la hora está en otra columna, la de la hora.
+        conocidas (dict): Los valores ya convertidos de cada columna, las fechas y las horas se repiten
+            en muchas filas y así se interpretan una sola vez.
+
+    Retorna:
+        float: Los segundos desde EPOCA o NaN si la fila no tiene una fecha válida.
+    """
+    segundos = 0.0
+    for posicion, convertir in zip(fechas, (convertir_fecha, convertir_hora)):
+        valor = fila[posicion] if posicion < len(fila) else None
+        clave = (posicion, valor)
+        if clave not in conocidas:
+            conocidas[clave] = convertir(valor)
+        segundos += conocidas[clave]
+    return segundos
+
+
+def indice_fechas(marcas):
+    """
+    Convierte las marcas de tiempo de las filas en el índice de un DataFrame.
+
+    Parámetros:
+        marcas (ndarray): Los segundos desde EPOCA de cada fila, NaN si la fila no tiene fecha.
+
+    Retorna:
+        DatetimeIndex: La fecha y hora de cada fila, NaT si no tiene fecha.
+    """
+    marcas = np.asarray(marcas, dtype=np.float64)
+    # Las fechas fuera del rango de pandas se descartan igual que las que no se pueden interpretar
+    marcas = np.where(np.abs(marcas) < 9e9, marcas, np.nan)
+    return pd.DatetimeIndex(pd.to_datetime(marcas, unit='s'), name='fecha')
+
+
+def normalizar_nombres(nombres, normalizar=None):
+    """
+    Aplica una función de normalización de encabezados a una lista de nombres.
+
+    Parámetros:
+        nombres (list): Los nombres de las columnas tal como aparecen en el archivo.
+        normalizar (function o None): Función que normaliza los encabezados de un DataFrame.
+
+    Retorna:
+        list: Los nombres normalizados.
+    """
+    if normalizar is None:
+        return list(nombres)
+
+    # Se reutilizan las funciones de normalización sobre un DataFrame vacío
+    df = pd.DataFrame(columns=pd.Index(nombres, dtype=object))
+    return list(normalizar(df).columns)
+
+
+def leer_encabezado(filas_archivo, filas=slice(None, None), columnas=slice(None, None), normalizar=None, requeridas=None):
+    """
+    Avanza hasta la fila de encabezado y resuelve los nombres normalizados y las posiciones de las columnas.
+
+    Parámetros:
+        filas_archivo (generator): Las filas del archivo, obtenidas con iterar_filas.
+        filas (slice): Rango de filas a seleccionar, la primera fila es el encabezado.
+        columnas (slice): Rango de columnas a seleccionar.
+        normalizar (function o None): Función que normaliza los encabezados.
+        requeridas (iterable o None): Nombres normalizados de las columnas a leer. None para leer todas.
+
+    Retorna:
+        tuple: Los nombres normalizados y las posiciones de las columnas seleccionadas.
+    """
+    with tiempos.etapa('encabezado'):
+        # Saltar las filas anteriores al encabezado
+        for _ in range(filas.start or 0):
+            next(filas_archivo, None)
+
+        encabezado = next(filas_archivo, None)
+        if encabezado is None:
+            raise EmptyDataError("El archivo no contiene datos.")
+
+        # Resolver las posiciones y los nombres normalizados de las columnas
+        posiciones = list(range(len(encabezado)))[columnas]
+        nombres = normalizar_nombres(
+            [encabezado[posicion] for posicion in posiciones], normalizar)
+
+        if requeridas is not None:
+            nombres, posiciones = seleccionar_columnas(
+                nombres, posiciones, requeridas)
+
+    return nombres, posiciones
+
+
+def seleccionar_columnas(nombres, posiciones, requeridas):
+    """
+    Selecciona la primera columna de cada nombre requerido.
+
+    Parámetros:
+        nombres (list): Los nombres normalizados de las columnas.
+        posiciones (list): Las posiciones de las columnas.
+        requeridas (iterable): Nombres normalizados de las columnas a leer.
+
+    Retorna:
+        tuple: Los nombres y las posiciones de las columnas seleccionadas.
+    """
+    requeridas = {nombre for nombre in requeridas if nombre}
+    seleccion = {}
+    for posicion, nombre in zip(posiciones, nombres):
+        if nombre in requeridas and nombre not in seleccion:
+            seleccion[nombre] = posicion
+    return list(seleccion.keys()), list(seleccion.values())
+
+
+def iterar_bloques(filas_archivo, posiciones, fechas=()):
+    """
+    Convierte las filas de datos en bloques numéricos de TAMANO_BLOQUE filas.
+
+    Parámetros:
+        filas_archivo (generator): Las filas restantes del archivo.
+        posiciones (list): Las posiciones de las columnas a convertir.
+        fechas (tuple): Las posiciones de las columnas de fecha y hora. Si se indican, la última
+            columna del bloque es la marca de tiempo de cada fila, obtenida con marca_tiempo.
+
+    Retorna:
+        generator: Tuplas (bloque, ultima_fila) donde ultima_fila es la cantidad de filas leídas hasta
+        la última fila con datos. Las filas vacías al final de la hoja no se deben considerar.
+    """
+    ancho_bloque = len(posiciones) + (1 if fechas else 0)
+    bloque = np.full((TAMANO_BLOQUE, ancho_bloque), np.nan)
+    conocidas = {}
+    indice = 0
+    total_filas = 0
+    ultima_fila = 0
+
+    # Separar el tiempo de lectura de las filas del tiempo de conversión de las celdas
+    reloj = time.perf_counter
+    lectura = conversion = 0.0
+    marca = reloj()
+
+    for fila in filas_archivo:
+        leida = reloj()
+        lectura += leida - marca
+
+        if indice == TAMANO_BLOQUE:
+            yield bloque, ultima_fila
+            leida = reloj()
+            bloque = np.full((TAMANO_BLOQUE, ancho_bloque), np.nan)
+            indice = 0
+
+        ancho = len(fila)
+        for columna, posicion in enumerate(posiciones):
+            if posicion < ancho:
+                bloque[indice, columna] = convertir_numero(fila[posicion])
+        if fechas:
+            bloque[indice, -1] = marca_tiempo(fila, fechas, conocidas)
+
+        indice += 1
+        total_filas += 1
+
+        if any(valor is not None for valor in fila):
+            ultima_fila = total_filas
+
+        marca = reloj()
+        conversion += marca - leida
+
+    lectura += reloj() - marca
+    tiempos.agregar('lectura', lectura)
+    tiempos.agregar('conversion', conversion)
+
+    yield bloque[:indice], ultima_fila
+
+
+def leer_columnas(ruta_archivo, filas=slice(None, None), columnas=slice(None, None), normalizar=None,
+                  filas_descartadas=0, requeridas=None, hoja=0, fechas=()):
+    """
+    Lee un archivo xlsx o xls fila por fila, resuelve primero el encabezado y solamente
+    guarda las columnas requeridas como arreglos de NumPy.
+
+    Parámetros:
+        ruta_archivo (str): La ruta del archivo xlsx o xls.
+        filas (slice): Rango de filas a seleccionar, la primera fila es el encabezado.
+        columnas (slice): Rango de columnas a seleccionar.
+        normalizar (function o None): Función que normaliza los encabezados.
+        filas_descartadas (int): Filas a eliminar después del encabezado.
+        requeridas (iterable o None): Nombres normalizados de las columnas a leer. None para leer todas.
+        hoja (str o int): Nombre o índice de la hoja a leer. Por defecto es 0 (primera hoja).
+        fechas (tuple): Las posiciones de las columnas de fecha y hora, vacío si el archivo no las tiene.
+
+    Retorna:
+        DataFrame o None: Un DataFrame de tipo float64 o None si ocurre un error al leer el archivo.
+        Si se indican las columnas de fecha y hora, su índice es la fecha y hora de cada fila.
+    """
+    try:
+        filas_archivo = iterar_filas(ruta_archivo, hoja)
+
+        nombres, posiciones = leer_encabezado(
+            filas_archivo, filas, columnas, normalizar, requeridas)
+
+        # Descartar las filas que no contienen mediciones
+        for _ in range(filas_descartadas):
+            next(filas_archivo, None)
+
+        bloques = []
+        ultima_fila = 0
+        for bloque, ultima_fila in iterar_bloques(filas_archivo, posiciones, fechas):
+            bloques.append(bloque)
+
+        matriz = np.concatenate(bloques)[:ultima_fila]
+
+        indice = None
+        if fechas:
+            indice = indice_fechas(matriz[:, -1])
+            matriz = matriz[:, :-1]
+
+    except FileNotFoundError:
+        print("El archivo no se encontró.")
+        return None
+    except EmptyDataError:
+        raise
+    except Exception as e:
+        print(f"Ocurrió un error al leer el archivo: {e}")
+        return None
+
+    return pd.DataFrame(matriz, index=indice, columns=pd.Index(nombres, dtype=object))
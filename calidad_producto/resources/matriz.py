@@ -0,0 +1,241 @@
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+from calidad_producto.resources import lectura, tiempos
+
+
+# Versión del formato de la matriz. Se debe incrementar cuando cambie la lectura o la
+# normalización, así las matrices guardadas con otra versión se vuelven a generar.
+VERSION_MATRIZ = 3
+
+# Sufijos de los archivos que acompañan al archivo original
+SUFIJO_MATRIZ = '.matriz.npy'
+SUFIJO_MANIFIESTO = '.matriz.json'
+SUFIJO_FECHAS = '.fechas.npy'
+SUFIJO_SERIES = '.series.npz'
+
+
+def rutas_matriz(ruta_archivo):
+    """
+    Obtiene las rutas de la matriz, del manifiesto y de las fechas que acompañan a un archivo.
+    """
+    return ruta_archivo + SUFIJO_MATRIZ, ruta_archivo + SUFIJO_MANIFIESTO, ruta_archivo + SUFIJO_FECHAS
+
+
+def firma_perfil(formato, hoja):
+    """
+    Obtiene una firma de la forma en que se recorta y normaliza el archivo, así una matriz
+    guardada con otro formato o con otras reglas de normalización no se reutiliza.
+    """
+    reglas = [(patron.pattern, reemplazo) for patron, reemplazo in formato.reglas]
+    return repr((formato.clave, formato.fila_encabezado, formato.columnas.start, formato.columnas.stop,
+                 formato.columnas.step, reglas, formato.recortar, formato.filas_descartadas, formato.fechas,
+                 hoja, VERSION_MATRIZ))
+
+
+def firma_origen(ruta_archivo):
+    """
+    Obtiene el tamaño y la fecha de modificación del archivo original.
+    """
+    estado = os.stat(ruta_archivo)
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+def nombre_columna(nombre):
+    """
+    Convierte el nombre de una columna a un valor que se puede guardar en JSON.
+    """
+    if nombre is None or (isinstance(nombre, float) and math.isnan(nombre)):
+        return None
+    return str(nombre)
+
+
+def cargar_matriz(ruta_archivo, perfil):
+    """
+    Abre la matriz guardada de un archivo sin cargarla en memoria.
+
+    Parámetros:
+        ruta_archivo (str): La ruta del archivo original.
+        perfil (str): La firma del perfil del analizador.
+
+    Retorna:
+        tuple o None: La matriz mapeada en memoria, los nombres de las columnas y las marcas de tiempo
+        de las filas (None si el formato no tiene fechas), o None si no existe una matriz vigente
+        para el archivo.
+    """
+    ruta_npy, ruta_json, ruta_fechas = rutas_matriz(ruta_archivo)
+
+    try:
+        with open(ruta_json, encoding='utf-8') as archivo_json:
+            manifiesto = json.load(archivo_json)
+
+        if manifiesto.get('perfil') != perfil or manifiesto.get('origen') != firma_origen(ruta_archivo):
+            return None
+
+        matriz = np.load(ruta_npy, mmap_mode='r')
+        marcas = np.load(ruta_fechas) if manifiesto.get('fechas') else None
+
+    except (OSError, ValueError):
+        return None
+
+    if matriz.shape != (manifiesto['filas'], len(manifiesto['columnas'])):
+        return None
+    if marcas is not None and marcas.shape != (manifiesto['filas'],):
+        return None
+
+    return matriz, manifiesto['columnas'], marcas
+
+
+def guardar_matriz(ruta_archivo, formato, hoja=0):
+    """
+    Lee el archivo una sola vez y guarda todas sus columnas normalizadas como una matriz .npy por columnas
+    (orden Fortran) junto a un manifiesto con el encabezado. Si el formato tiene columnas de fecha
+    y hora, la marca de tiempo de cada fila se guarda aparte en un arreglo .npy. Los bloques se
+    escriben primero en un archivo temporal, así la memoria utilizada no depende del tamaño del archivo.
+
+    Parámetros:
+        ruta_archivo (str): La ruta del archivo xlsx o xls.
+        formato (Formato): El formato del archivo, define el recorte y la normalización.
+        hoja (str o int): Nombre o índice de la hoja a leer.
+    """
+    ruta_npy, ruta_json, ruta_fechas = rutas_matriz(ruta_archivo)
+    sufijo_temporal = f'.{os.getpid()}.tmp'
+    ruta_bloques = ruta_npy + '.bloques' + sufijo_temporal
+
+    try:
+        filas_archivo = lectura.iterar_filas(ruta_archivo, hoja)
+        nombres, posiciones = lectura.leer_encabezado(
+            filas_archivo, formato.filas, formato.columnas, formato.normalizar)
+
+        # Descartar las filas que no contienen mediciones
+        for _ in range(formato.filas_descartadas):
+            next(filas_archivo, None)
+
+        # Escribir los bloques por filas en un archivo temporal
+        ultima_fila = 0
+        with open(ruta_bloques, 'wb') as archivo_bloques:
+            for bloque, ultima_fila in lectura.iterar_bloques(filas_archivo, posiciones, formato.fechas):
+                archivo_bloques.write(np.ascontiguousarray(bloque).tobytes())
+
+        with tiempos.etapa('matriz'):
+            forma = (ultima_fila, len(posiciones))
+            # Con fechas, la última columna de los bloques es la marca de tiempo de la fila
+            ancho_bloques = forma[1] + (1 if formato.fechas else 0)
+            marcas = np.full(forma[0], np.nan)
+
+            # Copiar los bloques a la matriz final por columnas
+            matriz = np.lib.format.open_memmap(
+                ruta_npy + sufijo_temporal, mode='w+', dtype=np.float64, shape=forma, fortran_order=True)
+
+            if forma[0] and ancho_bloques:
+                bloques = np.memmap(ruta_bloques, dtype=np.float64,
+                                    mode='r', shape=(forma[0], ancho_bloques))
+                for inicio in range(0, forma[0], lectura.TAMANO_BLOQUE):
+                    fin = inicio + lectura.TAMANO_BLOQUE
+                    matriz[inicio:fin] = bloques[inicio:fin, :forma[1]]
+                    if formato.fechas:
+                        marcas[inicio:fin] = bloques[inicio:fin, forma[1]]
+                del bloques
+
+            matriz.flush()
+            del matriz
+            os.replace(ruta_npy + sufijo_temporal, ruta_npy)
+
+            if formato.fechas:
+                with open(ruta_fechas + sufijo_temporal, 'wb') as archivo_fechas:
+                    np.save(archivo_fechas, marcas)
+                os.replace(ruta_fechas + sufijo_temporal, ruta_fechas)
+
+            manifiesto = {
+                'perfil': firma_perfil(formato, hoja),
+                'origen': firma_origen(ruta_archivo),
+                'filas': forma[0],
+                'columnas': [nombre_columna(nombre) for nombre in nombres],
+                'fechas': bool(formato.fechas),
+            }
+
+            with open(ruta_json + sufijo_temporal, 'w', encoding='utf-8') as archivo_json:
+                json.dump(manifiesto, archivo_json, ensure_ascii=False)
+            os.replace(ruta_json + sufijo_temporal, ruta_json)
+
+    finally:
+        for ruta in (ruta_bloques, ruta_npy + sufijo_temporal, ruta_json + sufijo_temporal,
+                     ruta_fechas + sufijo_temporal):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def leer_matriz(ruta_archivo, formato, requeridas=None, hoja=0):
+    """
+    Obtiene las columnas normalizadas de un archivo desde su matriz guardada. Si la matriz no existe
+    o no está vigente, se genera a partir del archivo original. Si no se puede guardar la matriz,
+    se lee el archivo directamente con leer_columnas.
+
+    Parámetros:
+        ruta_archivo (str): La ruta del archivo xlsx o xls.
+        formato (Formato): El formato del archivo, define el recorte y la normalización.
+        requeridas (iterable o None): Nombres normalizados de las columnas a leer. None para leer todas.
+        hoja (str o int): Nombre o índice de la hoja a leer.
+
+    Retorna:
+        DataFrame o None: Un DataFrame de tipo float64 o None si ocurre un error al leer el archivo.
+        Si el formato tiene columnas de fecha y hora, su índice es la fecha y hora de cada fila.
+    """
+    perfil = firma_perfil(formato, hoja)
+    resultado = cargar_matriz(ruta_archivo, perfil)
+
+    if resultado is None:
+        try:
+            guardar_matriz(ruta_archivo, formato, hoja)
+        except EmptyDataError:
+            raise
+        except Exception as e:
+            print(f"No se pudo guardar la matriz del archivo: {e}")
+            return leer_columnas(ruta_archivo, formato, requeridas, hoja)
+
+        resultado = cargar_matriz(ruta_archivo, perfil)
+        if resultado is None:
+            return leer_columnas(ruta_archivo, formato, requeridas, hoja)
+
+    matriz, nombres, marcas = resultado
+    indices = list(range(len(nombres)))
+
+    if requeridas is not None:
+        nombres, indices = lectura.seleccionar_columnas(
+            nombres, indices, requeridas)
+
+    # Solamente se copian a memoria las columnas seleccionadas
+    with tiempos.etapa('matriz'):
+        indice = lectura.indice_fechas(marcas) if marcas is not None else None
+        return pd.DataFrame(np.array(matriz[:, indices]), index=indice, columns=pd.Index(nombres, dtype=object))
+
+
+def leer_columnas(ruta_archivo, formato, requeridas=None, hoja=0):
+    """
+    Lee las columnas de un archivo directamente, sin utilizar la matriz guardada.
+    """
+    return lectura.leer_columnas(ruta_archivo, formato.filas, formato.columnas, formato.normalizar,
+                                 formato.filas_descartadas, requeridas, hoja, formato.fechas)
+
+
+def contar_filas(ruta_archivo):
+    """
+    Obtiene la cantidad de filas de la matriz guardada de un archivo sin leer sus valores,
+    0 si el archivo no tiene matriz.
+    """
+    ruta_npy, _, _ = rutas_matriz(ruta_archivo)
+    if not os.path.exists(ruta_npy):
+        return 0
+    return np.load(ruta_npy, mmap_mode='r').shape[0]
+
+
+def eliminar_matriz(ruta_archivo):
+    """
+    Elimina la matriz, el manifiesto, las fechas y las series que acompañan a un archivo.
+    """
+    for ruta in (*rutas_matriz(ruta_archivo), ruta_archivo + SUFIJO_SERIES):
+        if os.path.exists(ruta):
+            os.remove(ruta)
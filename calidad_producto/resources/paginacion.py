@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+from babel import Locale
+from django.db.models import Q
+from django.utils.timezone import localtime
+
+
+# Cantidad de archivos por página
+TAMANO_PAGINA = 50
+
+# Fecha de referencia para codificar los cursores
+EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Nombres de los meses y de los periodos del día en español, se obtienen una sola vez de Babel
+_LOCALE = Locale.parse('es_ES')
+MESES = dict(_LOCALE.months['format']['wide'])
+PERIODOS = dict(_LOCALE.day_periods['format']['abbreviated'])
+
+
+def formatear_fecha(fecha):
+    """
+    Formatea una fecha igual que format_datetime con el formato 'dd MMMM yyyy, hh:mm a' y
+    el locale es_ES, sin volver a procesar el patrón en cada fila.
+
+    Parámetros:
+        fecha (datetime): La fecha con zona horaria.
+
+    Retorna:
+        str: La fecha formateada en la zona horaria local.
+    """
+    fecha = localtime(fecha)
+    hora = fecha.hour % 12 or 12
+    periodo = PERIODOS['pm' if fecha.hour >= 12 else 'am']
+    return f'{fecha.day:02d} {MESES[fecha.month]} {fecha.year:04d}, {hora:02d}:{fecha.minute:02d} {periodo}'
+
+
+def codificar_cursor(fecha, identificador):
+    """
+    Codifica la posición de un registro (fecha de subida e id) como un cursor para la URL.
+    """
+    delta = fecha - EPOCA
+    microsegundos = (delta.days * 86400 + delta.seconds) * \
+        10 ** 6 + delta.microseconds
+    return f'{microsegundos}_{identificador}'
+
+
+def decodificar_cursor(cursor):
+    """
+    Decodifica un cursor obtenido con codificar_cursor.
+
+    Retorna:
+        tuple o None: La fecha de subida y el id, o None si el cursor no es válido.
+    """
+    try:
+        microsegundos, identificador = cursor.split('_')
+        return EPOCA + timedelta(microseconds=int(microsegundos)), int(identificador)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def valor_registro(registro, campo):
+    """
+    Obtiene un campo de un registro, ya sea un modelo o un diccionario obtenido con values().
+    """
+    return registro[campo] if isinstance(registro, dict) else getattr(registro, campo)
+
+
+def paginar(queryset, despues=None, antes=None, tamano=TAMANO_PAGINA, campo='subido_el'):
+    """
+    Obtiene una página de registros ordenados por fecha e id, utilizando la posición del último
+    registro visto (keyset) en lugar de un desplazamiento, así el costo de cada página no
+    depende de la cantidad de registros anteriores.
+
+    Parámetros:
+        queryset (QuerySet): Los registros a paginar, modelos o diccionarios con el campo y el id.
+        despues (str o None): Cursor del último registro de la página anterior.
+        antes (str o None): Cursor del primer registro de la página siguiente.
+        tamano (int): Cantidad de registros por página.
+        campo (str): Campo de fecha por el que se ordena.
+
+    Retorna:
+        tuple: Los registros de la página, el cursor de la página siguiente y el cursor de la
+        página anterior. Los cursores son None si no existe la página.
+    """
+    posicion_despues = decodificar_cursor(despues) if despues else None
+    posicion_antes = decodificar_cursor(antes) if antes else None
+
+    if posicion_antes is not None:
+        fecha, identificador = posicion_antes
+        registros = list(queryset.filter(
+            Q(**{f'{campo}__lt': fecha}) | Q(**{campo: fecha, 'id__lt': identificador})
+        ).order_by(f'-{campo}', '-id')[:tamano + 1])
+
+        hay_anterior = len(registros) > tamano
+        registros = registros[:tamano][::-1]
+        hay_siguiente = True
+
+    else:
+        if posicion_despues is not None:
+            fecha, identificador = posicion_despues
+            queryset = queryset.filter(
+                Q(**{f'{campo}__gt': fecha}) | Q(**{campo: fecha, 'id__gt': identificador}))
+
+        registros = list(queryset.order_by(campo, 'id')[:tamano + 1])
+
+        hay_siguiente = len(registros) > tamano
+        registros = registros[:tamano]
+        hay_anterior = posicion_despues is not None
+
+    if not registros:
+        return registros, None, None
+
+    siguiente = codificar_cursor(valor_registro(registros[-1], campo), valor_registro(registros[-1], 'id')) \
+        if hay_siguiente else None
+    anterior = codificar_cursor(valor_registro(registros[0], campo), valor_registro(registros[0], 'id')) \
+        if hay_anterior else None
+
+    return registros, siguiente, anterior
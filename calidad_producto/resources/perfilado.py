@@ -0,0 +1,154 @@
+import os
+import io
+import shutil
+import cProfile
+import pstats
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from calidad_producto.resources import matriz, perfiles, tiempos
+from calidad_producto.resources.procesamiento import CALCULOS, obtener_limites
+
+
+# Criterios para ordenar las funciones del reporte
+ORDENES = {
+    'propio': 'tottime',
+    'acumulado': 'cumulative',
+    'llamadas': 'ncalls',
+}
+
+# Cantidad de funciones y de sitios de memoria del reporte
+LINEAS = 25
+
+
+def preparar_copia(archivo, carpeta):
+    """
+    Copia el archivo original a una carpeta temporal sin su matriz guardada, así la depuración
+    vuelve a leer el libro completo y no escribe en la carpeta de archivos.
+
+    Retorna:
+        str: La ruta de la copia.
+    """
+    ruta = os.path.join(carpeta, os.path.basename(archivo.archivo.name))
+    matriz.eliminar_matriz(ruta)
+    shutil.copyfile(archivo.archivo.path, ruta)
+    return ruta
+
+
+def depurar(archivo, ruta_archivo):
+    """
+    Obtiene la información de un archivo con los mismos parámetros de su depuración, sin guardarla.
+
+    Retorna:
+        tuple: La información calculada y los tiempos de las etapas.
+    """
+    perfil = perfiles.obtener_perfil(archivo.analizador_id)
+    if perfil is None:
+        raise ValueError("El analizador del archivo no existe.")
+
+    limites = obtener_limites(archivo)
+
+    # Los mensajes de la depuración no forman parte del reporte
+    with tiempos.medir_depuracion() as medidos, redirect_stdout(io.StringIO()):
+        informacion = CALCULOS[archivo.categoria_id](
+            perfil.nombre, ruta_archivo, archivo.valor_porcentaje, perfil.valores_columna(), limites)
+
+    if informacion is None:
+        raise ValueError("No se pudo obtener la información del archivo.")
+    return informacion, medidos
+
+
+def funciones_costosas(perfil, orden, lineas):
+    """
+    Obtiene las funciones del perfil ordenadas por el criterio indicado.
+    """
+    estadisticas = pstats.Stats(perfil).sort_stats(ORDENES[orden])
+    funciones = []
+    for funcion in estadisticas.fcn_list[:lineas]:
+        _, llamadas, propio, acumulado, _ = estadisticas.stats[funcion]
+        ruta, linea, nombre = funcion
+        funciones.append({
+            'funcion': nombre,
+            'ubicacion': f'{ruta}:{linea}' if linea else ruta,
+            'llamadas': llamadas,
+            'tiempo_propio': round(propio, 6),
+            'tiempo_acumulado': round(acumulado, 6),
+        })
+    return funciones
+
+
+def perfilar_archivo(archivo, orden='propio', lineas=LINEAS):
+    """
+    Vuelve a depurar un archivo con cProfile y con tracemalloc sin guardar ningún resultado.
+    La depuración se ejecuta dos veces sobre una copia del archivo, la primera con cProfile y la
+    segunda con tracemalloc, así el seguimiento de la memoria no altera los tiempos.
+
+    Parámetros:
+        archivo (Archivo): El archivo a perfilar.
+        orden (str): Criterio para ordenar las funciones, una clave de ORDENES.
+        lineas (int): Cantidad de funciones y de sitios de memoria del reporte.
+
+    Retorna:
+        dict: Los tiempos de las etapas, las funciones más costosas, la memoria máxima por etapa
+        y los sitios que más memoria tenían asignada al terminar la etapa de mayor consumo.
+    """
+    if orden not in ORDENES:
+        raise ValueError(f"El orden debe ser uno de: {', '.join(ORDENES)}.")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        # Primera ejecución: tiempos de cada función
+        ruta = preparar_copia(archivo, carpeta)
+        perfil = cProfile.Profile()
+        inicio = time.perf_counter()
+        perfil.enable()
+        try:
+            _, medidos = depurar(archivo, ruta)
+        finally:
+            perfil.disable()
+        segundos = time.perf_counter() - inicio
+
+        # Segunda ejecución: memoria máxima de cada etapa y sitios de la etapa de mayor consumo
+        ruta = preparar_copia(archivo, carpeta)
+        picos = {}
+        mayor = {'memoria': -1, 'etapa': None, 'captura': None}
+
+        def terminar_etapa(etapa):
+            actual, pico = tracemalloc.get_traced_memory()
+            picos[etapa] = max(picos.get(etapa, 0), pico)
+            if actual > mayor['memoria']:
+                mayor.update(memoria=actual, etapa=etapa,
+                             captura=tracemalloc.take_snapshot())
+            tracemalloc.reset_peak()
+
+        tracemalloc.start()
+        try:
+            with tiempos.observar_etapas(terminar_etapa):
+                depurar(archivo, ruta)
+            pico_total = max(picos.values(), default=tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    sitios = []
+    if mayor['captura'] is not None:
+        for estadistica in mayor['captura'].statistics('lineno')[:lineas]:
+            marco = estadistica.traceback[0]
+            sitios.append({
+                'ubicacion': f'{marco.filename}:{marco.lineno}',
+                'bytes': estadistica.size,
+                'bloques': estadistica.count,
+            })
+
+    return {
+        'archivo': archivo.id,
+        'formato': medidos.get('formato'),
+        'segundos': round(segundos, 6),
+        'tiempos': {etapa: round(medidos[etapa], 6) for etapa in tiempos.ETAPAS if etapa in medidos},
+        'funciones': funciones_costosas(perfil, orden, lineas),
+        'memoria': {
+            'pico': pico_total,
+            'picos': picos,
+            'etapa': mayor['etapa'],
+            'sitios': sitios,
+        },
+    }
@@ -0,0 +1,145 @@
+import time
+import threading
+from dataclasses import dataclass
+from django.conf import settings
+from django.db.models import Count, Max
+from calidad_producto.models import Analizador
+
+
+# Campos del analizador que indican el nombre de cada columna en el archivo
+CAMPOS_COLUMNA = (
+    'voltaje_a', 'voltaje_b', 'voltaje_c',
+    'flicker_a', 'flicker_b', 'flicker_c',
+    'vthd_a', 'vthd_b', 'vthd_c',
+    'desbalance',
+)
+
+# Segundos entre cada verificación de la versión de los analizadores en la base de datos. Un proceso
+# que no recibe las señales de los cambios, como procesar_trabajos, los ve después de este intervalo.
+# Se puede cambiar con INTERVALO_PERFILES en la configuración
+INTERVALO_VERIFICACION = 30
+
+
+@dataclass(frozen=True)
+class PerfilAnalizador:
+    """
+    Copia inmutable de un analizador y de los nombres de sus columnas.
+    """
+    id: int
+    nombre: str
+    columnas: tuple
+
+    def valores_columna(self):
+        """
+        Devuelve un diccionario nuevo con los nombres de las columnas del analizador.
+        """
+        return dict(self.columnas)
+
+
+_perfiles = None
+_candado = threading.Lock()
+
+
+def crear_perfil(analizador):
+    """
+    Crea el perfil inmutable de un analizador.
+    """
+    return PerfilAnalizador(
+        id=analizador.id,
+        nombre=analizador.nombre,
+        columnas=tuple((campo, getattr(analizador, campo))
+                       for campo in CAMPOS_COLUMNA)
+    )
+
+
+def version_analizadores():
+    """
+    Obtiene la versión de los analizadores en la base de datos: la cantidad de analizadores y la
+    fecha del último modificado. Cambia al crear, modificar o eliminar un analizador desde cualquier proceso.
+    """
+    version = Analizador.objects.aggregate(cantidad=Count('id'), ultimo=Max('actualizado_el'))
+    return version['cantidad'], version['ultimo']
+
+
+def cargar_perfiles():
+    """
+    Carga los perfiles de todos los analizadores desde la base de datos, junto con su versión.
+    """
+    # La versión se consulta antes, así un cambio durante la carga se detecta en la siguiente verificación
+    version = version_analizadores()
+
+    por_id = {}
+    por_nombre = {}
+    for analizador in Analizador.objects.order_by('id'):
+        perfil = crear_perfil(analizador)
+        por_id[perfil.id] = perfil
+        por_nombre.setdefault(perfil.nombre, perfil)
+
+    return {'id': por_id, 'nombre': por_nombre, 'version': version, 'verificado': time.monotonic()}
+
+
+def obtener_perfiles():
+    """
+    Obtiene los perfiles de todos los analizadores. La primera llamada los carga desde la base
+    de datos y las siguientes no realizan consultas hasta que se invalide el registro. Cada
+    INTERVALO_VERIFICACION segundos se consulta la versión de los analizadores y, si cambió
+    en otro proceso, los perfiles se vuelven a cargar.
+
+    Retorna:
+        dict: Los perfiles por id y por nombre del analizador.
+    """
+    global _perfiles
+
+    intervalo = getattr(settings, 'INTERVALO_PERFILES', INTERVALO_VERIFICACION)
+    perfiles = _perfiles
+    if perfiles is not None and time.monotonic() - perfiles['verificado'] < intervalo:
+        return perfiles
+
+    with _candado:
+        if _perfiles is not None and time.monotonic() - _perfiles['verificado'] >= intervalo:
+            if version_analizadores() == _perfiles['version']:
+                _perfiles['verificado'] = time.monotonic()
+            else:
+                _perfiles = None
+
+        if _perfiles is None:
+            _perfiles = cargar_perfiles()
+
+        return _perfiles
+
+
+def obtener_perfil(analizador_id=None, nombre=None):
+    """
+    Obtiene el perfil de un analizador por su id o por su nombre.
+
+    Retorna:
+        PerfilAnalizador o None: El perfil o None si el analizador no existe.
+    """
+    perfiles = obtener_perfiles()
+
+    if analizador_id is not None:
+        try:
+            return perfiles['id'].get(int(analizador_id))
+        except (TypeError, ValueError):
+            return None
+
+    return perfiles['nombre'].get(nombre)
+
+
+def listar_perfiles():
+    """
+    Obtiene los perfiles de todos los analizadores ordenados por id.
+    """
+    return list(obtener_perfiles()['id'].values())
+
+
+def invalidar_perfiles(**kwargs):
+    """
+    Descarta los perfiles cargados, se vuelven a cargar en la siguiente consulta.
+    Se conecta a las señales post_save y post_delete de Analizador, que solamente llegan al
+    proceso que hizo el cambio; los demás procesos lo ven al verificar la versión.
+    """
+    global _perfiles
+
+    with _candado:
+        _perfiles = None
@@ -0,0 +1,510 @@
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import django
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from pandas.errors import EmptyDataError
+from calidad_producto.models import Archivo
+from calidad_producto.resources import depuracion_armonico as arm
+from calidad_producto.resources import depuracion_tendencia as ten
+from calidad_producto.resources import matriz, perfiles, resumenes, tiempos
+from calidad_producto.resources.resultados import guardar_resultados
+from calidad_producto.resources.fragmentos import invalidar_detalles
+
+
+# Versión de los algoritmos de depuración. Se debe incrementar cuando cambie el cálculo
+# de la información, así los resultados guardados con otra versión no se reutilizan.
+VERSION_DEPURACION = 4
+
+
+def calcular_hash(archivo_subido):
+    """
+    Calcula el SHA-256 del contenido de un archivo subido, leyéndolo por partes.
+
+    Parámetros:
+        archivo_subido (UploadedFile): El archivo recibido en la solicitud.
+
+    Retorna:
+        str: El hash en hexadecimal.
+    """
+    sha256 = hashlib.sha256()
+    for parte in archivo_subido.chunks():
+        sha256.update(parte)
+    archivo_subido.seek(0)
+    return sha256.hexdigest()
+
+
+def preparar_archivo(archivo_subido, categoria, tipo, analizador, voltaje_nominal=None, hash_sha256=None,
+                     perfil_armonico=None):
+    """
+    Crea un nuevo objeto Archivo con el hash de su contenido. Si DEDUPLICAR_ARCHIVOS está activo
+    y ya existe un archivo con el mismo contenido, se reutiliza el archivo guardado en el disco.
+
+    Parámetros:
+        archivo_subido (UploadedFile): El archivo recibido en la solicitud.
+        categoria (Categoria): La categoría del archivo.
+        tipo (Tipo): El tipo del archivo.
+        analizador (Analizador o PerfilAnalizador): El analizador del archivo.
+        voltaje_nominal (float o None): El voltaje nominal del punto de medición. None para el valor por defecto.
+        hash_sha256 (str o None): El hash del contenido si ya se calculó.
+        perfil_armonico (PerfilArmonico o None): Los límites por orden de los armónicos.
+
+    Retorna:
+        Archivo: El archivo sin guardar en la base de datos.
+    """
+    if hash_sha256 is None:
+        hash_sha256 = calcular_hash(archivo_subido)
+
+    nuevo_archivo = Archivo(
+        archivo=archivo_subido,
+        categoria=categoria,
+        tipo=tipo,
+        analizador_id=analizador.id,
+        hash_sha256=hash_sha256,
+        perfil_armonico=perfil_armonico
+    )
+
+    if voltaje_nominal is not None:
+        nuevo_archivo.voltaje_nominal = voltaje_nominal
+
+    if getattr(settings, 'DEDUPLICAR_ARCHIVOS', False):
+        existente = Archivo.objects.filter(
+            hash_sha256=hash_sha256, categoria=categoria).only('archivo').first()
+
+        if existente is not None and existente.archivo.storage.exists(existente.archivo.name):
+            # Apuntar al archivo existente, así no se vuelve a escribir en el disco
+            nuevo_archivo.archivo = existente.archivo.name
+
+    return nuevo_archivo
+
+
+def firma_limites(limites):
+    """
+    Calcula el SHA-256 de los límites con los que se depura un archivo. La firma es parte de la
+    clave para reutilizar resultados, así al editar un Limite los archivos idénticos se vuelven
+    a depurar con los nuevos límites. En los armónicos incluye el límite general y el límite de
+    cada orden del perfil.
+
+    Parámetros:
+        limites (dict o None): Los límites obtenidos con obtener_limites.
+
+    Retorna:
+        str: El hash en hexadecimal, vacío si no hay límites.
+    """
+    if limites is None:
+        return ''
+    return hashlib.sha256(json.dumps(limites, sort_keys=True).encode()).hexdigest()
+
+
+def buscar_resultado(archivo, valor_porcentaje):
+    """
+    Busca la información de un archivo depurado anteriormente con el mismo contenido,
+    analizador, categoría, tipo, voltaje nominal, límites, porcentaje y versión de la depuración.
+    Los límites por orden del perfil de armónicos se comparan por su firma y no por el perfil,
+    así al editar los límites de un perfil no se reutilizan los resultados anteriores. La firma
+    de los límites del archivo se debe asignar antes.
+
+    Parámetros:
+        archivo (Archivo): El archivo a depurar, con su firma_limites.
+        valor_porcentaje (int o None): El valor del porcentaje a utilizar.
+
+    Retorna:
+        dict o None: La información guardada o None si no existe un resultado previo.
+    """
+    if not archivo.hash_sha256:
+        return None
+
+    resultados = Archivo.objects.filter(
+        hash_sha256=archivo.hash_sha256,
+        analizador_id=archivo.analizador_id,
+        categoria_id=archivo.categoria_id,
+        tipo_id=archivo.tipo_id,
+        voltaje_nominal=archivo.voltaje_nominal,
+        firma_limites=archivo.firma_limites,
+        version_depuracion=VERSION_DEPURACION
+    ).exclude(pk=archivo.pk).exclude(informacion={})
+
+    if valor_porcentaje is None:
+        resultados = resultados.filter(valor_porcentaje__isnull=True)
+    else:
+        resultados = resultados.filter(valor_porcentaje=valor_porcentaje)
+
+    return resultados.values_list('informacion', flat=True).first()
+
+
+def calcular_armonico(analizador, ruta_archivo, valor_porcentaje, valores_columna=None, limites=None):
+    """
+    Obtiene la información de un archivo armonico sin acceder a la base de datos, con los
+    límites por orden de su perfil de armónicos.
+    """
+    return arm.tipo_analizador(analizador, ruta_archivo, valor_porcentaje, limites)
+
+
+def calcular_tendencia(analizador, ruta_archivo, valor_porcentaje, valores_columna=None, limites=None):
+    """
+    Obtiene la información de un archivo tendencia sin acceder a la base de datos
+    cuando se entregan los valores de columna del analizador y los límites.
+    """
+    return ten.tipo_analizador(analizador, ruta_archivo, valores_columna, limites)
+
+
+def clave_limites(archivo):
+    """
+    Obtiene la clave de los límites de un archivo: el perfil de armónicos, o el tipo y el voltaje
+    nominal de una tendencia.
+    """
+    if archivo.categoria_id == 1:
+        return (archivo.categoria_id, archivo.perfil_armonico_id)
+    return (archivo.categoria_id, archivo.tipo_id, archivo.voltaje_nominal)
+
+
+def obtener_limites(archivo):
+    """
+    Obtiene los límites con los que se depura un archivo según su categoría.
+    """
+    if archivo.categoria_id == 1:
+        return arm.obtener_limites(archivo.perfil_armonico_id)
+    return ten.obtener_limites(archivo.tipo_id, archivo.voltaje_nominal)
+
+
+# Cálculo que corresponde a cada categoría (1: Armónico, 2: Tendencia)
+CALCULOS = {
+    1: calcular_armonico,
+    2: calcular_tendencia,
+}
+
+
+def calcular_con_tiempos(categoria_id, *argumentos):
+    """
+    Obtiene la información de un archivo con el cálculo de su categoría y mide sus etapas.
+    Se ejecuta en los procesos del grupo, los tiempos se devuelven junto a la información.
+
+    Retorna:
+        tuple: La información del archivo y los tiempos de sus etapas.
+    """
+    with tiempos.medir_depuracion() as medidos:
+        informacion = CALCULOS[categoria_id](*argumentos)
+    return informacion, medidos
+
+
+def guardar_depuracion(nuevo_archivo, medidos):
+    """
+    Guarda un archivo depurado y sus resultados por métrica, y registra los tiempos de su depuración.
+    """
+    with tiempos.etapa('guardado'):
+        nuevo_archivo.save()
+        guardar_resultados([nuevo_archivo])
+
+    nuevo_archivo.tiempos = medidos
+    tiempos.registrar_tiempos([nuevo_archivo])
+
+
+def guardar_depurados(archivos, campos):
+    """
+    Guarda varios archivos depurados y sus resultados por métrica en bloque. El tiempo del
+    guardado se reparte entre los archivos antes de registrar sus tiempos.
+
+    Parámetros:
+        archivos (list): Los archivos depurados, con sus tiempos en Archivo.tiempos.
+        campos (list): Los campos del archivo que se actualizan.
+    """
+    inicio = time.perf_counter()
+    Archivo.objects.bulk_update(archivos, campos, batch_size=500)
+    guardar_resultados(archivos)
+
+    tiempos.repartir(archivos, 'guardado', time.perf_counter() - inicio)
+    tiempos.registrar_tiempos(archivos)
+
+
+def depuracion_armonico(nuevo_archivo, analizador, valor_porcentaje):
+    """
+    Depura un archivo armonico.
+
+    Parámetros:
+        nuevo_archivo: El archivo a depurar.
+        analizador: El analizador a utilizar.
+        valor_porcentaje: El valor del porcentaje a utilizar.
+
+    Retorna:
+        La información depurada del archivo.
+
+    """
+
+    # Obtener la ruta del archivo
+    ruta_archivo = nuevo_archivo.archivo.path
+
+    # Obtener el nombre del analizador
+    analizador = analizador.nombre
+
+    # Obtener los límites por orden del perfil de armónicos del archivo
+    limites = obtener_limites(nuevo_archivo)
+    nuevo_archivo.firma_limites = firma_limites(limites)
+
+    with tiempos.medir_depuracion() as medidos:
+        # Reutilizar la información de un archivo idéntico o depurar el archivo
+        informacion = buscar_resultado(nuevo_archivo, valor_porcentaje)
+        if informacion is None:
+            informacion = calcular_armonico(
+                analizador, ruta_archivo, valor_porcentaje, limites=limites)
+            if informacion is None:
+                raise ValueError("No se pudo obtener la información del archivo.")
+
+        # Actualizar la información del archivo
+        nuevo_archivo.informacion = informacion
+        nuevo_archivo.valor_porcentaje = valor_porcentaje
+        nuevo_archivo.version_depuracion = VERSION_DEPURACION
+
+        # Guardar los cambios y los resultados por métrica en la base de datos
+        guardar_depuracion(nuevo_archivo, medidos)
+
+
+def depuracion_tendencia(nuevo_archivo, analizador, valor_porcetaje):
+    """
+    Depura un archivo tendencia.
+
+    Parámetros:
+        nuevo_archivo: El archivo a depurar.
+        analizador: El analizador a utilizar.
+
+    Retorna:
+        informacion: La información depurada del archivo.
+    """
+
+    # Obtener la ruta del archivo
+    ruta_archivo = nuevo_archivo.archivo.path
+
+    # Obtener el nombre del analizador
+    analizador = analizador.nombre
+
+    # Obtener los límites del tipo y voltaje nominal del archivo
+    limites = obtener_limites(nuevo_archivo)
+    nuevo_archivo.firma_limites = firma_limites(limites)
+
+    with tiempos.medir_depuracion() as medidos:
+        # Reutilizar la información de un archivo idéntico o depurar el archivo
+        informacion = buscar_resultado(nuevo_archivo, valor_porcetaje)
+        if informacion is None:
+            informacion = calcular_tendencia(
+                analizador, ruta_archivo, valor_porcetaje, limites=limites)
+            if informacion is None:
+                raise ValueError("No se pudo obtener la información del archivo.")
+
+        # Actualizar la información del archivo
+        nuevo_archivo.informacion = informacion
+        nuevo_archivo.valor_porcentaje = valor_porcetaje
+        nuevo_archivo.version_depuracion = VERSION_DEPURACION
+
+        # Guardar los cambios y los resultados por métrica en la base de datos
+        guardar_depuracion(nuevo_archivo, medidos)
+
+
+# Depuración que corresponde a cada categoría (1: Armónico, 2: Tendencia)
+DEPURACIONES = {
+    1: depuracion_armonico,
+    2: depuracion_tendencia,
+}
+
+
+def mensaje_error(error):
+    """
+    Obtiene el mensaje que se muestra al usuario cuando falla la depuración de un archivo.
+    """
+    if isinstance(error, (ValueError, EmptyDataError)):
+        return f'Ocurrió un error al procesar el archivo: {error}'
+    return f'Error inesperado durante la depuración: {error}'
+
+
+def crear_ejecutor(procesos):
+    """
+    Crea un grupo de procesos para depurar archivos en paralelo. Cada proceso inicia Django
+    por su cuenta y no comparte conexiones de base de datos con el proceso principal.
+
+    Parámetros:
+        procesos (int): Cantidad máxima de archivos que se depuran al mismo tiempo.
+
+    Retorna:
+        ProcessPoolExecutor: El grupo de procesos.
+    """
+    return ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup
+    )
+
+
+def depurar_en_paralelo(pendientes, ejecutor):
+    """
+    Depura varios archivos en un grupo de procesos y guarda las informaciones en bloque.
+    Los archivos que fallan se eliminan igual que en la depuración individual, sin afectar al resto.
+
+    Parámetros:
+        pendientes (list): Tuplas (archivo, valor_porcentaje) a depurar.
+        ejecutor (ProcessPoolExecutor): El grupo de procesos a utilizar.
+
+    Retorna:
+        dict: Los mensajes de error por id de archivo, solamente para los archivos que fallaron.
+    """
+    futuros = {}
+    errores = {}
+    exitosos = []
+    fallidos = []
+
+    # Los límites se consultan una sola vez por tipo y voltaje nominal
+    limites = {}
+
+    for archivo, valor_porcentaje in pendientes:
+        archivo.valor_porcentaje = valor_porcentaje
+        archivo.version_depuracion = VERSION_DEPURACION
+
+        clave = clave_limites(archivo)
+        if clave not in limites:
+            limites[clave] = obtener_limites(archivo)
+        archivo.firma_limites = firma_limites(limites[clave])
+
+        # Reutilizar la información de un archivo idéntico sin volver a depurarlo
+        informacion = buscar_resultado(archivo, valor_porcentaje)
+        if informacion is not None:
+            archivo.informacion = informacion
+            exitosos.append(archivo)
+            continue
+
+        perfil = perfiles.obtener_perfil(archivo.analizador_id)
+        if perfil is None:
+            errores[archivo.id] = mensaje_error(
+                ValueError("El analizador del archivo no existe."))
+            fallidos.append(archivo)
+            continue
+
+        futuro = ejecutor.submit(
+            calcular_con_tiempos,
+            archivo.categoria_id,
+            perfil.nombre,
+            archivo.archivo.path,
+            valor_porcentaje,
+            perfil.valores_columna(),
+            limites[clave]
+        )
+        futuros[futuro] = archivo
+
+    for futuro in as_completed(futuros):
+        archivo = futuros[futuro]
+        try:
+            informacion, medidos = futuro.result()
+            if informacion is None:
+                raise ValueError("No se pudo obtener la información del archivo.")
+            archivo.informacion = informacion
+            archivo.tiempos = medidos
+            exitosos.append(archivo)
+        except Exception as e:
+            errores[archivo.id] = mensaje_error(e)
+            fallidos.append(archivo)
+
+    # Guardar todas las informaciones en la base de datos, bulk_update no actualiza los campos auto_now
+    actualizado_el = timezone.now()
+    for archivo in exitosos:
+        archivo.actualizado_el = actualizado_el
+
+    guardar_depurados(
+        exitosos, ['informacion', 'valor_porcentaje', 'version_depuracion', 'firma_limites', 'actualizado_el'])
+
+    # Si ocurre un error al procesar el archivo, eliminar el archivo guardado
+    for archivo in fallidos:
+        eliminar_archivo_referencia(archivo)
+
+    return errores
+
+
+def reevaluar_tendencias(archivos, lote=500):
+    """
+    Vuelve a calcular la información de archivos de tendencia con los límites configurados.
+    Las columnas se leen desde la matriz guardada de cada archivo y los resultados se
+    guardan en bloques.
+
+    Parámetros:
+        archivos (QuerySet): Los archivos de tendencia a evaluar.
+        lote (int): Cantidad de archivos que se guardan en cada bloque.
+
+    Retorna:
+        tuple: La cantidad de archivos actualizados y los mensajes de error por id de archivo.
+    """
+    limites = {}
+    pendientes = []
+    actualizados = 0
+    errores = {}
+
+    for archivo in archivos.iterator(chunk_size=lote):
+        clave_limites = (archivo.tipo_id, archivo.voltaje_nominal)
+        if clave_limites not in limites:
+            limites[clave_limites] = ten.obtener_limites(*clave_limites)
+
+        try:
+            perfil = perfiles.obtener_perfil(archivo.analizador_id)
+            if perfil is None:
+                raise ValueError("El analizador del archivo no existe.")
+
+            with tiempos.medir_depuracion() as medidos:
+                informacion = calcular_tendencia(
+                    perfil.nombre,
+                    archivo.archivo.path,
+                    archivo.valor_porcentaje,
+                    perfil.valores_columna(),
+                    limites[clave_limites]
+                )
+            if informacion is None:
+                raise ValueError("No se pudo obtener la información del archivo.")
+        except Exception as e:
+            errores[archivo.id] = mensaje_error(e)
+            continue
+
+        archivo.informacion = informacion
+        archivo.tiempos = medidos
+        archivo.version_depuracion = VERSION_DEPURACION
+        archivo.firma_limites = firma_limites(limites[clave_limites])
+        # bulk_update no actualiza los campos auto_now
+        archivo.actualizado_el = timezone.now()
+        pendientes.append(archivo)
+
+        if len(pendientes) >= lote:
+            guardar_depurados(
+                pendientes, ['informacion', 'version_depuracion', 'firma_limites', 'actualizado_el'])
+            actualizados += len(pendientes)
+            pendientes = []
+
+    guardar_depurados(
+        pendientes, ['informacion', 'version_depuracion', 'firma_limites', 'actualizado_el'])
+    actualizados += len(pendientes)
+
+    return actualizados, errores
+
+
+def eliminar_archivo_referencia(nuevo_archivo):
+    # Obtener la ruta del archivo
+    nombre_archivo = nuevo_archivo.archivo.name
+    archivo_id = nuevo_archivo.id
+    ruta_archivo = nuevo_archivo.archivo.path
+
+    # Restar sus resultados de los resúmenes mensuales y eliminar el archivo del servidor
+    with transaction.atomic():
+        resumenes.descontar_archivo(nuevo_archivo)
+        nuevo_archivo.delete()
+    invalidar_detalles([archivo_id])
+
+    # Los archivos deduplicados se conservan mientras otro registro los utilice
+    if Archivo.objects.filter(archivo=nombre_archivo).exists():
+        return
+
+    # Verificar si el archivo existe en el sistema de archivos
+    if os.path.exists(ruta_archivo):
+        # Eliminar el archivo del sistema de archivos
+        os.remove(ruta_archivo)
+
+        # Mostrar mensaje en el backend
+        print("\nArchivo eliminado correctamente.\n")
+
+    # Eliminar la matriz normalizada que acompaña al archivo
+    matriz.eliminar_matriz(ruta_archivo)
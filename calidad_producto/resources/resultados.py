@@ -0,0 +1,132 @@
+import re
+from django.db import transaction
+from calidad_producto.models import ResultadoMetrica
+from calidad_producto.resources import resumenes
+from calidad_producto.resources.fragmentos import invalidar_detalles
+from calidad_producto.resources.formatos import ARMONICO, COLUMNAS_ARMONICO, TENDENCIA
+
+
+# Claves de la información de tendencia, por ejemplo 'flicker_fase_b'
+CLAVE_FASE = re.compile(r'^(?P<metrica>.+)_fase_(?P<fase>[abc])$')
+
+# Orden y fase en los nombres de las columnas de armónicos, por ejemplo 'H5 L2'
+ORDEN_ARMONICO = re.compile(r'(?i)\b(?:h|harm\w*)\s*0?(\d{1,2})\b')
+FASE_ARMONICO = re.compile(r'(?i)\b(?:L\s*([123])|(?:fase|phase)\s*([abc]))\b')
+FASES = {'1': 'a', '2': 'b', '3': 'c'}
+
+
+def fase_columna(columna):
+    """
+    Obtiene la fase ('a', 'b' o 'c') del nombre de una columna de armónicos, '' si no tiene.
+    """
+    coincidencia = FASE_ARMONICO.search(columna)
+    if coincidencia is None:
+        return ''
+    numero, letra = coincidencia.groups()
+    return FASES[numero] if numero else letra.lower()
+
+
+def orden_columna(columna):
+    """
+    Obtiene el orden del armónico del nombre de una columna, None si no tiene.
+    """
+    coincidencia = ORDEN_ARMONICO.search(columna)
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+def resultados_tendencia(archivo):
+    """
+    Convierte la información de un archivo de tendencia en resultados por métrica y fase.
+    """
+    resultados = []
+    for clave, valor in archivo.informacion.items():
+        if not isinstance(valor, (int, float)):
+            continue
+
+        coincidencia = CLAVE_FASE.match(clave)
+        metrica, fase = (coincidencia.group('metrica'), coincidencia.group('fase')) \
+            if coincidencia else (clave, '')
+
+        resultados.append(ResultadoMetrica(
+            archivo_id=archivo.id, subido_el=archivo.subido_el,
+            metrica=metrica, fase=fase, valor=valor))
+    return resultados
+
+
+def resultados_armonico(archivo):
+    """
+    Convierte la información de un archivo de armónicos en resultados por columna, con el
+    orden y la fase obtenidos del nombre de la columna.
+    """
+    resultados = []
+    for columna, valores in archivo.informacion.get(COLUMNAS_ARMONICO, {}).items():
+        resultados.append(ResultadoMetrica(
+            archivo_id=archivo.id, subido_el=archivo.subido_el, metrica='armonico',
+            fase=fase_columna(columna), orden=orden_columna(columna), columna=columna[:100],
+            valor=valores['porcentaje'], conteo=valores.get('conteo')))
+    return resultados
+
+
+# Conversión que corresponde a cada categoría
+CONVERSIONES = {
+    ARMONICO: resultados_armonico,
+    TENDENCIA: resultados_tendencia,
+}
+
+
+def crear_resultados(archivo):
+    """
+    Crea los resultados por métrica de un archivo a partir de su información, sin guardarlos.
+
+    Parámetros:
+        archivo (Archivo): El archivo con su información depurada.
+
+    Retorna:
+        list: Los resultados del archivo.
+    """
+    conversion = CONVERSIONES.get(archivo.categoria_id)
+    if conversion is None or not archivo.informacion:
+        return []
+    return conversion(archivo)
+
+
+def guardar_resultados(archivos, lote=1000):
+    """
+    Reemplaza los resultados por métrica de varios archivos con una sola eliminación y
+    una inserción en bloque, y actualiza los resúmenes mensuales con la diferencia.
+
+    Parámetros:
+        archivos (iterable): Los archivos con su información depurada.
+        lote (int): Cantidad de resultados por cada inserción.
+
+    Retorna:
+        int: La cantidad de resultados guardados.
+    """
+    archivos = list(archivos)
+    if not archivos:
+        return 0
+
+    resultados = [resultado for archivo in archivos
+                  for resultado in crear_resultados(archivo)]
+
+    por_id = {archivo.id: archivo for archivo in archivos}
+
+    with transaction.atomic():
+        anteriores = ResultadoMetrica.objects.filter(archivo_id__in=list(por_id))
+
+        # Actualizar los resúmenes mensuales restando los resultados anteriores y sumando los nuevos
+        cambios = {}
+        for archivo_id, metrica, valor in anteriores.values_list('archivo_id', 'metrica', 'valor'):
+            resumenes.acumular(cambios, por_id[archivo_id], metrica, valor, -1)
+        for resultado in resultados:
+            resumenes.acumular(
+                cambios, por_id[resultado.archivo_id], resultado.metrica, resultado.valor, 1)
+
+        anteriores.delete()
+        ResultadoMetrica.objects.bulk_create(resultados, batch_size=lote)
+        resumenes.aplicar_cambios(cambios)
+
+    # La información cambió, el detalle guardado en la caché ya no es válido
+    invalidar_detalles(por_id)
+
+    return len(resultados)
@@ -0,0 +1,139 @@
+from datetime import date
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils.timezone import localtime
+from calidad_producto.models import Resumen, ResultadoMetrica
+from calidad_producto.resources.formatos import TENDENCIA
+
+
+# Un resultado cumple si el porcentaje de excedencia no supera este valor, es decir, si la
+# métrica está dentro de los límites al menos el 95 % del tiempo
+UMBRAL_CUMPLIMIENTO = 5
+
+
+def mes_de(fecha):
+    """
+    Obtiene el primer día del mes local de una fecha.
+    """
+    fecha = localtime(fecha)
+    return date(fecha.year, fecha.month, 1)
+
+
+def acumular(cambios, archivo, metrica, valor, signo):
+    """
+    Suma (signo 1) o resta (signo -1) un resultado de un archivo a los cambios de los resúmenes.
+
+    Parámetros:
+        cambios (dict): Cambios por clave (mes, analizador, tipo, metrica) como [mediciones, cumplen, suma].
+        archivo (Archivo): El archivo del resultado.
+        metrica (str): La métrica del resultado.
+        valor (float): El porcentaje de excedencia del resultado.
+        signo (int): 1 para sumar el resultado, -1 para restarlo.
+    """
+    if archivo.categoria_id != TENDENCIA:
+        return
+
+    clave = (mes_de(archivo.subido_el), archivo.analizador_id,
+             archivo.tipo_id, metrica)
+    cambio = cambios.setdefault(clave, [0, 0, 0.0])
+    cambio[0] += signo
+    cambio[1] += signo if valor <= UMBRAL_CUMPLIMIENTO else 0
+    cambio[2] += signo * valor
+
+
+def aplicar_cambios(cambios):
+    """
+    Aplica los cambios acumulados a los resúmenes con actualizaciones atómicas en la base de datos,
+    así varios procesos pueden actualizar el mismo resumen al mismo tiempo.
+
+    Parámetros:
+        cambios (dict): Los cambios obtenidos con acumular.
+    """
+    cambios = {clave: cambio for clave, cambio in cambios.items()
+               if cambio[0] or cambio[1] or cambio[2]}
+    if not cambios:
+        return
+
+    with transaction.atomic():
+        # Crear los resúmenes que todavía no existen
+        Resumen.objects.bulk_create([
+            Resumen(mes=mes, analizador_id=analizador_id,
+                    tipo_id=tipo_id, metrica=metrica)
+            for mes, analizador_id, tipo_id, metrica in cambios
+        ], ignore_conflicts=True)
+
+        # Actualizar en el mismo orden en todos los procesos para evitar bloqueos mutuos
+        for (mes, analizador_id, tipo_id, metrica), (mediciones, cumplen, suma) in sorted(cambios.items()):
+            Resumen.objects.filter(
+                mes=mes, analizador_id=analizador_id, tipo_id=tipo_id, metrica=metrica
+            ).update(
+                mediciones=F('mediciones') + mediciones,
+                cumplen=F('cumplen') + cumplen,
+                suma_valor=F('suma_valor') + suma,
+            )
+
+
+def descontar_archivo(archivo):
+    """
+    Resta de los resúmenes los resultados guardados de un archivo, antes de eliminarlo.
+    """
+    cambios = {}
+    for metrica, valor in ResultadoMetrica.objects.filter(archivo_id=archivo.id).values_list('metrica', 'valor'):
+        acumular(cambios, archivo, metrica, valor, -1)
+    aplicar_cambios(cambios)
+
+
+def reconstruir_resumenes():
+    """
+    Vuelve a calcular todos los resúmenes desde la tabla de resultados en una sola consulta
+    agrupada. Solamente es necesario si los resúmenes se desincronizan.
+
+    Retorna:
+        int: La cantidad de resúmenes creados.
+    """
+    filas = ResultadoMetrica.objects.filter(archivo__categoria_id=TENDENCIA).annotate(
+        mes=TruncMonth('subido_el', output_field=DateField())
+    ).values(
+        'mes', 'metrica', analizador=F('archivo__analizador_id'), tipo=F('archivo__tipo_id')
+    ).annotate(
+        total=Count('id'),
+        total_cumplen=Sum(Case(When(valor__lte=UMBRAL_CUMPLIMIENTO, then=Value(1)),
+                               default=Value(0), output_field=IntegerField())),
+        suma=Sum('valor'),
+    ).order_by()
+
+    resumenes = [
+        Resumen(mes=fila['mes'], analizador_id=fila['analizador'], tipo_id=fila['tipo'],
+                metrica=fila['metrica'], mediciones=fila['total'], cumplen=fila['total_cumplen'],
+                suma_valor=fila['suma'])
+        for fila in filas
+    ]
+
+    with transaction.atomic():
+        Resumen.objects.all().delete()
+        Resumen.objects.bulk_create(resumenes)
+
+    return len(resumenes)
+
+
+def obtener_resumenes(meses=12):
+    """
+    Obtiene los resúmenes de los últimos meses. La cantidad de filas depende de los meses,
+    analizadores, tipos y métricas, no de la cantidad de archivos.
+
+    Parámetros:
+        meses (int): Cantidad de meses a incluir, contando el mes actual.
+
+    Retorna:
+        QuerySet: Los resúmenes ordenados del mes más reciente al más antiguo.
+    """
+    hoy = localtime()
+    anio, mes = hoy.year, hoy.month - (meses - 1)
+    while mes <= 0:
+        mes += 12
+        anio -= 1
+
+    return Resumen.objects.filter(
+        mes__gte=date(anio, mes, 1), mediciones__gt=0
+    ).select_related('analizador', 'tipo').order_by('-mes', 'analizador__nombre', 'tipo__nombre', 'metrica')
@@ -0,0 +1,323 @@
+import os
+import numpy as np
+import pandas as pd
+from calidad_producto.resources import formatos, matriz, perfiles
+from calidad_producto.resources.resultados import fase_columna, orden_columna
+
+
+# Métodos para reducir la cantidad de puntos de una serie
+LTTB = 'lttb'
+MINIMO_MAXIMO = 'minmax'
+METODOS = (LTTB, MINIMO_MAXIMO)
+
+# Ancho en píxeles mínimo, por defecto y máximo del gráfico. Con LTTB se devuelve un punto por
+# píxel y con mínimo y máximo hasta dos puntos por píxel. LTTB conserva el primer y el último
+# punto, por eso necesita al menos un punto más
+ANCHO_MINIMO = 3
+ANCHO = 1000
+ANCHO_MAXIMO = 5000
+
+# Decimales de los valores devueltos
+DECIMALES = 4
+
+# Series de tendencia que se guardan, por campo de Analizador
+SERIES_TENDENCIA = ('voltaje_a', 'voltaje_b', 'voltaje_c', 'flicker_a', 'flicker_b', 'flicker_c',
+                    'vthd_a', 'vthd_b', 'vthd_c')
+
+# Gráficos de la página de detalle de cada categoría: (título, series)
+GRAFICOS = {
+    formatos.TENDENCIA: [
+        ('Voltaje (V)', ('voltaje_a', 'voltaje_b', 'voltaje_c')),
+        ('Flicker (Pst)', ('flicker_a', 'flicker_b', 'flicker_c')),
+        ('THD de voltaje (%)', ('vthd_a', 'vthd_b', 'vthd_c')),
+    ],
+    formatos.ARMONICO: [
+        ('THD de voltaje (%)', ('vthd_a', 'vthd_b', 'vthd_c')),
+    ],
+}
+
+# Clave de las fechas en el archivo de series
+FECHAS = 'fechas'
+
+
+def ruta_series(ruta_archivo):
+    """
+    Obtiene la ruta del archivo de series que acompaña a un archivo.
+    """
+    return ruta_archivo + matriz.SUFIJO_SERIES
+
+
+def series_tendencia(df, valores_columna):
+    """
+    Obtiene las series de voltaje, flicker y THD de un archivo de tendencia.
+
+    Parámetros:
+        df (DataFrame): Las columnas del archivo, sin reemplazar los valores vacíos.
+        valores_columna (dict): Los nombres de las columnas del analizador.
+
+    Retorna:
+        dict: Los valores de cada serie, por campo de Analizador.
+    """
+    return {
+        campo: df[valores_columna[campo]].to_numpy(dtype=np.float64)
+        for campo in SERIES_TENDENCIA
+        if valores_columna.get(campo) in df.columns
+    }
+
+
+def series_armonico(df):
+    """
+    Calcula el THD de voltaje de cada fase a partir de las columnas de armónicos, en porcentaje
+    de la fundamental: la raíz de la suma de los cuadrados de los órdenes 2 en adelante.
+
+    Parámetros:
+        df (DataFrame): Las columnas del archivo, sin reemplazar los valores vacíos.
+
+    Retorna:
+        dict: El THD de cada fase como 'vthd_a', 'vthd_b' y 'vthd_c'.
+    """
+    # Primera columna de cada nombre, agrupadas por fase
+    posiciones = {}
+    vistas = set()
+    for posicion, columna in enumerate(df.columns):
+        if not isinstance(columna, str) or columna in vistas:
+            continue
+        vistas.add(columna)
+        orden = orden_columna(columna)
+        fase = fase_columna(columna)
+        if orden is not None and orden >= 2 and fase:
+            posiciones.setdefault(fase, []).append(posicion)
+
+    thd = {}
+    for fase, columnas in sorted(posiciones.items()):
+        valores = df.iloc[:, columnas].to_numpy(dtype=np.float64)
+        vacias = np.isnan(valores).all(axis=1)
+        thd[f'vthd_{fase}'] = np.where(vacias, np.nan, np.sqrt(np.nansum(valores ** 2, axis=1)))
+    return thd
+
+
+def guardar_series(ruta_archivo, fechas, series):
+    """
+    Guarda las series de un archivo ordenadas por fecha junto al archivo original, con las fechas
+    en milisegundos y los valores en float32. Las filas sin fecha no se guardan.
+
+    Parámetros:
+        ruta_archivo (str): La ruta del archivo original.
+        fechas (DatetimeIndex): La fecha y hora de cada fila.
+        series (dict): Los valores de cada serie, uno por fila.
+    """
+    validas = ~np.asarray(fechas.isna())
+    marcas = np.asarray(fechas[validas], dtype='datetime64[ms]').view(np.int64)
+    orden = np.argsort(marcas, kind='stable')
+
+    arreglos = {FECHAS: marcas[orden]}
+    for nombre, valores in series.items():
+        arreglos[nombre] = valores[validas][orden].astype(np.float32)
+
+    ruta = ruta_series(ruta_archivo)
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    try:
+        with open(temporal, 'wb') as archivo_series:
+            np.savez(archivo_series, **arreglos)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def guardar_desde_dataframe(ruta_archivo, df, series):
+    """
+    Guarda las series si las filas del DataFrame tienen fecha. Un error al guardar las series
+    no interrumpe la depuración, se vuelven a generar al solicitarlas.
+    """
+    if not isinstance(df.index, pd.DatetimeIndex) or not series:
+        return
+    try:
+        guardar_series(ruta_archivo, df.index, series)
+    except OSError as e:
+        print(f"No se pudieron guardar las series del archivo: {e}")
+
+
+def generar_series(archivo):
+    """
+    Vuelve a generar las series de un archivo desde su matriz guardada, por ejemplo si el archivo
+    se depuró antes de guardar las series o su información se reutilizó de otro archivo idéntico.
+
+    Retorna:
+        bool: True si se guardaron las series, False si el formato del archivo no tiene fechas.
+    """
+    perfil = perfiles.obtener_perfil(archivo.analizador_id)
+    formato = formatos.obtener_formato(perfil.nombre, archivo.categoria_id) if perfil else None
+    if formato is None or not formato.fechas:
+        return False
+
+    ruta_archivo = archivo.archivo.path
+    if archivo.categoria_id == formatos.TENDENCIA:
+        valores_columna = perfil.valores_columna()
+        df = matriz.leer_matriz(ruta_archivo, formato, requeridas=valores_columna.values())
+        series = series_tendencia(df, valores_columna) if df is not None else {}
+    else:
+        df = matriz.leer_matriz(ruta_archivo, formato)
+        series = series_armonico(df) if df is not None else {}
+
+    if not series:
+        return False
+    guardar_series(ruta_archivo, df.index, series)
+    return True
+
+
+def reducir_minimo_maximo(x, y, ancho):
+    """
+    Divide la serie en ancho grupos de puntos consecutivos y conserva el mínimo y el máximo de cada
+    grupo, en el orden en que aparecen. Los grupos se obtienen con un solo cambio de forma del arreglo.
+
+    Retorna:
+        ndarray: Las posiciones de los puntos seleccionados.
+    """
+    total = len(y)
+    if total <= 2 * ancho:
+        return np.arange(total)
+
+    tamano = -(-total // ancho)
+    grupos = -(-total // tamano)
+    relleno = np.full(grupos * tamano, np.nan)
+    relleno[:total] = y
+    relleno = relleno.reshape(grupos, tamano)
+
+    inicios = np.arange(grupos) * tamano
+    minimos = np.where(np.isnan(relleno), np.inf, relleno).argmin(axis=1) + inicios
+    maximos = np.where(np.isnan(relleno), -np.inf, relleno).argmax(axis=1) + inicios
+
+    return np.unique(np.concatenate([minimos, maximos]))
+
+
+def reducir_lttb(x, y, puntos):
+    """
+    Selecciona los puntos de la serie con Largest-Triangle-Three-Buckets: conserva el primer y el
+    último punto, y de cada grupo el que forma el triángulo de mayor área con el punto elegido en el
+    grupo anterior y el promedio del grupo siguiente. Los promedios se calculan para todos los
+    grupos a la vez, solamente la elección del punto se recorre grupo por grupo. Con menos de
+    ANCHO_MINIMO puntos se seleccionan ANCHO_MINIMO.
+
+    Retorna:
+        ndarray: Las posiciones de los puntos seleccionados.
+    """
+    total = len(y)
+    puntos = max(puntos, ANCHO_MINIMO)
+    if total <= puntos:
+        return np.arange(total)
+
+    # Grupos de puntos entre el primero y el último
+    limites = np.linspace(1, total - 1, puntos - 1).astype(np.int64)
+    cantidades = np.diff(limites)
+    suma_x = np.concatenate([[0.0], np.cumsum(x)])
+    suma_y = np.concatenate([[0.0], np.cumsum(y)])
+
+    # El punto de referencia de cada grupo es el promedio del grupo siguiente o el último punto
+    promedio_x = np.append(((suma_x[limites[1:]] - suma_x[limites[:-1]]) / cantidades)[1:], x[-1])
+    promedio_y = np.append(((suma_y[limites[1:]] - suma_y[limites[:-1]]) / cantidades)[1:], y[-1])
+
+    seleccion = np.empty(puntos, dtype=np.int64)
+    seleccion[0] = 0
+    seleccion[-1] = total - 1
+    anterior = 0
+
+    for grupo in range(puntos - 2):
+        inicio, fin = limites[grupo], limites[grupo + 1]
+        ax, ay = x[anterior], y[anterior]
+        areas = np.abs((ax - promedio_x[grupo]) * (y[inicio:fin] - ay)
+                       - (ax - x[inicio:fin]) * (promedio_y[grupo] - ay))
+        anterior = inicio + int(areas.argmax())
+        seleccion[grupo + 1] = anterior
+
+    return seleccion
+
+
+def reducir(marcas, valores, ancho, metodo=LTTB):
+    """
+    Reduce una serie a la cantidad de puntos que se pueden dibujar en un ancho de píxeles. Los
+    valores vacíos no se dibujan y se descartan antes de reducir.
+
+    Parámetros:
+        marcas (ndarray): Las fechas en milisegundos, ordenadas.
+        valores (ndarray): Los valores de la serie.
+        ancho (int): El ancho del gráfico en píxeles.
+        metodo (str): LTTB o MINIMO_MAXIMO.
+
+    Retorna:
+        tuple: Las fechas y los valores de los puntos seleccionados.
+    """
+    validos = ~np.isnan(valores)
+    marcas, valores = marcas[validos], valores[validos].astype(np.float64)
+
+    # Las fechas relativas al primer punto conservan la precisión en el cálculo de las áreas
+    x = (marcas - marcas[0]).astype(np.float64) if len(marcas) else marcas.astype(np.float64)
+    if metodo == LTTB:
+        posiciones = reducir_lttb(x, valores, ancho)
+    else:
+        posiciones = reducir_minimo_maximo(x, valores, ancho)
+    return marcas[posiciones], valores[posiciones]
+
+
+def validar_parametros(ancho, metodo):
+    """
+    Verifica el ancho y el método de reducción de una vista, lanza ValueError si no son válidos.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"El método debe ser uno de: {', '.join(METODOS)}.")
+    if not ANCHO_MINIMO <= ancho <= ANCHO_MAXIMO:
+        raise ValueError(f'El ancho debe estar entre {ANCHO_MINIMO} y {ANCHO_MAXIMO}.')
+
+
+def obtener_vista(archivo, nombres=None, desde=None, hasta=None, ancho=ANCHO, metodo=LTTB):
+    """
+    Obtiene las series de un archivo entre dos fechas, reducidas para un gráfico del ancho indicado.
+    Si el archivo de series no existe se vuelve a generar desde la matriz guardada.
+
+    Parámetros:
+        archivo (Archivo): El archivo.
+        nombres (list o None): Las series a devolver. None para devolver todas.
+        desde (datetime o None): La fecha y hora inicial, sin zona horaria.
+        hasta (datetime o None): La fecha y hora final, sin zona horaria.
+        ancho (int): El ancho del gráfico en píxeles, entre ANCHO_MINIMO y ANCHO_MAXIMO.
+        metodo (str): LTTB o MINIMO_MAXIMO.
+
+    Retorna:
+        dict o None: Las fechas en milisegundos y los valores de cada serie, y la cantidad de puntos
+        en el rango antes de reducir. None si el archivo no tiene series.
+    """
+    validar_parametros(ancho, metodo)
+
+    ruta = ruta_series(archivo.archivo.path)
+    if not os.path.exists(ruta) and not generar_series(archivo):
+        return None
+
+    with np.load(ruta) as guardadas:
+        disponibles = [nombre for nombre in guardadas.files if nombre != FECHAS]
+        if nombres is None:
+            nombres = disponibles
+        desconocidas = set(nombres) - set(disponibles)
+        if desconocidas:
+            raise ValueError(f"El archivo no tiene las series: {', '.join(sorted(desconocidas))}.")
+
+        marcas = guardadas[FECHAS]
+        inicio = np.searchsorted(marcas, milisegundos(desde)) if desde else 0
+        fin = np.searchsorted(marcas, milisegundos(hasta), side='right') if hasta else len(marcas)
+        marcas = marcas[inicio:fin]
+
+        series = {}
+        for nombre in nombres:
+            fechas, valores = reducir(marcas, guardadas[nombre][inicio:fin], ancho, metodo)
+            series[nombre] = {
+                'fechas': fechas.tolist(),
+                'valores': np.round(valores, DECIMALES).tolist(),
+            }
+
+    return {'archivo': archivo.id, 'metodo': metodo, 'total': len(marcas), 'series': series}
+
+
+def milisegundos(fecha):
+    """
+    Convierte una fecha y hora sin zona horaria en milisegundos, como las fechas de las series.
+    """
+    return int(np.datetime64(fecha, 'ms').astype(np.int64))
@@ -0,0 +1,245 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from openpyxl import Workbook
+from calidad_producto.resources import formatos
+
+
+# Límite de filas de una hoja xls
+FILAS_MAXIMAS_XLS = 65536
+
+# Nombres de las columnas de tendencia de cada analizador, como los campos de Analizador
+COLUMNAS_TENDENCIA = {
+    'SONEL': {
+        'voltaje_a': 'U L1 avg', 'voltaje_b': 'U L2 avg', 'voltaje_c': 'U L3 avg',
+        'flicker_a': 'Pst L1', 'flicker_b': 'Pst L2', 'flicker_c': 'Pst L3',
+        'vthd_a': 'THD U L1', 'vthd_b': 'THD U L2', 'vthd_c': 'THD U L3',
+        'desbalance': 'U2/U1 avg',
+    },
+    'AEMC': {
+        'voltaje_a': 'Vrms L1', 'voltaje_b': 'Vrms L2', 'voltaje_c': 'Vrms L3',
+        'flicker_a': 'Pst L1', 'flicker_b': 'Pst L2', 'flicker_c': 'Pst L3',
+        'vthd_a': 'Vthd L1', 'vthd_b': 'Vthd L2', 'vthd_c': 'Vthd L3',
+        'desbalance': 'Vunb',
+    },
+    'METREL': {
+        'voltaje_a': 'U1 Rms', 'voltaje_b': 'U2 Rms', 'voltaje_c': 'U3 Rms',
+        'flicker_a': 'Pst1', 'flicker_b': 'Pst2', 'flicker_c': 'Pst3',
+        'vthd_a': 'Uthd1', 'vthd_b': 'Uthd2', 'vthd_c': 'Uthd3',
+        'desbalance': 'u-',
+    },
+}
+
+# Unidad y distribución de los valores de cada métrica: (unidad, función(generador, filas))
+VALORES_TENDENCIA = {
+    'voltaje': ('V', lambda generador, filas: generador.normal(120, 4, filas)),
+    'flicker': ('', lambda generador, filas: generador.gamma(2, 0.4, filas)),
+    'vthd': ('%', lambda generador, filas: generador.gamma(4, 1.2, filas)),
+    'desbalance': ('%', lambda generador, filas: generador.gamma(2, 0.6, filas)),
+}
+
+# Columnas que anteceden a las mediciones en cada analizador
+COLUMNAS_INICIALES = {
+    'SONEL': ['Fecha', 'Hora', 'Bandera'],
+    'AEMC': ['Fecha', 'Hora'],
+    'METREL': [],
+}
+
+# Fila de título de los analizadores cuyo encabezado no está en la primera fila
+TITULOS = {
+    'AEMC': 'AEMC PowerPad III Modelo 8336',
+}
+
+
+def encabezado_tendencia(analizador, nombre, unidad, indice):
+    """
+    Agrega al nombre de una columna de tendencia el sufijo que exporta cada analizador. Las
+    variantes se alternan por columna, así el archivo incluye todas las que se deben normalizar.
+    """
+    if analizador == 'SONEL':
+        variantes = (f'{nombre} [{unidad}]', f'{nombre}. 10 min [{unidad}]', f' {nombre} [{unidad}] ')
+    elif analizador == 'AEMC':
+        variantes = (f'{nombre} ({unidad})', f'{nombre} ( {unidad} )')
+    else:
+        variantes = (f'{nombre} [{unidad}]', nombre)
+    return variantes[indice % len(variantes)]
+
+
+def encabezado_armonico(analizador, orden, fase):
+    """
+    Obtiene el nombre de la columna de un armónico como lo exporta cada analizador.
+    """
+    if analizador == 'SONEL':
+        return f'U L{fase} H{orden} avg. 10 min [%]'
+    if analizador == 'AEMC':
+        return f'H{orden} V L{fase}'
+    return f'U L{fase} h{orden} [%]'
+
+
+def columnas_tendencia(analizador, nombres, fases, generador, filas):
+    """
+    Obtiene los encabezados y los valores de las columnas de tendencia.
+    """
+    encabezados = []
+    valores = []
+    for indice, (campo, nombre) in enumerate(nombres.items()):
+        if not nombre or (fases < 3 and campo.endswith('_c')):
+            continue
+        metrica = campo.rsplit('_', 1)[0] if campo != 'desbalance' else campo
+        if fases < 3 and metrica == 'desbalance':
+            continue
+        unidad, distribucion = VALORES_TENDENCIA[metrica]
+        encabezados.append(encabezado_tendencia(analizador, nombre, unidad, indice))
+        valores.append(distribucion(generador, filas))
+    return encabezados, valores
+
+
+def columnas_armonico(analizador, ordenes, fases, generador, filas):
+    """
+    Obtiene los encabezados y los valores de las columnas de armónicos, en porcentaje de la fundamental.
+    """
+    encabezados = []
+    valores = []
+    for fase in range(1, fases + 1):
+        for orden in range(2, ordenes + 1):
+            encabezados.append(encabezado_armonico(analizador, orden, fase))
+            # Los armónicos impares son mayores y todos decrecen con el orden
+            escala = (6 if orden % 2 else 1.5) / orden ** 0.5
+            valores.append(generador.gamma(2, escala, filas))
+    return encabezados, valores
+
+
+def generar_filas(analizador, categoria, filas=1000, fases=3, ordenes=25, columnas_extra=0,
+                  nombres=None, ruido=0.01, semilla=0):
+    """
+    Genera las filas de un archivo exportado por un analizador, con el mismo recorte que describe
+    su formato: filas de título, columnas iniciales, filas descartadas después del encabezado,
+    encabezados con unidades y sufijos, celdas vacías o con texto y una fila vacía al final.
+
+    Parámetros:
+        analizador (str): SONEL, AEMC o METREL.
+        categoria (int): formatos.ARMONICO o formatos.TENDENCIA.
+        filas (int): Cantidad de filas de mediciones.
+        fases (int): 1, 2 o 3 fases. Con menos de 3 fases no se generan las columnas de la fase C.
+        ordenes (int): Orden máximo de los armónicos.
+        columnas_extra (int): Columnas adicionales que no se utilizan en la depuración.
+        nombres (dict o None): Los nombres de las columnas de tendencia por campo de Analizador.
+            None para utilizar COLUMNAS_TENDENCIA.
+        ruido (float): Proporción de celdas vacías o con texto.
+        semilla (int): Semilla del generador de números aleatorios.
+
+    Retorna:
+        generator: Las filas del archivo como listas de valores.
+    """
+    formato = formatos.obtener_formato(analizador, categoria)
+    if formato is None:
+        raise ValueError(f'El analizador {analizador} no tiene formato para la categoría {categoria}.')
+
+    generador = np.random.default_rng(semilla)
+
+    if categoria == formatos.TENDENCIA:
+        encabezados, valores = columnas_tendencia(
+            analizador, nombres or COLUMNAS_TENDENCIA[analizador], fases, generador, filas)
+    else:
+        encabezados, valores = columnas_armonico(
+            analizador, ordenes, fases, generador, filas)
+
+    for indice in range(columnas_extra):
+        encabezados.append(f'Extra {indice + 1}')
+        valores.append(generador.normal(60, 0.05, filas))
+
+    # Las columnas iniciales completan el inicio del rango de columnas del formato
+    iniciales = COLUMNAS_INICIALES[analizador][:formato.columnas.start or 0]
+
+    if formato.fila_encabezado:
+        yield [TITULOS.get(analizador, analizador)]
+        for _ in range(formato.fila_encabezado - 1):
+            yield []
+
+    yield iniciales + encabezados
+
+    for _ in range(formato.filas_descartadas):
+        yield [''] * len(iniciales) + ['-'] * len(encabezados)
+
+    matriz = np.column_stack(valores) if valores else np.empty((filas, 0))
+    ruidosas = generador.random(matriz.shape) < ruido
+    inicio = datetime(2024, 1, 1)
+
+    for indice in range(filas):
+        momento = inicio + timedelta(minutes=10 * indice)
+        fila = [momento.strftime('%d/%m/%Y'), momento.strftime('%H:%M:%S'), 0][:len(iniciales)]
+
+        for columna, valor in enumerate(matriz[indice].round(4).tolist()):
+            if ruidosas[indice, columna]:
+                # Alternar celdas vacías, texto y números guardados como texto
+                opcion = (indice + columna) % 3
+                valor = None if opcion == 0 else 'N/A' if opcion == 1 else str(valor)
+            fila.append(valor)
+
+        yield fila
+
+    yield []
+
+
+def generar_libro(ruta, analizador, categoria, **opciones):
+    """
+    Escribe un archivo xlsx o xls sintético de un analizador, según la extensión de la ruta.
+    Las opciones son las de generar_filas.
+
+    Retorna:
+        str: La ruta del archivo escrito.
+    """
+    filas = generar_filas(analizador, categoria, **opciones)
+
+    if ruta.endswith('.xlsx'):
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet('Datos')
+        for fila in filas:
+            hoja.append(fila)
+        libro.save(ruta)
+
+    elif ruta.endswith('.xls'):
+        try:
+            import xlwt
+        except ImportError:
+            raise ValueError('Para generar archivos .xls se debe instalar xlwt.')
+
+        libro = xlwt.Workbook()
+        hoja = libro.add_sheet('Datos')
+        for indice, fila in enumerate(filas):
+            if indice >= FILAS_MAXIMAS_XLS:
+                raise ValueError(f'Un archivo .xls admite como máximo {FILAS_MAXIMAS_XLS} filas.')
+            for columna, valor in enumerate(fila):
+                if valor is not None:
+                    hoja.write(indice, columna, valor)
+        libro.save(ruta)
+
+    else:
+        raise ValueError("El formato del archivo no es soportado.")
+
+    return ruta
+
+
+def nombre_libro(analizador, categoria, extension='.xlsx'):
+    """
+    Obtiene el nombre de un archivo sintético, por ejemplo "SONEL_tendencia.xlsx".
+    """
+    return f"{analizador}_{'armonico' if categoria == formatos.ARMONICO else 'tendencia'}{extension}"
+
+
+def generar_carpeta(carpeta, analizadores=('SONEL', 'AEMC', 'METREL'),
+                    categorias=(formatos.TENDENCIA, formatos.ARMONICO), extensiones=('.xlsx',), **opciones):
+    """
+    Escribe un archivo sintético por cada analizador, categoría y extensión en una carpeta.
+
+    Retorna:
+        list: Las rutas de los archivos escritos.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    return [
+        generar_libro(os.path.join(carpeta, nombre_libro(analizador, categoria, extension)),
+                      analizador, categoria, **opciones)
+        for analizador in analizadores
+        for categoria in categorias
+        for extension in extensiones
+    ]
@@ -0,0 +1,192 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.models import F
+from calidad_producto.models import Archivo, TiempoEtapa
+
+
+# Etapas de la depuración, en el orden en que se ejecutan
+ETAPAS = (
+    'encabezado',  # Apertura del libro, recorte de filas y columnas y normalización del encabezado
+    'lectura',     # Lectura de las filas de datos del libro
+    'conversion',  # Conversión de las celdas a números
+    'matriz',      # Escritura de la matriz guardada, carga de las columnas y guardado de las series
+    'calculo',     # Cálculo de la información del archivo
+    'guardado',    # Guardado del archivo y de sus resultados en la base de datos
+)
+
+# Límites superiores de las cubetas del histograma, en segundos. Las cubetas se guardan por
+# posición, si se cambian estos límites se deben vaciar los histogramas guardados.
+CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Nombre de la métrica en el formato de texto de Prometheus
+NOMBRE_METRICA = 'lexel_depuracion_etapa_segundos'
+
+# Tiempos de la depuración en curso, None fuera de medir_depuracion
+_tiempos = ContextVar('tiempos', default=None)
+
+# Función que se llama al terminar cada etapa, la utiliza el perfilado de un archivo
+_observador = ContextVar('observador', default=None)
+
+
+@contextmanager
+def medir_depuracion():
+    """
+    Acumula los tiempos de las etapas que se ejecutan dentro del bloque.
+
+    Retorna:
+        dict: Los segundos de cada etapa y la clave del formato del archivo en 'formato'.
+    """
+    tiempos = {}
+    token = _tiempos.set(tiempos)
+    try:
+        yield tiempos
+    finally:
+        _tiempos.reset(token)
+
+
+def agregar(etapa, segundos):
+    """
+    Suma segundos a una etapa de la depuración en curso. Fuera de medir_depuracion no hace nada.
+    """
+    tiempos = _tiempos.get()
+    if tiempos is not None:
+        tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+
+    observador = _observador.get()
+    if observador is not None:
+        observador(etapa)
+
+
+@contextmanager
+def observar_etapas(funcion):
+    """
+    Llama a una función con el nombre de cada etapa que termina dentro del bloque.
+    """
+    token = _observador.set(funcion)
+    try:
+        yield
+    finally:
+        _observador.reset(token)
+
+
+def etiquetar(formato):
+    """
+    Indica la clave del formato del archivo de la depuración en curso.
+    """
+    tiempos = _tiempos.get()
+    if tiempos is not None:
+        tiempos['formato'] = formato
+
+
+@contextmanager
+def etapa(nombre):
+    """
+    Mide el tiempo del bloque y lo suma a una etapa de la depuración en curso.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        agregar(nombre, time.perf_counter() - inicio)
+
+
+def repartir(archivos, nombre, segundos):
+    """
+    Reparte el tiempo de una etapa ejecutada en bloque entre los archivos medidos.
+    """
+    medidos = [archivo for archivo in archivos if archivo.tiempos.get('formato')]
+    for archivo in medidos:
+        archivo.tiempos[nombre] = archivo.tiempos.get(nombre, 0.0) + segundos / len(medidos)
+
+
+def cubeta(segundos):
+    """
+    Obtiene la posición de la cubeta de un tiempo, len(CUBETAS) si supera la última.
+    """
+    return bisect_left(CUBETAS, segundos)
+
+
+def registrar_tiempos(archivos):
+    """
+    Guarda los tiempos de cada archivo y los suma a los histogramas por formato y etapa con
+    actualizaciones atómicas, así varios procesos pueden registrar tiempos al mismo tiempo.
+    Los archivos sin formato, reutilizados de otro archivo idéntico, no se registran.
+
+    Parámetros:
+        archivos (list): Archivos con sus tiempos en Archivo.tiempos.
+    """
+    medidos = [archivo for archivo in archivos if archivo.tiempos.get('formato')]
+    if not medidos:
+        return
+
+    cambios = {}
+    for archivo in medidos:
+        formato = archivo.tiempos['formato']
+        for nombre in ETAPAS:
+            segundos = archivo.tiempos.get(nombre)
+            if segundos is None:
+                continue
+            cambio = cambios.setdefault(
+                (formato, nombre, cubeta(segundos)), [0, 0.0])
+            cambio[0] += 1
+            cambio[1] += segundos
+
+    with transaction.atomic():
+        Archivo.objects.bulk_update(medidos, ['tiempos'], batch_size=500)
+
+        # Crear las cubetas que todavía no existen
+        TiempoEtapa.objects.bulk_create([
+            TiempoEtapa(formato=formato, etapa=nombre, cubeta=posicion)
+            for formato, nombre, posicion in cambios
+        ], ignore_conflicts=True)
+
+        # Actualizar en el mismo orden en todos los procesos para evitar bloqueos mutuos
+        for (formato, nombre, posicion), (conteo, suma) in sorted(cambios.items()):
+            TiempoEtapa.objects.filter(
+                formato=formato, etapa=nombre, cubeta=posicion
+            ).update(conteo=F('conteo') + conteo, suma=F('suma') + suma)
+
+
+def escapar(valor):
+    """
+    Escapa el valor de una etiqueta del formato de texto de Prometheus.
+    """
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def texto_prometheus():
+    """
+    Genera los histogramas de los tiempos por formato y etapa en el formato de texto de Prometheus.
+    Las cubetas se acumulan al generar el texto, en la base de datos cada tiempo suma en una sola.
+
+    Retorna:
+        str: El texto de las métricas.
+    """
+    histogramas = {}
+    for formato, nombre, posicion, conteo, suma in TiempoEtapa.objects.values_list(
+            'formato', 'etapa', 'cubeta', 'conteo', 'suma'):
+        conteos, sumas = histogramas.setdefault((formato, nombre), ({}, []))
+        conteos[posicion] = conteos.get(posicion, 0) + conteo
+        sumas.append(suma)
+
+    lineas = [
+        f'# HELP {NOMBRE_METRICA} Duración de cada etapa de la depuración por formato del archivo.',
+        f'# TYPE {NOMBRE_METRICA} histogram',
+    ]
+
+    for (formato, nombre), (conteos, sumas) in sorted(histogramas.items()):
+        etiquetas = f'formato="{escapar(formato)}",etapa="{escapar(nombre)}"'
+        acumulado = 0
+        for posicion, limite in enumerate(CUBETAS):
+            acumulado += conteos.get(posicion, 0)
+            lineas.append(
+                f'{NOMBRE_METRICA}_bucket{{{etiquetas},le="{float(limite)}"}} {acumulado}')
+        total = sum(conteos.values())
+        lineas.append(f'{NOMBRE_METRICA}_bucket{{{etiquetas},le="+Inf"}} {total}')
+        lineas.append(f'{NOMBRE_METRICA}_sum{{{etiquetas}}} {sum(sumas)}')
+        lineas.append(f'{NOMBRE_METRICA}_count{{{etiquetas}}} {total}')
+
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,196 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from calidad_producto.models import Trabajo
+from calidad_producto.resources import perfiles
+from calidad_producto.resources.procesamiento import DEPURACIONES, depurar_en_paralelo, eliminar_archivo_referencia, mensaje_error
+
+
+# Minutos en proceso tras los que un trabajo se considera abandonado y puede volver a la cola
+MINUTOS_RECUPERACION = 60
+
+
+def encolar_trabajo(archivo, valor_porcentaje):
+    """
+    Crea un trabajo pendiente para depurar un archivo ya guardado.
+
+    Parámetros:
+        archivo (Archivo): El archivo a depurar.
+        valor_porcentaje (int o None): El valor del porcentaje a utilizar en la depuración.
+
+    Retorna:
+        Trabajo: El trabajo creado.
+    """
+    return Trabajo.objects.create(
+        archivo=archivo,
+        nombre_archivo=archivo.archivo.name.split('/')[-1],
+        categoria_id=archivo.categoria_id,
+        valor_porcentaje=valor_porcentaje
+    )
+
+
+def reclamar_trabajos(cantidad=1):
+    """
+    Toma los trabajos pendientes más antiguos y los marca como en proceso. Las filas bloqueadas
+    por otro proceso se saltan, por lo que varios procesos pueden compartir la cola.
+
+    Parámetros:
+        cantidad (int): La cantidad máxima de trabajos a reclamar.
+
+    Retorna:
+        list: Los trabajos reclamados, vacía si no hay trabajos pendientes.
+    """
+    with transaction.atomic():
+        trabajos = list(
+            Trabajo.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('archivo')
+            .filter(estado=Trabajo.PENDIENTE)
+            .order_by('creado_el', 'id')[:cantidad]
+        )
+
+        ahora = timezone.now()
+        for trabajo in trabajos:
+            trabajo.estado = Trabajo.PROCESANDO
+            trabajo.iniciado_el = ahora
+
+        Trabajo.objects.bulk_update(trabajos, ['estado', 'iniciado_el'])
+
+    return trabajos
+
+
+def reclamar_trabajo():
+    """
+    Toma el trabajo pendiente más antiguo y lo marca como en proceso.
+
+    Retorna:
+        Trabajo o None: El trabajo reclamado o None si no hay trabajos pendientes.
+    """
+    trabajos = reclamar_trabajos(1)
+    return trabajos[0] if trabajos else None
+
+
+def ejecutar_trabajo(trabajo):
+    """
+    Depura el archivo de un trabajo y registra el resultado. Si la depuración falla, el archivo
+    se elimina igual que en la carga directa y el error queda guardado en el trabajo.
+
+    Parámetros:
+        trabajo (Trabajo): El trabajo a ejecutar.
+    """
+    archivo = trabajo.archivo
+
+    try:
+        if archivo is None:
+            raise ValueError("El archivo del trabajo ya no existe.")
+
+        perfil = perfiles.obtener_perfil(archivo.analizador_id)
+        if perfil is None:
+            raise ValueError("El analizador del archivo no existe.")
+
+        # Procesar el archivo según su categoría
+        depuracion = DEPURACIONES[archivo.categoria_id]
+        depuracion(archivo, perfil, trabajo.valor_porcentaje)
+
+        trabajo.estado = Trabajo.COMPLETADO
+
+    except Exception as e:
+        trabajo.estado = Trabajo.ERROR
+        trabajo.error = mensaje_error(e)
+
+    if trabajo.estado == Trabajo.ERROR and archivo is not None:
+        # Si ocurre un error al procesar el archivo, eliminar el archivo guardado
+        eliminar_archivo_referencia(archivo)
+        trabajo.archivo = None
+
+    trabajo.finalizado_el = timezone.now()
+    trabajo.save(update_fields=['archivo', 'estado', 'error', 'finalizado_el'])
+
+
+def ejecutar_trabajos_en_paralelo(trabajos, ejecutor):
+    """
+    Depura los archivos de varios trabajos en un grupo de procesos y registra los resultados en bloque.
+
+    Parámetros:
+        trabajos (list): Los trabajos a ejecutar.
+        ejecutor (ProcessPoolExecutor): El grupo de procesos a utilizar.
+    """
+    pendientes = [(trabajo.archivo, trabajo.valor_porcentaje)
+                  for trabajo in trabajos if trabajo.archivo is not None]
+
+    errores = depurar_en_paralelo(pendientes, ejecutor)
+
+    ahora = timezone.now()
+    for trabajo in trabajos:
+        if trabajo.archivo is None:
+            trabajo.estado = Trabajo.ERROR
+            trabajo.error = mensaje_error(
+                ValueError("El archivo del trabajo ya no existe."))
+        elif trabajo.archivo_id in errores:
+            trabajo.estado = Trabajo.ERROR
+            trabajo.error = errores[trabajo.archivo_id]
+            trabajo.archivo = None
+        else:
+            trabajo.estado = Trabajo.COMPLETADO
+        trabajo.finalizado_el = ahora
+
+    Trabajo.objects.bulk_update(
+        trabajos, ['archivo', 'estado', 'error', 'finalizado_el'])
+
+
+def recuperar_trabajos(minutos=None):
+    """
+    Devuelve a la cola los trabajos que quedaron en proceso, por ejemplo tras detener el procesador.
+    Solamente se recuperan los que llevan más del tiempo indicado en proceso, así no se vuelven a
+    encolar los trabajos que otro procesador todavía está ejecutando.
+
+    Parámetros:
+        minutos (int, float o None): Minutos en proceso tras los que se recupera un trabajo. None
+            para usar RECUPERAR_TRABAJOS_MINUTOS de la configuración.
+
+    Retorna:
+        int: La cantidad de trabajos recuperados.
+    """
+    if minutos is None:
+        minutos = getattr(settings, 'RECUPERAR_TRABAJOS_MINUTOS', MINUTOS_RECUPERACION)
+    limite = timezone.now() - timedelta(minutes=minutos)
+
+    return Trabajo.objects.filter(estado=Trabajo.PROCESANDO, iniciado_el__lt=limite).update(
+        estado=Trabajo.PENDIENTE, iniciado_el=None)
+
+
+def procesar_cola(detener, intervalo=2, una_vez=False, ejecutor=None, lote=1):
+    """
+    Ejecuta trabajos de la cola hasta que se indique detener el procesador.
+
+    Parámetros:
+        detener (threading.Event): Evento que indica que el procesador debe terminar.
+        intervalo (int o float): Segundos de espera cuando no hay trabajos pendientes.
+        una_vez (bool): Terminar cuando la cola quede vacía.
+        ejecutor (ProcessPoolExecutor o None): Grupo de procesos para depurar en paralelo. None para depurar en el hilo actual.
+        lote (int): Cantidad de trabajos que se reclaman a la vez cuando se usa un grupo de procesos.
+
+    Retorna:
+        int: La cantidad de trabajos ejecutados.
+    """
+    ejecutados = 0
+
+    while not detener.is_set():
+        close_old_connections()
+        trabajos = reclamar_trabajos(lote if ejecutor is not None else 1)
+
+        if not trabajos:
+            if una_vez:
+                break
+            detener.wait(intervalo)
+            continue
+
+        if ejecutor is not None:
+            ejecutar_trabajos_en_paralelo(trabajos, ejecutor)
+        else:
+            ejecutar_trabajo(trabajos[0])
+        ejecutados += len(trabajos)
+
+    close_old_connections()
+    return ejecutados
@@ -0,0 +1,122 @@
+import math
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+
+# Clave de la información donde se guardan los resultados por ventana de tiempo
+CLAVE = 'ventanas'
+
+# Ventanas de tiempo por defecto como {nombre: (ancho, paso)} en horas. Si el paso es menor
+# que el ancho la ventana es móvil. Se pueden cambiar con VENTANAS_DEPURACION en la configuración.
+VENTANAS = {
+    'diaria': (24, 24),
+    'semanal': (168, 168),  # Período de evaluación de 7 días
+    'movil': (168, 24),     # Períodos de 7 días que avanzan de un día en un día
+}
+
+# Decimales de los porcentajes guardados
+DECIMALES = 3
+
+HORA = pd.Timedelta(hours=1).value
+DIA = pd.Timedelta(days=1).value
+
+
+def obtener_ventanas():
+    """
+    Obtiene las ventanas de tiempo configuradas.
+    """
+    return getattr(settings, 'VENTANAS_DEPURACION', VENTANAS)
+
+
+def sumar_intervalos(valores, limites):
+    """
+    Suma las filas de una matriz ordenada por fecha en los intervalos [limites[i], limites[i + 1])
+    con np.add.reduceat, sin recorrer las filas. Los intervalos vacíos suman 0.
+
+    Parámetros:
+        valores (ndarray): Matriz booleana de filas por columnas.
+        limites (ndarray): Posición de la primera fila de cada intervalo y, al final, la cantidad de filas.
+
+    Retorna:
+        tuple: Las sumas por intervalo y columna, y la cantidad de filas de cada intervalo.
+    """
+    conteos = np.diff(limites)
+    sumas = np.zeros((len(conteos), valores.shape[1]), dtype=np.int64)
+    llenos = conteos > 0
+    if llenos.any():
+        # Cada suma llega hasta el siguiente intervalo con filas, los intervalos vacíos no tienen filas
+        sumas[llenos] = np.add.reduceat(valores, limites[:-1][llenos], axis=0, dtype=np.int64)
+    return sumas, conteos
+
+
+def agrupar(sumas, conteos, intervalos):
+    """
+    Suma grupos de intervalos consecutivos que avanzan de un intervalo en un intervalo. Solamente
+    se devuelven los grupos completos, o un solo grupo con todos los intervalos si no hay ninguno.
+    """
+    if intervalos == 1:
+        return sumas, conteos
+
+    acumuladas = np.concatenate([np.zeros((1, sumas.shape[1]), dtype=np.int64), sumas.cumsum(axis=0)])
+    acumulados = np.concatenate([[0], conteos.cumsum()])
+    if len(conteos) < intervalos:
+        return acumuladas[-1:], acumulados[-1:]
+    return acumuladas[intervalos:] - acumuladas[:-intervalos], acumulados[intervalos:] - acumulados[:-intervalos]
+
+
+def calcular_ventanas(fechas, excedidos, columnas, ventanas=None):
+    """
+    Calcula el porcentaje de muestras fuera de límite de cada columna en cada ventana de tiempo.
+    Las filas se agrupan primero en intervalos del paso de la ventana con una sola pasada vectorizada,
+    y cada ventana suma los intervalos que cubre. Las ventanas empiezan a la medianoche del primer día.
+
+    Parámetros:
+        fechas (DatetimeIndex): La fecha y hora de cada fila, NaT si no se pudo interpretar.
+        excedidos (ndarray): Matriz booleana de filas por columnas, True si el valor está fuera de límite.
+        columnas (list): El nombre o la clave de cada columna de la matriz.
+        ventanas (dict o None): Ventanas como {nombre: (ancho, paso)} en horas. None para utilizar la configuración.
+
+    Retorna:
+        dict: Las columnas y, por cada ventana, el inicio de cada período, la cantidad de muestras y
+        los porcentajes por período y columna. Vacío si ninguna fila tiene fecha.
+    """
+    validas = ~np.asarray(fechas.isna())
+    if not validas.any() or not columnas:
+        return {}
+
+    marcas = np.asarray(fechas[validas], dtype='datetime64[ns]').view(np.int64)
+    excedidos = excedidos[validas]
+
+    # Los archivos están ordenados por fecha, solamente se ordenan si no lo están
+    if np.any(marcas[1:] < marcas[:-1]):
+        orden = np.argsort(marcas, kind='stable')
+        marcas = marcas[orden]
+        excedidos = excedidos[orden]
+
+    origen = marcas[0] - marcas[0] % DIA
+    periodos = {}
+
+    for nombre, (ancho, paso) in (ventanas or obtener_ventanas()).items():
+        ancho, paso = round(ancho * HORA), round(paso * HORA)
+        if paso <= 0 or ancho % paso:
+            raise ValueError(f"El ancho de la ventana '{nombre}' debe ser un múltiplo de su paso.")
+
+        # Intervalos del paso que cubren todas las filas
+        cantidad = (marcas[-1] - origen) // paso + 1
+        limites = np.searchsorted(marcas, origen + paso * np.arange(cantidad + 1))
+        sumas, conteos = agrupar(*sumar_intervalos(excedidos, limites), ancho // paso)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            porcentajes = np.round(sumas / conteos[:, None] * 100, DECIMALES)
+
+        inicios = pd.to_datetime(origen + paso * np.arange(len(conteos)), unit='ns')
+        periodos[nombre] = {
+            'inicio': inicios.strftime('%Y-%m-%dT%H:%M').tolist(),
+            'muestras': conteos.tolist(),
+            # Los períodos sin muestras no tienen porcentaje
+            'porcentajes': [[None if math.isnan(valor) else valor for valor in fila]
+                            for fila in porcentajes.tolist()],
+        }
+
+    return {'columnas': list(columnas), 'periodos': periodos}
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Analizador
+from .resources.perfiles import invalidar_perfiles
+
+
+@receiver(post_save, sender=Analizador)
+@receiver(post_delete, sender=Analizador)
+def analizador_modificado(sender, **kwargs):
+    """
+    Invalida el registro de perfiles cuando se crea, modifica o elimina un analizador.
+    """
+    invalidar_perfiles()
@@ -1,3 +1,1357 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import datetime, time, timedelta
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import UnreadablePostError
+from django.test import Client, TestCase, override_settings
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from .models import (Analizador, Archivo, Carga, Categoria, Limite, LimiteArmonico, PerfilArmonico, ResultadoMetrica,
+                     Resumen, TiempoEtapa, Tipo, Trabajo)
+from .resources import (cargas, comprimidos, depuracion_armonico, depuracion_tendencia, estadisticas, formatos, ingesta, lectura,
+                        matriz, perfiles, series, sinteticos, tiempos, trabajos, ventanas)
+from .resources.paginacion import TAMANO_PAGINA
+from .resources.procesamiento import (VERSION_DEPURACION, buscar_resultado, crear_ejecutor, depurar_en_paralelo,
+                                      eliminar_archivo_referencia, firma_limites, obtener_limites, preparar_archivo)
+from .resources.procesamiento import depuracion_armonico as depuracion_armonico_archivo
+from .resources.procesamiento import depuracion_tendencia as depuracion_tendencia_archivo
+from .resources.resultados import fase_columna, guardar_resultados, orden_columna, resultados_armonico
+from .resources.resumenes import reconstruir_resumenes
+from .views import obtener_archivos_por_categoria
+
+
+class LecturaTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = carpeta.name
+
+    def leer_con_read_excel(self, ruta, formato):
+        """
+        Lee el archivo completo con pd.read_excel y lo recorta como la lectura anterior.
+        """
+        df = pd.read_excel(ruta, header=None).iloc[formato.filas, formato.columnas]
+        df.columns = df.iloc[0]
+        df = formato.normalizar(df.iloc[1 + formato.filas_descartadas:].reset_index(drop=True))
+        return df.apply(pd.to_numeric, errors='coerce')
+
+    def test_lectura_igual_a_read_excel(self):
+        for formato in formatos.FORMATOS:
+            with self.subTest(formato=formato.clave):
+                ruta = sinteticos.generar_libro(
+                    os.path.join(self.carpeta, f'{formato.clave}.xlsx'), formato.analizador,
+                    formato.categoria, filas=60, fases=3, ordenes=5)
+
+                esperado = self.leer_con_read_excel(ruta, formato)
+                df = lectura.leer_columnas(ruta, formato.filas, formato.columnas, formato.normalizar,
+                                           formato.filas_descartadas)
+
+                self.assertEqual(list(df.columns), list(esperado.columns))
+                np.testing.assert_array_equal(df.to_numpy(), esperado.to_numpy(dtype=np.float64))
+
+    def test_solamente_columnas_requeridas(self):
+        formato = formatos.obtener_formato('SONEL', formatos.TENDENCIA)
+        ruta = sinteticos.generar_libro(
+            os.path.join(self.carpeta, 'sonel.xlsx'), 'SONEL', formatos.TENDENCIA, filas=20)
+
+        requeridas = ['Pst L2', 'U L1 avg', 'No existe']
+        df = lectura.leer_columnas(ruta, formato.filas, formato.columnas, formato.normalizar,
+                                   requeridas=requeridas)
+
+        # Las columnas se leen en el orden del archivo y las que no existen se omiten
+        self.assertEqual(list(df.columns), ['U L1 avg', 'Pst L2'])
+        esperado = self.leer_con_read_excel(ruta, formato)
+        np.testing.assert_array_equal(df['Pst L2'].to_numpy(), esperado['Pst L2'].to_numpy(dtype=np.float64))
+
+    def test_archivo_inexistente(self):
+        with redirect_stdout(StringIO()):
+            self.assertIsNone(lectura.leer_columnas(os.path.join(self.carpeta, 'no_existe.xlsx')))
+
+
+class ColaTrabajosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Trifásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL', **sinteticos.COLUMNAS_TENDENCIA['SONEL'])
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=carpeta.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.carpeta = carpeta.name
+
+    def encolar(self, nombre, contenido=None):
+        """
+        Guarda un archivo de tendencia, por defecto un libro sintético, y encola su depuración.
+        """
+        if contenido is None:
+            ruta = sinteticos.generar_libro(
+                os.path.join(self.carpeta, nombre), 'SONEL', formatos.TENDENCIA, filas=50)
+            with open(ruta, 'rb') as libro:
+                contenido = libro.read()
+        archivo = Archivo.objects.create(
+            archivo=SimpleUploadedFile(nombre, contenido), categoria=self.categoria,
+            tipo=self.tipo, analizador=self.analizador)
+        return trabajos.encolar_trabajo(archivo, None)
+
+    def test_reclamar_y_recuperar(self):
+        encolados = [self.encolar(f'libro_{indice}.xlsx', b'') for indice in range(3)]
+
+        # Los trabajos se reclaman del más antiguo al más reciente y no se reclaman dos veces
+        reclamados = trabajos.reclamar_trabajos(2)
+        self.assertEqual([trabajo.id for trabajo in reclamados], [trabajo.id for trabajo in encolados[:2]])
+        self.assertEqual(trabajos.reclamar_trabajo().id, encolados[2].id)
+        self.assertIsNone(trabajos.reclamar_trabajo())
+        self.assertEqual(Trabajo.objects.filter(estado=Trabajo.PROCESANDO).count(), 3)
+
+        # Los trabajos que acaban de iniciar pueden seguir en curso en otro procesador
+        self.assertEqual(trabajos.recuperar_trabajos(), 0)
+        Trabajo.objects.filter(id=encolados[0].id).update(
+            iniciado_el=timezone.now() - timedelta(minutes=90))
+        self.assertEqual(trabajos.recuperar_trabajos(), 1)
+        self.assertEqual(trabajos.recuperar_trabajos(minutos=30), 0)
+
+        # Tras detener el procesador los trabajos en proceso vuelven a la cola
+        self.assertEqual(trabajos.recuperar_trabajos(minutos=0), 2)
+        self.assertFalse(Trabajo.objects.exclude(estado=Trabajo.PENDIENTE).exists())
+        self.assertEqual(len(trabajos.reclamar_trabajos(5)), 3)
+
+    def test_procesar_cola(self):
+        correcto = self.encolar('libro.xlsx')
+        fallido = self.encolar('danado.xlsx', b'no es un libro')
+
+        with redirect_stdout(StringIO()):
+            self.assertEqual(trabajos.procesar_cola(threading.Event(), una_vez=True), 2)
+
+        correcto.refresh_from_db()
+        self.assertEqual(correcto.estado, Trabajo.COMPLETADO)
+        self.assertTrue(correcto.archivo.informacion)
+
+        # El archivo que no se pudo depurar se elimina y el error queda en el trabajo
+        fallido.refresh_from_db()
+        self.assertEqual(fallido.estado, Trabajo.ERROR)
+        self.assertIsNone(fallido.archivo)
+        self.assertTrue(fallido.error)
+
+
+class DepuracionParalelaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Trifásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL', **sinteticos.COLUMNAS_TENDENCIA['SONEL'])
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=carpeta.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.carpeta = carpeta.name
+
+    def crear_archivo(self, nombre, semilla=0, contenido=None):
+        if contenido is None:
+            ruta = sinteticos.generar_libro(
+                os.path.join(self.carpeta, nombre), 'SONEL', formatos.TENDENCIA, filas=80, semilla=semilla)
+            with open(ruta, 'rb') as libro:
+                contenido = libro.read()
+        return Archivo.objects.create(
+            archivo=SimpleUploadedFile(nombre, contenido), categoria=self.categoria,
+            tipo=self.tipo, analizador=self.analizador)
+
+    def test_grupo_de_procesos(self):
+        archivos = [self.crear_archivo(f'libro_{semilla}.xlsx', semilla) for semilla in range(3)]
+        danado = self.crear_archivo('danado.xlsx', contenido=b'no es un libro')
+        danado_id = danado.id
+
+        ejecutor = crear_ejecutor(2)
+        self.addCleanup(ejecutor.shutdown)
+        with redirect_stdout(StringIO()):
+            errores = depurar_en_paralelo([(archivo, None) for archivo in archivos + [danado]], ejecutor)
+
+        # Un archivo que falla no afecta al resto y se elimina
+        self.assertEqual(list(errores), [danado_id])
+        self.assertFalse(Archivo.objects.filter(id=danado_id).exists())
+
+        # Los resultados son los mismos que los de la depuración en el proceso actual
+        for archivo in archivos:
+            en_paralelo = Archivo.objects.get(id=archivo.id).informacion
+            with redirect_stdout(StringIO()):
+                depuracion_tendencia_archivo(archivo, self.analizador, None)
+            self.assertEqual(en_paralelo, Archivo.objects.get(id=archivo.id).informacion)
+
+
+class ArchivosIdenticosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Trifásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL', **sinteticos.COLUMNAS_TENDENCIA['SONEL'])
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=carpeta.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        ruta = sinteticos.generar_libro(
+            os.path.join(carpeta.name, 'libro.xlsx'), 'SONEL', formatos.TENDENCIA, filas=50)
+        with open(ruta, 'rb') as libro:
+            self.contenido = libro.read()
+
+    def subir(self):
+        """
+        Guarda y depura una copia del mismo libro.
+        """
+        archivo = preparar_archivo(SimpleUploadedFile('libro.xlsx', self.contenido), self.categoria,
+                                   self.tipo, self.analizador)
+        archivo.save()
+        with redirect_stdout(StringIO()):
+            depuracion_tendencia_archivo(archivo, self.analizador, None)
+        return archivo
+
+    def test_reutiliza_resultado(self):
+        primero = self.subir()
+        self.assertEqual(primero.hash_sha256, hashlib.sha256(self.contenido).hexdigest())
+
+        # El segundo archivo idéntico reutiliza la información sin volver a depurarlo
+        with mock.patch('calidad_producto.resources.procesamiento.calcular_tendencia') as calcular:
+            segundo = self.subir()
+        calcular.assert_not_called()
+        self.assertEqual(segundo.informacion, primero.informacion)
+
+        # Con otra versión de la depuración el resultado no se reutiliza
+        Archivo.objects.filter(id=primero.id).update(version_depuracion=VERSION_DEPURACION - 1)
+        Archivo.objects.filter(id=segundo.id).delete()
+        with mock.patch('calidad_producto.resources.procesamiento.calcular_tendencia',
+                        return_value={'flicker_fase_a': 0.0}) as calcular:
+            self.subir()
+        calcular.assert_called_once()
+
+    @override_settings(DEDUPLICAR_ARCHIVOS=True)
+    def test_deduplicar_archivos(self):
+        primero = self.subir()
+        segundo = self.subir()
+
+        # El contenido se guarda una sola vez y se conserva mientras otro archivo lo utilice
+        self.assertEqual(segundo.archivo.name, primero.archivo.name)
+        ruta = primero.archivo.path
+        with redirect_stdout(StringIO()):
+            eliminar_archivo_referencia(segundo)
+            self.assertTrue(os.path.exists(ruta))
+            eliminar_archivo_referencia(primero)
+        self.assertFalse(os.path.exists(ruta))
+
+
+class MatrizTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.formato = formatos.obtener_formato('AEMC', formatos.TENDENCIA)
+        self.ruta = sinteticos.generar_libro(
+            os.path.join(carpeta.name, 'aemc.xlsx'), 'AEMC', formatos.TENDENCIA, filas=70)
+
+    def test_matriz_reutilizada(self):
+        requeridas = list(sinteticos.COLUMNAS_TENDENCIA['AEMC'].values())
+        df = matriz.leer_matriz(self.ruta, self.formato, requeridas)
+        pd.testing.assert_frame_equal(df, matriz.leer_columnas(self.ruta, self.formato, requeridas))
+        self.assertTrue(all(os.path.exists(ruta) for ruta in matriz.rutas_matriz(self.ruta)))
+        self.assertEqual(matriz.contar_filas(self.ruta), len(df))
+
+        # La matriz vigente se lee sin abrir el libro
+        with mock.patch.object(lectura, 'iterar_filas', side_effect=AssertionError):
+            pd.testing.assert_frame_equal(matriz.leer_matriz(self.ruta, self.formato, requeridas), df)
+
+        # Si el archivo original cambia la matriz se vuelve a generar
+        sinteticos.generar_libro(self.ruta, 'AEMC', formatos.TENDENCIA, filas=40, semilla=1)
+        self.assertEqual(len(matriz.leer_matriz(self.ruta, self.formato, requeridas)), 40)
+
+        matriz.eliminar_matriz(self.ruta)
+        self.assertFalse(any(os.path.exists(ruta) for ruta in matriz.rutas_matriz(self.ruta)))
+        self.assertTrue(os.path.exists(self.ruta))
+
+
+class MetricasTendenciaTests(TestCase):
+
+    def setUp(self):
+        generador = np.random.default_rng(11)
+        self.valores_columna = sinteticos.COLUMNAS_TENDENCIA['SONEL']
+        self.df = pd.DataFrame({
+            nombre: generador.normal(120, 6, 500) if campo.startswith('voltaje') else generador.gamma(2, 1.5, 500)
+            for campo, nombre in self.valores_columna.items()
+        })
+        # Celdas vacías, que no cuentan como muestras
+        self.df.iloc[::7, 1] = np.nan
+
+    def test_igual_que_por_columna(self):
+        with redirect_stdout(StringIO()):
+            esperado = depuracion_tendencia.obtener_informacion_por_columna(self.df, self.valores_columna)
+        self.assertEqual(depuracion_tendencia.obtener_informacion(self.df, self.valores_columna), esperado)
+
+    def test_limites_configurados(self):
+        limites = dict(depuracion_tendencia.LIMITES, flicker=(None, 100), voltaje=(0, 1000))
+        informacion = depuracion_tendencia.obtener_informacion(self.df, self.valores_columna, limites)
+
+        self.assertEqual(informacion['flicker_fase_a'], 0)
+        self.assertEqual(informacion['desviacion_voltaje_fase_b'], 0)
+        self.assertGreater(informacion['vthd_fase_a'], 0)
+
+
+class LimitesTendenciaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Trifásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL', **sinteticos.COLUMNAS_TENDENCIA['SONEL'])
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=carpeta.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        ruta = sinteticos.generar_libro(
+            os.path.join(carpeta.name, 'libro.xlsx'), 'SONEL', formatos.TENDENCIA, filas=200)
+        with open(ruta, 'rb') as libro:
+            self.archivo = Archivo.objects.create(
+                archivo=SimpleUploadedFile('libro.xlsx', libro.read()), categoria=self.categoria,
+                tipo=self.tipo, analizador=self.analizador, voltaje_nominal=220)
+
+    def test_limites_por_tipo_y_voltaje(self):
+        self.assertEqual(depuracion_tendencia.obtener_limites(self.tipo.id, 220), depuracion_tendencia.LIMITES)
+
+        limite = Limite.objects.create(tipo=self.tipo, voltaje_nominal=220, voltaje_inferior=202.4,
+                                       voltaje_superior=237.6, flicker=1.5)
+        limites = depuracion_tendencia.obtener_limites(self.tipo.id, 220)
+        self.assertEqual(limites, limite.como_limites())
+        self.assertEqual(limites['voltaje'], (202.4, 237.6))
+        self.assertEqual(depuracion_tendencia.obtener_limites(self.tipo.id, 120), depuracion_tendencia.LIMITES)
+
+    def test_reevaluar_tendencias(self):
+        with redirect_stdout(StringIO()):
+            depuracion_tendencia_archivo(self.archivo, self.analizador, None)
+        antes = Archivo.objects.get(id=self.archivo.id).informacion
+        self.assertGreater(antes['flicker_fase_a'], 0)
+
+        # Con límites más amplios ningún valor de flicker ni de voltaje queda fuera de límite
+        Limite.objects.create(tipo=self.tipo, voltaje_nominal=220, voltaje_inferior=0,
+                              voltaje_superior=1000, flicker=100)
+        salida = StringIO()
+        call_command('reevaluar_tendencias', stdout=salida)
+        self.assertIn('Archivos actualizados: 1, con error: 0', salida.getvalue())
+
+        despues = Archivo.objects.get(id=self.archivo.id)
+        self.assertEqual(despues.informacion['flicker_fase_a'], 0)
+        self.assertEqual(despues.informacion['desviacion_voltaje_fase_a'], 0)
+        self.assertEqual(despues.informacion['vthd_fase_a'], antes['vthd_fase_a'])
+        self.assertEqual(despues.firma_limites, firma_limites(obtener_limites(despues)))
+
+
+class RegistroPerfilesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.analizador = Analizador.objects.create(nombre='SONEL', **sinteticos.COLUMNAS_TENDENCIA['SONEL'])
+
+    def setUp(self):
+        perfiles.invalidar_perfiles()
+        self.addCleanup(perfiles.invalidar_perfiles)
+
+    def test_perfiles_sin_consultas(self):
+        perfil = perfiles.obtener_perfil(self.analizador.id)
+        self.assertEqual(perfil.valores_columna(), sinteticos.COLUMNAS_TENDENCIA['SONEL'])
+
+        with self.assertNumQueries(0):
+            self.assertIs(perfiles.obtener_perfil(nombre='SONEL'), perfil)
+            self.assertEqual(perfiles.listar_perfiles(), [perfil])
+
+        # Guardar un analizador en este proceso invalida el registro de inmediato
+        self.analizador.voltaje_a = 'U L1 max'
+        self.analizador.save()
+        self.assertEqual(perfiles.obtener_perfil(self.analizador.id).valores_columna()['voltaje_a'], 'U L1 max')
+
+    def test_cambio_en_otro_proceso(self):
+        perfiles.obtener_perfil(self.analizador.id)
+
+        # Un cambio que no envía señales, como el que hace el administrador en otro proceso
+        Analizador.objects.filter(id=self.analizador.id).update(
+            voltaje_a='U L1 max', actualizado_el=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(perfiles.obtener_perfil(self.analizador.id).valores_columna()['voltaje_a'], 'U L1 avg')
+
+        # Al verificar la versión se detecta el cambio y los perfiles se vuelven a cargar
+        with override_settings(INTERVALO_PERFILES=0):
+            self.assertEqual(perfiles.obtener_perfil(self.analizador.id).valores_columna()['voltaje_a'], 'U L1 max')
+            with self.assertNumQueries(1):
+                perfiles.obtener_perfil(self.analizador.id)
+
+
+class FormatosTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = carpeta.name
+
+    def test_detectar_formato(self):
+        for formato in formatos.FORMATOS:
+            with self.subTest(formato=formato.clave):
+                ruta = sinteticos.generar_libro(
+                    os.path.join(self.carpeta, f'{formato.clave}.xlsx'), formato.analizador,
+                    formato.categoria, filas=20, fases=3, ordenes=5)
+
+                self.assertEqual(formatos.detectar_formato(ruta), formato)
+                self.assertEqual(formatos.detectar_formato(ruta, formato.categoria), formato)
+
+                # Un archivo subido se detecta igual y queda listo para volver a leerse
+                with open(ruta, 'rb') as libro:
+                    subido = SimpleUploadedFile(f'{formato.clave}.xlsx', libro.read())
+                self.assertEqual(formatos.detectar_formato(subido), formato)
+                self.assertEqual(subido.tell(), 0)
+
+    def test_archivo_sin_formato(self):
+        ruta = os.path.join(self.carpeta, 'otro.xlsx')
+        libro = Workbook()
+        libro.active.append(['Nombre', 'Dirección'])
+        libro.active.append(['Punto 1', 'Calle 1'])
+        libro.save(ruta)
+        self.assertIsNone(formatos.detectar_formato(ruta))
+
+        with redirect_stdout(StringIO()):
+            self.assertIsNone(formatos.detectar_formato(SimpleUploadedFile('danado.xlsx', b'no es un libro')))
+
+    def test_normalizar_encabezados(self):
+        sonel = formatos.obtener_formato('SONEL', formatos.TENDENCIA)
+        self.assertEqual(sonel.normalizar_nombres(['U L1 avg. 10 min [V]', ' Pst L1 [] ', 'U L1 instant [V]', 7]),
+                         ['U L1 avg', 'Pst L1', 'U L1 inst', None])
+
+        aemc = formatos.obtener_formato('AEMC', formatos.ARMONICO)
+        # Los encabezados de armónicos de AEMC no se recortan
+        self.assertEqual(aemc.normalizar_nombres([' H3 V L1 ']), [' H3 V L1 '])
+        self.assertIsNone(formatos.obtener_formato('OTRO', formatos.TENDENCIA))
+
+
+class ListadoArchivosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+
+    def crear_archivos(self, cantidad):
+        """
+        Crea archivos con fechas de subida distintas, algunos con un trabajo pendiente.
+        """
+        inicio = timezone.now()
+        archivos = Archivo.objects.bulk_create([
+            Archivo(archivo=f'archivos/tendencias/archivo_{indice}.xlsx', categoria=self.categoria,
+                    tipo=self.tipo, analizador=self.analizador)
+            for indice in range(cantidad)
+        ])
+        for indice, archivo in enumerate(archivos):
+            archivo.subido_el = inicio + timedelta(minutes=indice)
+        Archivo.objects.bulk_update(archivos, ['subido_el'])
+
+        Trabajo.objects.bulk_create([
+            Trabajo(archivo=archivo, nombre_archivo=archivo.archivo.name, categoria=self.categoria)
+            for archivo in archivos[::3]
+        ])
+        return archivos
+
+    def comprobar_consultas(self):
+        """
+        Comprueba que la primera página del listado se obtiene con una sola consulta.
+        """
+        with self.assertNumQueries(1):
+            obtener_archivos_por_categoria(self.categoria.id)
+
+    def test_consultas_constantes(self):
+        self.crear_archivos(5)
+        self.comprobar_consultas()
+
+        self.crear_archivos(TAMANO_PAGINA * 3)
+        self.comprobar_consultas()
+
+    def test_paginacion_por_cursor(self):
+        archivos = self.crear_archivos(TAMANO_PAGINA + 10)
+
+        pagina, paginacion = obtener_archivos_por_categoria(self.categoria.id)
+        self.assertEqual([archivo['id'] for archivo in pagina],
+                         [archivo.id for archivo in archivos[:TAMANO_PAGINA]])
+        self.assertIsNone(paginacion['anterior'])
+
+        pagina, paginacion = obtener_archivos_por_categoria(
+            self.categoria.id, despues=paginacion['siguiente'])
+        self.assertEqual([archivo['id'] for archivo in pagina],
+                         [archivo.id for archivo in archivos[TAMANO_PAGINA:]])
+        self.assertIsNone(paginacion['siguiente'])
+
+        pagina, paginacion = obtener_archivos_por_categoria(
+            self.categoria.id, antes=paginacion['anterior'])
+        self.assertEqual([archivo['id'] for archivo in pagina],
+                         [archivo.id for archivo in archivos[:TAMANO_PAGINA]])
+        self.assertIsNone(paginacion['anterior'])
+
+
+class ApiArchivosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        tipo = Tipo.objects.create(nombre='Monofásico')
+        analizador = Analizador.objects.create(nombre='SONEL')
+        cls.archivo = Archivo.objects.create(
+            archivo='archivos/tendencias/archivo.xlsx', categoria=categoria, tipo=tipo,
+            analizador=analizador, informacion={'flicker_fase_a': 1.5})
+
+    def test_detalle_condicional(self):
+        url = reverse('api_archivo_detalle', args=[self.archivo.id])
+
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['informacion'], {'flicker_fase_a': 1.5})
+
+        etag = respuesta.headers['ETag']
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+        # Al cambiar la información, el cliente vuelve a recibir el archivo
+        self.archivo.informacion = {'flicker_fase_a': 2.0}
+        self.archivo.save()
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_lista_condicional(self):
+        url = reverse('api_archivos')
+
+        respuesta = self.client.get(url, {'categoria': self.archivo.categoria_id})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([archivo['id'] for archivo in respuesta.json()['resultados']],
+                         [self.archivo.id])
+        self.assertEqual(respuesta.json()['resultados'][0]['estado'], Trabajo.COMPLETADO)
+
+        respuesta = self.client.get(url, {'categoria': self.archivo.categoria_id},
+                                    HTTP_IF_NONE_MATCH=respuesta.headers['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+
+        # El cambio de estado de un trabajo no modifica el archivo, pero sí la versión del listado
+        etag = respuesta.headers['ETag']
+        trabajo = trabajos.encolar_trabajo(self.archivo, None)
+        respuesta = self.client.get(url, {'categoria': self.archivo.categoria_id}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.json()['resultados'][0]['estado'], Trabajo.PENDIENTE)
+
+        etag = respuesta.headers['ETag']
+        Trabajo.objects.filter(id=trabajo.id).update(estado=Trabajo.PROCESANDO)
+        respuesta = self.client.get(url, {'categoria': self.archivo.categoria_id}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['resultados'][0]['estado'], Trabajo.PROCESANDO)
+
+        respuesta = self.client.get(url, {'tipo': 'x'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_exportar_csv(self):
+        guardar_resultados([self.archivo])
+
+        respuesta = self.client.get(reverse('api_exportar'), {'formato': 'csv'})
+        self.assertEqual(respuesta.status_code, 200)
+
+        lineas = b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lineas[0].split(',')[:3], ['archivo_id', 'archivo', 'subido_el'])
+        self.assertEqual(len(lineas), 2)
+        self.assertTrue(lineas[1].endswith(',flicker,a,,,1.5,'))
+
+
+class ResultadosMetricaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.armonico = Categoria.objects.create(nombre='Armónico')
+        cls.tendencia = Categoria.objects.create(nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+
+    def test_poblar_resultados(self):
+        Archivo.objects.create(
+            archivo='archivos/tendencias/t.xlsx', categoria=self.tendencia, tipo=self.tipo,
+            analizador=self.analizador, informacion={'flicker_fase_b': 7.5, 'desbalance': 1.0})
+        Archivo.objects.create(
+            archivo='archivos/armonicos/a.xlsx', categoria=self.armonico, tipo=self.tipo,
+            analizador=self.analizador,
+            informacion={formatos.COLUMNAS_ARMONICO: {'H5 L2': {'conteo': 12, 'porcentaje': 6.0}}})
+
+        call_command('poblar_resultados', lote=1, stdout=StringIO())
+
+        self.assertEqual(
+            set(ResultadoMetrica.objects.values_list('metrica', 'fase', 'orden', 'valor', 'conteo')),
+            {('flicker', 'b', None, 7.5, None), ('desbalance', '', None, 1.0, None),
+             ('armonico', 'b', 5, 6.0, 12)})
+
+        # Los archivos que ya tienen resultados no se vuelven a procesar
+        call_command('poblar_resultados', stdout=StringIO())
+        self.assertEqual(ResultadoMetrica.objects.count(), 3)
+
+
+class ReutilizacionResultadosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tendencia = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+        cls.limite = Limite.objects.create(
+            tipo=cls.tipo, voltaje_nominal=120, voltaje_inferior=110, voltaje_superior=130)
+
+    def crear_archivo(self, **campos):
+        campos.setdefault('categoria', self.tendencia)
+        archivo = Archivo(
+            archivo='archivos/tendencias/t.xlsx', tipo=self.tipo, analizador=self.analizador,
+            voltaje_nominal=120, hash_sha256='a' * 64, **campos)
+        archivo.firma_limites = firma_limites(obtener_limites(archivo))
+        return archivo
+
+    def test_limites_editados_no_reutilizan(self):
+        self.crear_archivo(informacion={'flicker_fase_a': 1.5},
+                           version_depuracion=VERSION_DEPURACION).save()
+        self.assertEqual(buscar_resultado(self.crear_archivo(), None), {'flicker_fase_a': 1.5})
+
+        # Con otros límites el archivo idéntico se vuelve a depurar
+        self.limite.flicker = 0.8
+        self.limite.save()
+        self.assertIsNone(buscar_resultado(self.crear_archivo(), None))
+
+    def test_perfil_armonico_editado_no_reutiliza(self):
+        armonico = Categoria.objects.create(id=1, nombre='Armónico')
+        perfil = PerfilArmonico.objects.create(nombre='Prueba')
+        limite = LimiteArmonico.objects.create(perfil=perfil, orden=3, limite=1)
+
+        def crear_armonico(**campos):
+            return self.crear_archivo(categoria=armonico, perfil_armonico=perfil, **campos)
+
+        crear_armonico(informacion={formatos.COLUMNAS_ARMONICO: {
+                           'H3 L1': {'conteo': 2, 'porcentaje': 50.0, 'limite': 1.0}}},
+                       valor_porcentaje=5, version_depuracion=VERSION_DEPURACION).save()
+        self.assertIsNotNone(buscar_resultado(crear_armonico(), 5))
+
+        # Cambiar el límite de un orden del perfil invalida los resultados anteriores
+        limite.limite = 2
+        limite.save()
+        self.assertIsNone(buscar_resultado(crear_armonico(), 5))
+
+
+class ResumenesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tendencia = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+
+    def crear_archivo(self, flicker):
+        archivo = Archivo.objects.create(
+            archivo=f'archivos/tendencias/{flicker}.xlsx', categoria=self.tendencia, tipo=self.tipo,
+            analizador=self.analizador, informacion={'flicker_fase_a': flicker, 'flicker_fase_b': 1.0})
+        guardar_resultados([archivo])
+        return archivo
+
+    def resumenes(self):
+        return set(Resumen.objects.filter(mediciones__gt=0).values_list(
+            'metrica', 'mediciones', 'cumplen', 'suma_valor'))
+
+    def test_resumen_incremental(self):
+        self.crear_archivo(2.0)
+        archivo = self.crear_archivo(8.0)
+        self.assertEqual(self.resumenes(), {('flicker', 4, 3, 12.0)})
+
+        # Volver a depurar un archivo reemplaza su aporte
+        archivo.informacion = {'flicker_fase_a': 3.0, 'flicker_fase_b': 1.0}
+        guardar_resultados([archivo])
+        self.assertEqual(self.resumenes(), {('flicker', 4, 4, 7.0)})
+
+        # Eliminar un archivo resta su aporte
+        eliminar_archivo_referencia(archivo)
+        incremental = self.resumenes()
+        self.assertEqual(incremental, {('flicker', 2, 2, 3.0)})
+
+        reconstruir_resumenes()
+        self.assertEqual(self.resumenes(), incremental)
+
+    def test_vista_resumen(self):
+        self.crear_archivo(2.0)
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(reverse('vista_resumen'))
+        self.assertContains(respuesta, 'flicker')
+
+
+class DetalleCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+        cls.archivo = Archivo.objects.create(
+            archivo='archivos/tendencias/archivo.xlsx', categoria=categoria, tipo=cls.tipo,
+            analizador=cls.analizador, informacion={'flicker_fase_a': 1.23456})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detalle_en_cache(self):
+        url = reverse('tendencia_detalle', args=[self.archivo.id])
+        self.assertContains(self.client.get(url), '1.2346 %')
+
+        # La segunda visita solamente consulta la versión del resultado
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(url), '1.2346 %')
+
+        # Al guardar la información nueva se invalida el detalle
+        self.archivo.informacion = {'flicker_fase_a': 2.5}
+        self.archivo.save()
+        guardar_resultados([self.archivo])
+        self.assertContains(self.client.get(url), '2.5 %')
+
+        # Al eliminar el archivo la página ya no existe
+        eliminar_archivo_referencia(self.archivo)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CargaPorPartesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(
+            MEDIA_ROOT=carpeta.name, CARGAS_ROOT=os.path.join(carpeta.name, 'cargas'),
+            TOKENS_CARGAS=['token-de-prueba'])
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        # Los clientes de las cargas son scripts sin sesión ni cookie de CSRF
+        self.client = Client(enforce_csrf_checks=True, HTTP_AUTHORIZATION='Bearer token-de-prueba')
+
+    def enviar_parte(self, carga_id, desplazamiento, contenido):
+        return self.client.put(
+            reverse('api_carga', args=[carga_id]) + f'?desplazamiento={desplazamiento}',
+            contenido, content_type='application/octet-stream')
+
+    def test_carga_requiere_token(self):
+        datos = {'nombre': 'medicion.xlsx', 'tamano': 10, 'categoria': self.categoria.id,
+                 'tipo': self.tipo.id, 'analizador': self.analizador.id}
+
+        for autorizacion in ({}, {'HTTP_AUTHORIZATION': 'Bearer otro-token'}):
+            cliente = Client(enforce_csrf_checks=True, **autorizacion)
+            self.assertEqual(cliente.post(reverse('api_cargas'), datos).status_code, 401)
+        self.assertFalse(Carga.objects.exists())
+
+        self.assertEqual(self.client.post(reverse('api_cargas'), datos).status_code, 201)
+
+    def test_carga_retomada(self):
+        contenido = os.urandom(3000)
+
+        respuesta = self.client.post(reverse('api_cargas'), {
+            'nombre': 'medicion.xlsx', 'tamano': len(contenido), 'categoria': self.categoria.id,
+            'tipo': self.tipo.id, 'analizador': self.analizador.id})
+        self.assertEqual(respuesta.status_code, 201)
+        carga_id = respuesta.json()['id']
+
+        self.assertEqual(self.enviar_parte(carga_id, 0, contenido[:1000]).json()['recibido'], 1000)
+
+        # Una parte que deja un hueco se rechaza con los bytes recibidos
+        respuesta = self.enviar_parte(carga_id, 2000, contenido[2000:])
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['recibido'], 1000)
+
+        # Volver a enviar una parte reemplaza el contenido desde su desplazamiento
+        self.enviar_parte(carga_id, 500, contenido[500:1500])
+        respuesta = self.client.get(reverse('api_carga', args=[carga_id]))
+        self.assertEqual(respuesta.json()['recibido'], 1500)
+        self.enviar_parte(carga_id, 1500, contenido[1500:])
+
+        url = reverse('api_finalizar_carga', args=[carga_id])
+        self.assertEqual(self.client.post(url, {'sha256': '0' * 64}).status_code, 400)
+
+        hash_sha256 = hashlib.sha256(contenido).hexdigest()
+        respuesta = self.client.post(url, {'sha256': hash_sha256})
+        self.assertEqual(respuesta.status_code, 201)
+
+        archivo = Archivo.objects.get(id=respuesta.json()['archivo'])
+        self.assertEqual(archivo.hash_sha256, hash_sha256)
+        with archivo.archivo.open('rb') as guardado:
+            self.assertEqual(guardado.read(), contenido)
+        self.assertTrue(Trabajo.objects.filter(
+            archivo=archivo, estado=Trabajo.PENDIENTE).exists())
+        self.assertFalse(Carga.objects.exists())
+
+    @override_settings(DEDUPLICAR_ARCHIVOS=True)
+    def test_finalizar_duplicado(self):
+        contenido = os.urandom(2000)
+        hash_sha256 = hashlib.sha256(contenido).hexdigest()
+        existente = Archivo.objects.create(
+            archivo=SimpleUploadedFile('existente.xlsx', contenido), categoria=self.categoria,
+            tipo=self.tipo, analizador=self.analizador, hash_sha256=hash_sha256)
+
+        carga = cargas.iniciar_carga('medicion.xlsx', len(contenido), self.categoria, self.tipo,
+                                     str(self.analizador.id))
+        cargas.escribir_parte(carga.id, 0, BytesIO(contenido), len(contenido))
+
+        # Si el trabajo no se puede encolar, el archivo vuelve a la carpeta temporal
+        with mock.patch.object(cargas, 'encolar_trabajo', side_effect=DatabaseError('sin conexión')):
+            with self.assertRaises(DatabaseError):
+                cargas.finalizar_carga(carga, self.analizador, hash_sha256)
+        self.assertTrue(Carga.objects.filter(id=carga.id).exists())
+        with open(cargas.ruta_carga(carga), 'rb') as temporal:
+            self.assertEqual(temporal.read(), contenido)
+
+        # Al finalizar se reutiliza el archivo existente y el movido se elimina después de confirmar
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo_archivo, _ = cargas.finalizar_carga(carga, self.analizador, hash_sha256)
+        self.assertEqual(nuevo_archivo.archivo.name, existente.archivo.name)
+        self.assertEqual(os.listdir(os.path.dirname(existente.archivo.path)), [os.path.basename(existente.archivo.name)])
+
+    def test_parte_cortada_conserva_bytes(self):
+        carga = cargas.iniciar_carga('medicion.xlsx', 3000, self.categoria, self.tipo, str(self.analizador.id))
+
+        class ConexionCortada:
+            """
+            Devuelve el primer bloque y luego falla como una conexión cortada.
+            """
+            def __init__(self):
+                self.leido = False
+                self.transacciones = []
+
+            def read(self, tamano):
+                self.transacciones.append(len(connection.atomic_blocks))
+                if self.leido:
+                    raise UnreadablePostError('conexión cortada')
+                self.leido = True
+                return b'x' * 1000
+
+        conexion = ConexionCortada()
+        with self.assertRaises(UnreadablePostError):
+            cargas.escribir_parte(carga.id, 0, conexion, 2000)
+
+        # La parte se lee sin abrir una transacción ni bloquear la carga
+        self.assertEqual(set(conexion.transacciones), {len(connection.atomic_blocks)})
+        self.assertEqual(os.listdir(cargas.carpeta_cargas()), [os.path.basename(cargas.ruta_carga(carga))])
+
+        # Los bytes escritos antes del corte quedan registrados y la carga se retoma desde ellos
+        carga.refresh_from_db()
+        self.assertEqual(carga.recibido, 1000)
+        self.assertEqual(os.path.getsize(cargas.ruta_carga(carga)), 1000)
+
+
+class LoteZipTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        cls.analizador = Analizador.objects.create(nombre='SONEL')
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=carpeta.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+    def test_lote_zip(self):
+        comprimido = tempfile.SpooledTemporaryFile()
+        with zipfile.ZipFile(comprimido, 'w') as contenedor:
+            contenedor.writestr('campana/punto_1.xlsx', b'libro 1')
+            contenedor.writestr('campana/punto_2.xls', b'libro 2')
+            contenedor.writestr('campana/notas.txt', b'notas')
+            contenedor.writestr('__MACOSX/campana/._punto_1.xlsx', b'')
+        comprimido.seek(0)
+
+        respuesta = self.client.post(reverse('crear_tendencia_lote'), {
+            'tipo': self.tipo.id, 'analizador': self.analizador.id,
+            'archivos_lote': SimpleUploadedFile('campana.zip', comprimido.read())})
+        self.assertEqual(respuesta.status_code, 302)
+
+        archivos = list(Archivo.objects.order_by('id'))
+        self.assertEqual([archivo.archivo.name.split('/')[-1] for archivo in archivos],
+                         ['punto_1.xlsx', 'punto_2.xls'])
+        self.assertEqual(Trabajo.objects.filter(estado=Trabajo.PENDIENTE).count(), 2)
+
+        with archivos[0].archivo.open('rb') as guardado:
+            self.assertEqual(guardado.read(), b'libro 1')
+
+        mensajes = [str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)]
+        self.assertIn('campana.zip: 2 encolados, 0 con error, 2 omitidos.', mensajes)
+
+    def enviar_zip(self, miembros):
+        comprimido = BytesIO()
+        with zipfile.ZipFile(comprimido, 'w', zipfile.ZIP_DEFLATED) as contenedor:
+            for nombre, contenido in miembros.items():
+                contenedor.writestr(nombre, contenido)
+
+        respuesta = self.client.post(reverse('crear_tendencia_lote'), {
+            'tipo': self.tipo.id, 'analizador': self.analizador.id,
+            'archivos_lote': SimpleUploadedFile('campana.zip', comprimido.getvalue())})
+        return [str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)]
+
+    @override_settings(ZIP_MAX_MIEMBROS=2, ZIP_MAX_BYTES_MIEMBRO=1000)
+    def test_limites_zip(self):
+        # Un zip con demasiados miembros se rechaza sin descomprimir ninguno
+        mensajes = self.enviar_zip({f'punto_{indice}.xlsx': b'libro' for indice in range(3)})
+        self.assertIn('El archivo campana.zip no se puede procesar: El zip tiene 3 miembros, el máximo es 2.',
+                      mensajes)
+        self.assertFalse(Archivo.objects.exists())
+
+        # Un libro que descomprimido supera el límite se reporta con error
+        mensajes = self.enviar_zip({'grande.xlsx': b'0' * 5000, 'punto.xlsx': b'libro'})
+        self.assertIn('campana.zip: 1 encolados, 1 con error, 0 omitidos.', mensajes)
+        self.assertEqual(Archivo.objects.count(), 1)
+
+    def test_copiar_miembro_con_tamano_falso(self):
+        # El tamaño declarado puede ser falso, la copia se detiene al superar el límite
+        destino = BytesIO()
+        self.assertFalse(comprimidos.copiar_miembro(BytesIO(b'0' * 5000), destino, 1000))
+        self.assertLessEqual(len(destino.getvalue()), 1000)
+
+        destino = BytesIO()
+        self.assertTrue(comprimidos.copiar_miembro(BytesIO(b'0' * 1000), destino, 1000))
+        self.assertEqual(len(destino.getvalue()), 1000)
+
+
+class IngerirDirectorioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Categoria.objects.create(id=1, nombre='Armónico')
+        Categoria.objects.create(id=2, nombre='Tendencia')
+        cls.tipo = Tipo.objects.create(nombre='Monofásico')
+        Analizador.objects.create(
+            nombre='SONEL', voltaje_a='U L1 avg', voltaje_b='U L2 avg', flicker_a='Pst L1',
+            flicker_b='Pst L2', vthd_a='THD U L1', vthd_b='THD U L2')
+
+    def setUp(self):
+        perfiles.invalidar_perfiles()
+        self.addCleanup(perfiles.invalidar_perfiles)
+
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=os.path.join(carpeta.name, 'media'))
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        self.origen = os.path.join(carpeta.name, 'origen')
+        self.control = os.path.join(carpeta.name, 'control.json')
+
+    def crear_libro(self, ruta_relativa, filas):
+        ruta = os.path.join(self.origen, ruta_relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['Fecha', 'Hora', 'U L1 avg [V]', 'U L2 avg [V]', 'Pst L1', 'Pst L2',
+                     'THD U L1 [%]', 'THD U L2 [%]'])
+        for fila in range(filas):
+            hoja.append(['2024-01-01', '10:00', 120 + fila % 10, 119, 0.5, 0.6, 2, 3])
+        libro.save(ruta)
+
+    def ingerir(self, lote=1):
+        salida = StringIO()
+        call_command('ingerir_directorio', self.origen, '--procesos', '0', '--lote', str(lote),
+                     '--punto-control', self.control, stdout=salida, stderr=StringIO())
+        return salida.getvalue()
+
+    def archivos_guardados(self):
+        carpeta = os.path.join(settings.MEDIA_ROOT, 'archivos')
+        return sorted(nombre for _, _, nombres in os.walk(carpeta) for nombre in nombres)
+
+    def test_ingesta_y_reanudacion(self):
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_1.xlsx', 20)
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_2.xlsx', 30)
+
+        salida = self.ingerir()
+        self.assertIn('filas/s', salida)
+        self.assertIn('Ingesta completa: 2 archivos, 50 filas', salida)
+
+        archivos = Archivo.objects.order_by('archivo')
+        self.assertEqual([(archivo.categoria_id, archivo.tipo_id, archivo.analizador.nombre)
+                          for archivo in archivos], [(2, self.tipo.id, 'SONEL')] * 2)
+        self.assertTrue(all(archivo.informacion for archivo in archivos))
+        self.assertTrue(ResultadoMetrica.objects.filter(archivo__in=archivos).exists())
+
+        # Una nueva ejecución continúa después del último archivo guardado
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_3.xlsx', 10)
+        salida = self.ingerir()
+        self.assertIn('Archivos por ingerir: 1', salida)
+        self.assertEqual(Archivo.objects.count(), 3)
+
+    def test_inferir_desde_ruta(self):
+        tipos = {'monofasico': 1, 'trifasico': 2}
+        analizadores = {'sonel': 'SONEL', 'metrel': 'METREL'}
+
+        self.assertEqual(ingesta.inferir_desde_ruta('Tendencias/Monofásico/SONEL/punto_1.xlsx', tipos, analizadores),
+                         (formatos.TENDENCIA, 1, 'SONEL'))
+        self.assertEqual(ingesta.inferir_desde_ruta('campaña armónicos/trifasico-metrel_1.xls', tipos, analizadores),
+                         (formatos.ARMONICO, 2, 'METREL'))
+
+        # Los nombres dentro de otras palabras no cuentan y una ruta ambigua se deja sin inferir
+        self.assertEqual(ingesta.inferir_desde_ruta('contendencias/SONELX/punto.xlsx', tipos, analizadores),
+                         (None, None, None))
+        self.assertEqual(ingesta.inferir_desde_ruta('Tendencias/SONEL/METREL.xlsx', tipos, analizadores),
+                         (formatos.TENDENCIA, None, None))
+
+    def test_archivos_identicos_en_el_mismo_bloque(self):
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_1.xlsx', 20)
+        shutil.copy(os.path.join(self.origen, 'Tendencias/Monofásico/SONEL/punto_1.xlsx'),
+                    os.path.join(self.origen, 'Tendencias/Monofásico/SONEL/punto_2.xlsx'))
+
+        salida = self.ingerir(lote=10)
+        self.assertIn('Ingesta completa: 1 archivos, 20 filas, 1 omitidos', salida)
+        self.assertEqual(Archivo.objects.count(), 1)
+        # La copia omitida no llega a la carpeta de archivos
+        self.assertEqual(len([nombre for nombre in self.archivos_guardados() if nombre.endswith('.xlsx')]), 1)
+
+    def test_reintentar_fallidos(self):
+        danado = os.path.join(self.origen, 'Tendencias/Monofásico/SONEL/punto_1.xlsx')
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_2.xlsx', 30)
+        with open(danado, 'wb') as archivo:
+            archivo.write(b'no es un libro')
+
+        salida = self.ingerir()
+        self.assertIn('Ingesta completa: 1 archivos, 30 filas, 0 omitidos, 1 con error', salida)
+
+        # El archivo fallido se reintenta aunque esté antes del último guardado, y los totales continúan
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_1.xlsx', 20)
+        salida = self.ingerir()
+        self.assertIn('reintentando 1 con error', salida)
+        self.assertIn('Archivos por ingerir: 1', salida)
+        self.assertIn('Ingesta completa: 2 archivos, 50 filas, 0 omitidos, 0 con error', salida)
+        self.assertEqual(Archivo.objects.count(), 2)
+
+        # Sin archivos fallidos ni nuevos, la siguiente ejecución no ingiere nada
+        salida = self.ingerir()
+        self.assertIn('Archivos por ingerir: 0', salida)
+        self.assertIn('Ingesta completa: 2 archivos, 50 filas, 0 omitidos, 0 con error', salida)
+
+    def test_transaccion_fallida_no_deja_copias(self):
+        self.crear_libro('Tendencias/Monofásico/SONEL/punto_1.xlsx', 20)
+
+        with mock.patch.object(ingesta, 'guardar_resultados', side_effect=DatabaseError('sin conexión')):
+            with self.assertRaises(DatabaseError):
+                self.ingerir()
+
+        self.assertFalse(Archivo.objects.exists())
+        self.assertEqual(self.archivos_guardados(), [])
+
+
+class LibrosSinteticosTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.carpeta = carpeta.name
+
+    def test_libros_de_cada_formato(self):
+        for formato in formatos.FORMATOS:
+            with self.subTest(formato=formato.clave):
+                ruta = sinteticos.generar_libro(
+                    os.path.join(self.carpeta, f'{formato.clave}.xlsx'), formato.analizador,
+                    formato.categoria, filas=200, fases=3, ordenes=7)
+
+                with redirect_stdout(StringIO()):
+                    if formato.categoria == formatos.TENDENCIA:
+                        informacion = depuracion_tendencia.procesar(
+                            ruta, formato, sinteticos.COLUMNAS_TENDENCIA[formato.analizador])
+                    else:
+                        informacion = depuracion_armonico.procesar(ruta, formato, 5)
+
+                self.assertTrue(informacion)
+                self.assertEqual(ventanas.CLAVE in informacion, bool(formato.fechas))
+                if formato.categoria == formatos.ARMONICO:
+                    # Los encabezados normalizados conservan el orden y la fase de cada armónico
+                    columnas = set(informacion[formatos.COLUMNAS_ARMONICO])
+                    self.assertTrue(all(orden_columna(columna) and fase_columna(columna)
+                                        for columna in columnas))
+                    self.assertTrue(columnas <= set(informacion[estadisticas.CLAVE]))
+
+    def test_estadisticas_armonicos(self):
+        generador = np.random.default_rng(7)
+        df = pd.DataFrame(generador.gamma(2, 1.5, size=(1001, 4)),
+                          columns=['H3 L1', 'H3 L2', 'H5 L1', 'THD U L1'])
+
+        informacion = depuracion_armonico.obtener_informacion(df, 5)
+        por_columna = informacion[estadisticas.CLAVE]
+
+        # Las columnas sin orden de armónico no tienen estadísticas
+        self.assertEqual(list(por_columna), ['H3 L1', 'H3 L2', 'H5 L1'])
+        self.assertEqual((por_columna['H3 L2']['orden'], por_columna['H3 L2']['fase']), (3, 'b'))
+        for columna, datos in por_columna.items():
+            valores = df[columna].to_numpy()
+            self.assertAlmostEqual(datos['p95'], np.percentile(valores, 95), places=4)
+            self.assertAlmostEqual(datos['maximo'], valores.max(), places=4)
+            self.assertAlmostEqual(datos['promedio'], valores.mean(), places=4)
+
+        # Las estadísticas no se guardan como resultados de excedencia
+        archivo = Archivo(id=1, categoria_id=formatos.ARMONICO, subido_el=timezone.now(),
+                          informacion=informacion)
+        self.assertEqual([resultado.columna for resultado in resultados_armonico(archivo)],
+                         list(informacion[formatos.COLUMNAS_ARMONICO]))
+
+    def test_columnas_con_nombres_de_claves(self):
+        fechas = pd.date_range('2024-01-01', periods=10, freq='10min')
+        df = pd.DataFrame({'H3 L1': np.full(10, 9.0), estadisticas.CLAVE: np.full(10, 9.0),
+                           ventanas.CLAVE: np.full(10, 9.0)}, index=fechas)
+
+        informacion = depuracion_armonico.obtener_informacion(df, 5)
+
+        # Las columnas no se mezclan con las estadísticas ni con las ventanas
+        self.assertEqual(list(informacion[formatos.COLUMNAS_ARMONICO]),
+                         ['H3 L1', estadisticas.CLAVE, ventanas.CLAVE])
+        self.assertEqual(list(informacion[estadisticas.CLAVE]), ['H3 L1'])
+        self.assertEqual(informacion[ventanas.CLAVE]['columnas'], ['H3 L1'])
+
+    def test_estadisticas_sin_celdas_vacias(self):
+        generador = np.random.default_rng(11)
+        df = pd.DataFrame(generador.gamma(2, 1.5, size=(500, 3)), columns=['H3 L1', 'H5 L1', 'H7 L1'])
+        # Huecos distintos en cada columna y una columna sin mediciones
+        df.iloc[::3, 0] = np.nan
+        df.iloc[:400, 1] = np.nan
+        df['H9 L1'] = np.nan
+
+        informacion = depuracion_armonico.obtener_informacion(df, 5)
+        por_columna = informacion[estadisticas.CLAVE]
+
+        self.assertEqual(list(por_columna), ['H3 L1', 'H5 L1', 'H7 L1'])
+        for columna, datos in por_columna.items():
+            valores = df[columna].dropna().to_numpy()
+            self.assertAlmostEqual(datos['p95'], np.percentile(valores, 95), places=4)
+            self.assertAlmostEqual(datos['maximo'], valores.max(), places=4)
+            self.assertAlmostEqual(datos['promedio'], valores.mean(), places=4)
+
+        # Una matriz sin huecos da el mismo resultado que el cálculo con partición
+        matriz = df[['H7 L1']].to_numpy()
+        sin_huecos = estadisticas.calcular_estadisticas(matriz)
+        con_huecos = estadisticas.percentil_columnas_vacios(matriz, np.array([len(matriz)]))
+        self.assertAlmostEqual(sin_huecos[0][0], con_huecos[0])
+
+    def test_fechas_de_las_filas(self):
+        esperado = (datetime(2024, 2, 1, 13, 30) - lectura.EPOCA).total_seconds()
+        for fecha, hora in [('01/02/2024', '13:30:00'), ('2024-02-01', '13:30'),
+                            (datetime(2024, 2, 1), time(13, 30)), (45323.0, 0.5625)]:
+            self.assertEqual(lectura.marca_tiempo((fecha, hora), (0, 1), {}), esperado)
+        self.assertEqual(lectura.marca_tiempo(('01/02/2024 13:30:00',), (0,), {}), esperado)
+        self.assertTrue(np.isnan(lectura.marca_tiempo(('Total', None), (0, 1), {})))
+
+    def test_ventanas_de_tiempo(self):
+        generador = np.random.default_rng(3)
+        fechas = pd.date_range('2024-01-01 00:10', periods=10 * 144, freq='10min')
+        valores = pd.DataFrame(generador.random((len(fechas), 2)) > 0.8, index=fechas, columns=['a', 'b'])
+        # Un día sin mediciones y una fila sin fecha
+        valores = valores[valores.index.day != 4]
+        fechas = valores.index.insert(5, pd.NaT)
+        excedidos = np.insert(valores.to_numpy(), 5, True, axis=0)
+
+        resultado = ventanas.calcular_ventanas(fechas, excedidos, ['a', 'b'])
+        diaria = resultado['periodos']['diaria']
+        esperado = valores.resample('1D').agg(['sum', 'count'])
+
+        self.assertEqual(diaria['inicio'][3], '2024-01-04T00:00')
+        self.assertEqual(diaria['muestras'], esperado[('a', 'count')].tolist())
+        self.assertIsNone(diaria['porcentajes'][3][0])
+        for columna, nombre in enumerate(['a', 'b']):
+            porcentajes = (esperado[(nombre, 'sum')] / esperado[(nombre, 'count')] * 100).round(3)
+            self.assertEqual([fila[columna] for fila in diaria['porcentajes'] if fila[columna] is not None],
+                             porcentajes.dropna().tolist())
+
+        # Las ventanas móviles completas de 7 días avanzan de un día en un día
+        movil = resultado['periodos']['movil']
+        self.assertEqual(len(movil['inicio']), len(diaria['inicio']) - 6)
+        self.assertEqual(movil['muestras'][1], sum(diaria['muestras'][1:8]))
+        self.assertEqual(resultado['periodos']['semanal']['muestras'],
+                         [sum(diaria['muestras'][:7]), sum(diaria['muestras'][7:])])
+
+    def test_perfil_armonico_limites_por_orden(self):
+        df = pd.DataFrame({
+            'H3 L1': [0.5, 2.0, 3.0, 0.1],
+            'H5 L1': [0.5, 2.0, 3.0, 0.1],
+            'THD U L1': [4.0, 6.0, 7.0, 8.0],
+        })
+        perfil = PerfilArmonico.objects.create(nombre='Prueba', limite_general=7.5)
+        LimiteArmonico.objects.create(perfil=perfil, orden=3, limite=1)
+        LimiteArmonico.objects.create(perfil=perfil, orden=5, limite=2.5)
+
+        # Sin perfil todas las columnas se comparan con el valor del porcentaje
+        sin_perfil = depuracion_armonico.obtener_informacion(df, 5)[formatos.COLUMNAS_ARMONICO]
+        self.assertEqual(list(sin_perfil), ['THD U L1'])
+        self.assertNotIn('limite', sin_perfil['THD U L1'])
+
+        # Con perfil cada orden tiene su límite y el resto utiliza el límite general
+        limites = depuracion_armonico.obtener_limites(perfil.id)
+        con_perfil = depuracion_armonico.obtener_informacion(df, 5, limites)[formatos.COLUMNAS_ARMONICO]
+        self.assertEqual(con_perfil['H3 L1'], {'conteo': 2, 'porcentaje': 50.0, 'limite': 1.0})
+        self.assertEqual(con_perfil['H5 L1'], {'conteo': 1, 'porcentaje': 25.0, 'limite': 2.5})
+        self.assertEqual(con_perfil['THD U L1'], {'conteo': 1, 'porcentaje': 25.0, 'limite': 7.5})
+
+    def test_benchmark_linea_base(self):
+        base = os.path.join(self.carpeta, 'base.json')
+        opciones = ['--filas', '50', '--repeticiones', '1', '--analizadores', 'SONEL',
+                    '--categorias', 'tendencia']
+
+        call_command('benchmark_depuracion', *opciones, '--guardar', base, stdout=StringIO())
+        salida = StringIO()
+        call_command('benchmark_depuracion', *opciones, '--comparar', base,
+                     '--tolerancia', '1000', stdout=salida)
+        self.assertIn('conversion', salida.getvalue())
+        self.assertIn('Sin regresiones', salida.getvalue())
+
+
+class TiemposDepuracionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(id=1, nombre='Armónico')
+        cls.tipo = Tipo.objects.create(nombre='Trifásico')
+        cls.analizador = Analizador.objects.create(
+            nombre='SONEL', voltaje_a='U L1 avg', voltaje_b='U L2 avg', flicker_a='Pst L1',
+            flicker_b='Pst L2', vthd_a='THD U L1', vthd_b='THD U L2')
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        configuracion = override_settings(MEDIA_ROOT=carpeta.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        ruta = sinteticos.generar_libro(
+            os.path.join(carpeta.name, 'libro.xlsx'), 'SONEL', formatos.ARMONICO, filas=100, fases=3, ordenes=5)
+        with open(ruta, 'rb') as libro:
+            self.archivo = Archivo.objects.create(
+                archivo=SimpleUploadedFile('libro.xlsx', libro.read()), categoria=self.categoria,
+                tipo=self.tipo, analizador=self.analizador)
+
+    def test_tiempos_por_archivo_y_metricas(self):
+        depuracion_armonico_archivo(self.archivo, self.analizador, 5)
+
+        tiempos_archivo = Archivo.objects.get(id=self.archivo.id).tiempos
+        self.assertEqual(tiempos_archivo['formato'], 'SONEL-armonico')
+        for etapa in tiempos.ETAPAS:
+            self.assertGreaterEqual(tiempos_archivo[etapa], 0)
+
+        respuesta = self.client.get(reverse('metricas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = respuesta.content.decode()
+        self.assertIn('# TYPE lexel_depuracion_etapa_segundos histogram', texto)
+        self.assertIn('lexel_depuracion_etapa_segundos_count{formato="SONEL-armonico",etapa="calculo"} 1', texto)
+        self.assertIn('lexel_depuracion_etapa_segundos_bucket{formato="SONEL-armonico",etapa="guardado",le="+Inf"} 1',
+                      texto)
+
+    def test_perfilado_sin_guardar(self):
+        depuracion_armonico_archivo(self.archivo, self.analizador, 5)
+        self.archivo.refresh_from_db()
+        informacion, tiempos_archivo = self.archivo.informacion, self.archivo.tiempos
+        histogramas = list(TiempoEtapa.objects.order_by('id').values_list('conteo', 'suma'))
+
+        url = reverse('api_perfilar_archivo', args=[self.archivo.id])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        personal = User.objects.create_user('personal', password='clave', is_staff=True)
+        self.client.force_login(personal)
+        respuesta = self.client.get(url, {'orden': 'acumulado', 'lineas': 5})
+        self.assertEqual(respuesta.status_code, 200)
+
+        reporte = respuesta.json()
+        self.assertEqual(reporte['formato'], 'SONEL-armonico')
+        self.assertEqual(len(reporte['funciones']), 5)
+        self.assertGreater(reporte['memoria']['pico'], 0)
+        self.assertTrue(reporte['memoria']['sitios'])
+
+        # La depuración no modifica el archivo ni los histogramas
+        self.archivo.refresh_from_db()
+        self.assertEqual(self.archivo.informacion, informacion)
+        self.assertEqual(self.archivo.tiempos, tiempos_archivo)
+        self.assertEqual(list(TiempoEtapa.objects.order_by('id').values_list('conteo', 'suma')), histogramas)
+
+        salida = StringIO()
+        call_command('perfilar_archivo', str(self.archivo.id), '--lineas', '3', stdout=salida)
+        self.assertIn('Funciones más costosas', salida.getvalue())
+
+    def test_series_reducidas(self):
+        depuracion_armonico_archivo(self.archivo, self.analizador, 5)
+        url = reverse('api_series_archivo', args=[self.archivo.id])
+
+        respuesta = self.client.get(url, {'ancho': 20})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['total'], 100)
+        self.assertEqual(sorted(datos['series']), ['vthd_a', 'vthd_b', 'vthd_c'])
+        serie = datos['series']['vthd_a']
+        self.assertEqual(len(serie['fechas']), 20)
+        self.assertEqual(serie['fechas'][0], series.milisegundos(datetime(2024, 1, 1)))
+
+        # El rango se filtra antes de reducir, con mínimo y máximo hasta dos puntos por píxel
+        datos = self.client.get(url, {'ancho': 10, 'metodo': 'minmax', 'series': 'vthd_b',
+                                      'desde': '2024-01-01T04:00', 'hasta': '2024-01-01T12:00'}).json()
+        self.assertEqual(datos['total'], 49)
+        self.assertLessEqual(len(datos['series']['vthd_b']['valores']), 20)
+
+        # Sin el archivo de series se vuelven a generar desde la matriz guardada
+        os.remove(series.ruta_series(self.archivo.archivo.path))
+        self.assertEqual(self.client.get(url, {'ancho': 20}).json()['total'], 100)
+        self.assertEqual(self.client.get(url, {'metodo': 'otro'}).status_code, 400)
+        # LTTB necesita el primer punto, el último y al menos uno intermedio
+        self.assertEqual(self.client.get(url, {'ancho': 2}).status_code, 400)
+
+        # Con la versión actual se responde 304 sin leer ni reducir las series
+        respuesta = self.client.get(url, {'ancho': 20})
+        with mock.patch.object(series, 'obtener_vista') as obtener_vista:
+            condicional = self.client.get(url, {'ancho': 20}, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(condicional.status_code, 304)
+        obtener_vista.assert_not_called()
+        self.assertEqual(self.client.get(url, {'series': 'otra'}, HTTP_IF_NONE_MATCH='"otra"').status_code, 400)
+
+    def test_reduccion_de_series(self):
+        generador = np.random.default_rng(5)
+        x = np.arange(10000, dtype=np.float64)
+        y = np.sin(x / 300) + generador.normal(0, 0.2, len(x))
+
+        posiciones = series.reducir_lttb(x, y, 500)
+        self.assertEqual(len(posiciones), 500)
+        self.assertEqual((posiciones[0], posiciones[-1]), (0, len(x) - 1))
+        self.assertTrue(np.all(np.diff(posiciones) > 0))
+        self.assertEqual(len(series.reducir_lttb(x, y, 1)), series.ANCHO_MINIMO)
+
+        # Los extremos de la serie se conservan al reducir con mínimo y máximo
+        posiciones = series.reducir_minimo_maximo(x, y, 100)
+        self.assertLessEqual(len(posiciones), 200)
+        self.assertIn(y.argmin(), posiciones)
+        self.assertIn(y.argmax(), posiciones)
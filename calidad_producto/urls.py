@@ -1,11 +1,15 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Vista principal
     path('',
          views.index, name='calidad_producto_index'),
 
+    # Resumen de cumplimiento mensual
+    path('resumen',
+         views.vista_resumen, name='vista_resumen'),
+
     # --- ARMONICOS ---
 
     # Vista de Armónicos
@@ -57,4 +61,38 @@ urlpatterns = [
      # Eliminar un archivo de tendencias
      path('tendencias/eliminar/<int:archivo_id>',
            views.eliminar_tendencia, name='eliminar_tendencia'),
+
+     # --- API ---
+
+     # Listado de archivos en formato JSON
+     path('api/archivos',
+           api.lista_archivos, name='api_archivos'),
+
+     # Detalle de un archivo y su información en formato JSON
+     path('api/archivos/<int:archivo_id>',
+           api.detalle_archivo, name='api_archivo_detalle'),
+
+     # Series de un archivo reducidas para los gráficos del detalle
+     path('api/archivos/<int:archivo_id>/series',
+           api.series_archivo, name='api_series_archivo'),
+
+     # Volver a depurar un archivo con cProfile y tracemalloc, solamente para el personal
+     path('api/archivos/<int:archivo_id>/perfilado',
+           api.perfilar_archivo, name='api_perfilar_archivo'),
+
+     # Exportar los resultados de los archivos en CSV o XLSX
+     path('api/exportar',
+           api.exportar_resultados, name='api_exportar'),
+
+     # Iniciar una carga por partes de un archivo grande
+     path('api/cargas',
+           api.iniciar_carga, name='api_cargas'),
+
+     # Consultar, enviar una parte o cancelar una carga
+     path('api/cargas/<uuid:carga_id>',
+           api.parte_carga, name='api_carga'),
+
+     # Verificar la carga completa y encolar la depuración del archivo
+     path('api/cargas/<uuid:carga_id>/finalizar',
+           api.finalizar_carga, name='api_finalizar_carga'),
 ]
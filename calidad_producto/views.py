@@ -1,14 +1,20 @@
-import os
-import pandas as pd
+import zipfile
 from django.contrib import messages
-from .models import Archivo, Categoria, Tipo, Analizador
-from django.utils.timezone import localtime
-from babel.dates import format_datetime
+from .models import Archivo, Categoria, Tipo, Analizador, PerfilArmonico, Trabajo
 from django.shortcuts import render, redirect, get_object_or_404
-from .resources import depuracion_armonico as arm
-from .resources import depuracion_tendencia as ten
-
-from django.db import DatabaseError
+from .resources.procesamiento import depuracion_armonico, depuracion_tendencia, eliminar_archivo_referencia, preparar_archivo
+from .resources.trabajos import encolar_trabajo
+from .resources.perfiles import listar_perfiles, obtener_perfil
+from .resources.formatos import ARMONICO, TENDENCIA, detectar_formato
+from .resources.fragmentos import obtener_detalle
+from .resources.comprimidos import es_zip, iterar_miembros
+from .resources.paginacion import formatear_fecha, paginar
+from .resources.resumenes import UMBRAL_CUMPLIMIENTO, obtener_resumenes
+from .resources.series import GRAFICOS
+
+from django.db import DatabaseError, transaction
+from django.http import Http404
+from django.db.models import OuterRef, Subquery
 from pandas.errors import EmptyDataError
 
 
@@ -18,6 +24,15 @@ def index(request):
     """
     return render(request, 'calidad_producto/index.html')
 
+def vista_resumen(request):
+    """
+    Visita la página de resumen de cumplimiento mensual, solamente lee los resúmenes
+    y mostramos en la vista "resumen.html"
+    """
+    resumenes = obtener_resumenes()
+    return render(request, 'calidad_producto/resumen.html', {'resumenes': resumenes, 'umbral': UMBRAL_CUMPLIMIENTO})
+
+
 # ---------- ARMÓNICOS ----------
 
 
@@ -25,34 +40,32 @@ def vista_armonicos(request):
     """
     Visita la página de armonicos, la catego´ria es 1 y mostramos en la vista "armonicos.html"
     """
-    archivos_formateados = obtener_archivos_por_categoria(1)
-    return render(request, 'armonicos/armonicos.html', {'archivos': archivos_formateados})
+    archivos_formateados, paginacion = obtener_archivos_por_categoria(
+        1, request.GET.get('despues'), request.GET.get('antes'))
+    trabajos_error = obtener_trabajos_error(1)
+    return render(request, 'armonicos/armonicos.html', {'archivos': archivos_formateados, 'paginacion': paginacion, 'trabajos_error': trabajos_error})
 
 
 def vista_armonico_detalle(request, archivo_id):
     """
-    Visita la página de detalle de armonicos, obtenemos el archivo seleccionado y mostramos en la vista "armonico_detalle.html"
+    Visita la página de detalle de armonicos, obtenemos el detalle del archivo seleccionado desde la caché y mostramos en la vista "armonico_detalle.html"
     """
 
-    # Obtener el archivo evitando que el servidor colapse
-    archivo = get_object_or_404(Archivo, id=archivo_id)
-
-    # Mostrar solamente el nombre del archivo, sin el "archivo/" al inicio
-    nombre_archivo = archivo.archivo.url.split('/')[-1]
-
-    # Obtener la informacion de archivo
-    archivo_info = archivo.informacion
+    # Obtener el detalle renderizado, solamente se vuelve a generar si cambió la información
+    detalle = obtener_detalle(archivo_id, ARMONICO)
+    if detalle is None:
+        raise Http404('El archivo no existe.')
 
-    # print("\nInformación del archivo seleccionado:\n", archivo_info)
-
-    return render(request, 'armonicos/armonico_detalle.html', {'nombre_archivo': nombre_archivo, 'archivo_info': archivo_info})
+    return render(request, 'armonicos/armonico_detalle.html', {
+        'detalle': detalle, 'archivo_id': archivo_id, 'graficos': GRAFICOS[ARMONICO]})
 
 
 def vista_crear_armonico(request):
     """
-    Visita la página de crear armonico, mostramos la vista "crear_armonico.html"
+    Visita la página de crear armonico con los perfiles de límites de armónicos, mostramos la vista "crear_armonico.html"
     """
-    return render(request, 'armonicos/crear_armonico.html')
+    perfiles_armonico = PerfilArmonico.objects.order_by('nombre')
+    return render(request, 'armonicos/crear_armonico.html', {'perfiles_armonico': perfiles_armonico})
 
 
 def crear_armonico_unico(request):
@@ -68,7 +81,10 @@ def crear_armonico_unico(request):
     # analizador_id = 2  # AEMC
     # analizador_id = 3  # METREL
 
+    # Porcentaje de muestras sobre el límite a partir del cual se reporta una columna. Sin perfil
+    # de armónicos también es el límite de todas las columnas.
     valor_porcentaje = 5
+    perfil_armonico_id = request.POST.get('perfil_armonico')
 
     return procesar_archivo_unico(
         request,
@@ -77,7 +93,8 @@ def crear_armonico_unico(request):
         analizador_id,
         valor_porcentaje,
         depuracion_armonico,
-        'vista_armonicos'
+        'vista_armonicos',
+        perfil_armonico_id=perfil_armonico_id
     )
 
 
@@ -95,7 +112,9 @@ def crear_armonico_lote(request):
     # analizador_id = 3  # METREL
 
     valor_porcentaje = 5
-    return procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_porcentaje, depuracion_armonico, 'vista_armonicos')
+    perfil_armonico_id = request.POST.get('perfil_armonico')
+    return procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_porcentaje, depuracion_armonico, 'vista_armonicos',
+                                  perfil_armonico_id=perfil_armonico_id)
 
 
 def eliminar_armonico(request, archivo_id):
@@ -105,37 +124,6 @@ def eliminar_armonico(request, archivo_id):
     return eliminar_archivo(request, archivo_id, 'vista_armonicos')
 
 
-def depuracion_armonico(nuevo_archivo, analizador, valor_porcentaje):
-    """
-    Depura un archivo armonico.
-
-    Parámetros:
-        nuevo_archivo: El archivo a depurar.
-        analizador: El analizador a utilizar.
-        valor_porcentaje: El valor del porcentaje a utilizar.
-
-    Retorna:
-        La información depurada del archivo.
-
-    """
-
-    # Obtener la ruta del archivo
-    ruta_archivo = nuevo_archivo.archivo.path
-
-    # Obtener el nombre del analizador
-    analizador = analizador.nombre
-
-    # Obtener la informacion del analizador
-    informacion = arm.tipo_analizador(
-        analizador, ruta_archivo, valor_porcentaje)
-
-    # Actualizar la información del archivo
-    nuevo_archivo.informacion = informacion
-
-    # Guardar los cambios en la base de datos
-    nuevo_archivo.save()
-
-
 # ---------- TENDENCIA ----------
 
 
@@ -143,33 +131,24 @@ def vista_tendencias(request):
     """
     Visita la página de tendencias, la catego´ria es 2 y mostramos en la vista "tendencias.html"
     """
-    archivos_formateados = obtener_archivos_por_categoria(2)
-    return render(request, 'tendencias/tendencias.html', {'archivos': archivos_formateados})
+    archivos_formateados, paginacion = obtener_archivos_por_categoria(
+        2, request.GET.get('despues'), request.GET.get('antes'))
+    trabajos_error = obtener_trabajos_error(2)
+    return render(request, 'tendencias/tendencias.html', {'archivos': archivos_formateados, 'paginacion': paginacion, 'trabajos_error': trabajos_error})
 
 
 def vista_tendencia_detalle(request, archivo_id):
     """
-    Visita la página de detalle de tendencias, obtenemos el archivo seleccionado y mostramos en la vista "tendencia_detalle.html"
+    Visita la página de detalle de tendencias, obtenemos el detalle del archivo seleccionado desde la caché y mostramos en la vista "tendencia_detalle.html"
     """
 
-    # Obtener el archivo evitando que el servidor colapse
-    archivo = get_object_or_404(Archivo, id=archivo_id)
+    # Obtener el detalle renderizado, solamente se vuelve a generar si cambió la información
+    detalle = obtener_detalle(archivo_id, TENDENCIA)
+    if detalle is None:
+        raise Http404('El archivo no existe.')
 
-    # Mostrar solamente el nombre del archivo, sin el "archivo/" al inicio
-    nombre_archivo = archivo.archivo.url.split('/')[-1]
-
-    # Obtener la informacion de archivo
-    archivo_info = archivo.informacion
-
-    # Formatear el nombre de la columna, eliminando los "_", capitalizando, y añadiendo sufijo o símbolo
-    archivo_info = {
-        columna.replace('_', ' ').capitalize(): f"{round(datos, 4)}" if isinstance(datos, (int, float)) else datos
-        for columna, datos in archivo_info.items()
-    }
-
-    print("\nInformación del archivo seleccionado:\n", archivo_info)
-
-    return render(request, 'tendencias/tendencia_detalle.html', {'nombre_archivo': nombre_archivo, 'archivo_info': archivo_info})
+    return render(request, 'tendencias/tendencia_detalle.html', {
+        'detalle': detalle, 'archivo_id': archivo_id, 'graficos': GRAFICOS[TENDENCIA]})
 
 
 def vista_crear_tendencia(request):
@@ -177,9 +156,9 @@ def vista_crear_tendencia(request):
     Visita la página de crear tendencia, mostramos la vista "crear_tendencia.html"
     """
 
-    # Obtenemos todos los tipos y analizadores
+    # Obtenemos todos los tipos y los analizadores desde el registro de perfiles
     tipos = Tipo.objects.all()
-    analizadores = Analizador.objects.all()
+    analizadores = listar_perfiles()
 
     # Pasar los datos a la plantilla
     context = {
@@ -201,10 +180,11 @@ def crear_tendencia_unico(request):
     if request.method == 'POST':
         tipo_id = request.POST.get('tipo')
         analizador_id = request.POST.get('analizador')
+        voltaje_nominal = obtener_voltaje_nominal(request)
         valor_porcentaje = None
 
         # Procesar el archivo
-        return procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_porcentaje, depuracion_tendencia, 'vista_tendencias')
+        return procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_porcentaje, depuracion_tendencia, 'vista_tendencias', voltaje_nominal)
 
     # Si la solicitud no es POST, redirigir a la vista de crear tendencia
     return render(request, 'tendencias/crear_tendencia.html')
@@ -221,10 +201,11 @@ def crear_tendencia_lote(request):
     if request.method == 'POST':
         tipo_id = request.POST.get('tipo')
         analizador_id = request.POST.get('analizador')
+        voltaje_nominal = obtener_voltaje_nominal(request)
         valor_porcentaje = None
 
         # Procesar el archivo
-        return procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_porcentaje, depuracion_tendencia, 'vista_tendencias')
+        return procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_porcentaje, depuracion_tendencia, 'vista_tendencias', voltaje_nominal)
 
     # Si la solicitud no es POST, redirigir a la vista de crear tendencia
     return render(request, 'tendencias/crear_tendencia.html')
@@ -237,61 +218,113 @@ def eliminar_tendencia(request, archivo_id):
     return eliminar_archivo(request, archivo_id, 'vista_tendencias')
 
 
-def depuracion_tendencia(nuevo_archivo, analizador, valor_porcetaje):
+# --- METODOS ---
+def obtener_archivos_por_categoria(categoria_id, despues=None, antes=None):
     """
-    Depura un archivo tendencia.
+    Obtiene y formatea una página de los archivos de una categoría específica. Las consultas
+    realizadas no dependen de la cantidad de archivos de la categoría.
 
     Parámetros:
-        nuevo_archivo: El archivo a depurar.
-        analizador: El analizador a utilizar.
+        categoria_id (int): El id de la categoría.
+        despues (str o None): Cursor de la página siguiente.
+        antes (str o None): Cursor de la página anterior.
 
     Retorna:
-        informacion: La información depurada del archivo.
+        tuple: Los archivos formateados y un diccionario con los cursores de paginación.
     """
 
-    # Obtener la ruta del archivo
-    ruta_archivo = nuevo_archivo.archivo.path
-
-    # Obtener el nombre del analizador
-    analizador = analizador.nombre
-
-    # Obtener la informacion del analizador
-    informacion = ten.tipo_analizador(analizador, ruta_archivo)
-
-    # Actualizar la información del archivo
-    nuevo_archivo.informacion = informacion
-
-    # Guardar los cambios en la base de datos
-    nuevo_archivo.save()
-
-
-# --- METODOS ---
-def obtener_archivos_por_categoria(categoria_id):
-    """
-    Obtiene y formatea los archivos de una categoría específica.
-    """
+    # Estado del último trabajo de depuración de cada archivo
+    estado_trabajo = Trabajo.objects.filter(
+        archivo=OuterRef('pk')).order_by('-creado_el').values('estado')[:1]
 
-    # Obtener categoria de la base de datos
-    categoria = Categoria.objects.get(id=categoria_id)
+    # Obtener los archivos de categoria "armonico" o "tendencia" con su tipo y analizador en la misma consulta
+    archivos = Archivo.objects.filter(categoria_id=categoria_id).select_related('tipo', 'analizador').only(
+        'id', 'archivo', 'subido_el', 'tipo__nombre', 'analizador__nombre').annotate(estado=Subquery(estado_trabajo))
 
-    # Obtener todos los archivos de categoria "armonico" o "tendencia" ordenado ascendentemente por la fecha de subida
-    archivos = Archivo.objects.filter(
-        categoria=categoria).order_by('subido_el')
+    # Obtener la página ordenada ascendentemente por la fecha de subida
+    archivos, siguiente, anterior = paginar(archivos, despues, antes)
 
     archivos_formateados = [
         {
             'id': archivo.id,
             'archivo': archivo.archivo.name.split('/')[-1],
-            'subido_el': format_datetime(localtime(archivo.subido_el), format='dd MMMM yyyy, hh:mm a', locale='es_ES'),
+            'subido_el': formatear_fecha(archivo.subido_el),
             'tipo': archivo.tipo.nombre,
             'analizador': archivo.analizador.nombre,
+            # Los archivos cargados de forma única no tienen trabajo y ya están depurados
+            'estado': archivo.estado or Trabajo.COMPLETADO,
         }
         for archivo in archivos
     ]
-    return archivos_formateados
+    return archivos_formateados, {'siguiente': siguiente, 'anterior': anterior}
+
+
+def obtener_trabajos_error(categoria_id, limite=10):
+    """
+    Obtiene los últimos trabajos de una categoría que terminaron con error.
+    """
+    return Trabajo.objects.filter(
+        categoria_id=categoria_id, estado=Trabajo.ERROR).order_by('-finalizado_el')[:limite]
+
+
+# Valor del formulario para detectar el analizador a partir del archivo
+ANALIZADOR_AUTOMATICO = 'auto'
+
+
+def obtener_analizador(analizador_id):
+    """
+    Obtiene el perfil de un analizador desde el registro, sin consultar la base de datos.
+    """
+    perfil = obtener_perfil(analizador_id)
+    if perfil is None:
+        raise Analizador.DoesNotExist('El analizador seleccionado no existe.')
+    return perfil
+
+
+def resolver_analizador(archivo, analizador_id, categoria_id):
+    """
+    Obtiene el perfil del analizador seleccionado. Si se seleccionó la detección automática,
+    el analizador se detecta a partir de las primeras filas del archivo.
+    """
+    if analizador_id != ANALIZADOR_AUTOMATICO:
+        return obtener_analizador(analizador_id)
+
+    formato = detectar_formato(archivo, categoria_id)
+    if formato is None:
+        raise ValueError(
+            f'No se pudo detectar el analizador del archivo {archivo.name}.')
+
+    perfil = obtener_perfil(nombre=formato.analizador)
+    if perfil is None:
+        raise Analizador.DoesNotExist(
+            f'El analizador {formato.analizador} no existe.')
+    return perfil
+
+
+def obtener_perfil_armonico(perfil_id):
+    """
+    Obtiene el perfil de límites de armónicos seleccionado, None si no se seleccionó ninguno.
+    """
+    if not perfil_id:
+        return None
+    try:
+        return PerfilArmonico.objects.get(id=int(perfil_id))
+    except (PerfilArmonico.DoesNotExist, ValueError):
+        raise ValueError('El perfil de armónicos seleccionado no existe.')
+
 
+def obtener_voltaje_nominal(request):
+    """
+    Obtiene el voltaje nominal del formulario, None si no se indicó o no es un número.
+    """
+    try:
+        return float(request.POST.get('voltaje_nominal', ''))
+    except ValueError:
+        return None
 
-def procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_porcetaje, tipo_depuracion, redireccion_vista):
+
+def procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_porcetaje, tipo_depuracion, redireccion_vista, voltaje_nominal=None,
+                           perfil_armonico_id=None):
 
     if request.method == 'POST':
         if 'archivo_unico' in request.FILES:
@@ -300,18 +333,16 @@ def procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_
             archivo = request.FILES['archivo_unico']
 
             try:
-                # Obtener la categoría, tipo y analizador desde la base de datos
+                # Obtener la categoría y tipo desde la base de datos, y el analizador desde el registro
                 categoria = Categoria.objects.get(id=categoria_id)
                 tipo = Tipo.objects.get(id=tipo_id)
-                analizador = Analizador.objects.get(id=analizador_id)
+                analizador = resolver_analizador(
+                    archivo, analizador_id, categoria_id)
+                perfil_armonico = obtener_perfil_armonico(perfil_armonico_id)
 
-                # Crear un nuevo objeto Archivo
-                nuevo_archivo = Archivo(
-                    archivo=archivo,
-                    categoria=categoria,
-                    tipo=tipo,
-                    analizador=analizador
-                )
+                # Crear un nuevo objeto Archivo con el hash de su contenido
+                nuevo_archivo = preparar_archivo(
+                    archivo, categoria, tipo, analizador, voltaje_nominal, perfil_armonico=perfil_armonico)
 
                 # Guardar el archivo en la base de datos
                 nuevo_archivo.save()
@@ -343,6 +374,10 @@ def procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_
                 # Si ocurre un error de base de datos antes de la depuración, no es necesario eliminar nada
                 messages.error(request, f'Error de base de datos: {e}')
 
+            except (ValueError, Analizador.DoesNotExist) as e:
+                # Si no se pudo obtener el analizador, el archivo todavía no se ha guardado
+                messages.error(request, str(e))
+
         else:
             # Mostrar un mensaje de error si no se seleccionó un archivo
             messages.error(
@@ -356,7 +391,8 @@ def procesar_archivo_unico(request, categoria_id, tipo_id, analizador_id, valor_
     return render(request, 'armonicos/crear_armonico.html' if categoria.id == 1 else 'tendencias/crear_tendencia.html')
 
 
-def procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_porcenaje, tipo_depuracion, redireccion_vista):
+def procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_porcenaje, tipo_depuracion, redireccion_vista, voltaje_nominal=None,
+                           perfil_armonico_id=None):
 
     if request.method == 'POST':
         if 'archivos_lote' in request.FILES:
@@ -364,51 +400,31 @@ def procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_
             # Obtener los archivos de la solicitud
             archivos = request.FILES.getlist('archivos_lote')
 
-            # Para cada archivo en la lista de archivos
-            for archivo in archivos:
+            try:
+                # Obtener la categoría, tipo, y analizador una sola vez para todo el lote
+                categoria = Categoria.objects.get(id=categoria_id)
+                tipo = Tipo.objects.get(id=tipo_id)
+                analizador = None
+                if analizador_id != ANALIZADOR_AUTOMATICO:
+                    analizador = obtener_analizador(analizador_id)
+                perfil_armonico = obtener_perfil_armonico(perfil_armonico_id)
 
-                try:
-                    # Obtener la categoría, tipo, y analizador desde la base de datos
-                    categoria = Categoria.objects.get(id=categoria_id)
-                    tipo = Tipo.objects.get(id=tipo_id)
-                    analizador = Analizador.objects.get(id=analizador_id)
-
-                    # Crear un nuevo archivo a partir del archivo actual
-                    nuevo_archivo = Archivo(
-                        archivo=archivo,
-                        categoria=categoria,
-                        tipo=tipo,
-                        analizador=analizador
-                    )
-
-                    # Guardar el archivo en la base de datos
-                    nuevo_archivo.save()
-
-                    try:
-
-                        # Procesar el archivo y mostrar un mensaje de éxito
-                        tipo_depuracion(
-                            nuevo_archivo, analizador, valor_porcenaje)
-
-                        # Mostrar un mensaje de éxito si el archivo se procesó correctamente
-                        messages.success(
-                            request, f'Archivo {archivo.name} procesado correctamente.')
-
-                    except (ValueError, EmptyDataError) as e:
-                        # Si ocurre un error al procesar el archivo, eliminar el archivo guardado
-                        eliminar_archivo_referencia(nuevo_archivo)
-                        messages.error(
-                            request, f'Ocurrió un error al procesar el archivo {archivo.name}: {e}')
-
-                    except Exception as e:
-                        # Manejar cualquier otra excepción y eliminar el archivo guardado
-                        eliminar_archivo_referencia(nuevo_archivo)
-                        messages.error(
-                            request, f'Error inesperado al procesar el archivo {archivo.name}: {e}')
-
-                except DatabaseError as e:
-                    # Si ocurre un error de base de datos antes de la depuración, no es necesario eliminar nada
-                    messages.error(request, f'Error de base de datos: {e}')
+            except DatabaseError as e:
+                messages.error(request, f'Error de base de datos: {e}')
+                return redirect(redireccion_vista)
+
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect(redireccion_vista)
+
+            # Para cada archivo en la lista de archivos, los zip se recorren miembro por miembro
+            for archivo in archivos:
+                if es_zip(archivo):
+                    encolar_zip(request, archivo, categoria, tipo, analizador_id,
+                                analizador, valor_porcenaje, voltaje_nominal, perfil_armonico)
+                else:
+                    encolar_archivo(request, archivo, archivo.name, categoria, tipo, analizador_id,
+                                    analizador, valor_porcenaje, voltaje_nominal, perfil_armonico)
 
             # Redirigir a la página de armonicos o tendencias
             return redirect(redireccion_vista)
@@ -424,6 +440,96 @@ def procesar_archivos_lote(request, categoria_id, tipo_id, analizador_id, valor_
     return render(request, 'armonicos/crear_armonico.html' if categoria.id == 1 else 'tendencias/crear_tendencia.html')
 
 
+def encolar_archivo(request, archivo, nombre, categoria, tipo, analizador_id, analizador, valor_porcentaje, voltaje_nominal=None,
+                    perfil_armonico=None):
+    """
+    Guarda un archivo del lote y encola su depuración, mostrando un mensaje de éxito o error.
+
+    Parámetros:
+        request (HttpRequest): La solicitud, para los mensajes.
+        archivo (UploadedFile): El archivo subido o el miembro de un zip.
+        nombre (str): El nombre que se muestra en los mensajes.
+        categoria (Categoria): La categoría del lote.
+        tipo (Tipo): El tipo del lote.
+        analizador_id (str): El analizador seleccionado o ANALIZADOR_AUTOMATICO.
+        analizador (PerfilAnalizador o None): El perfil del analizador, None con la detección automática.
+        valor_porcentaje (int o None): El valor del porcentaje a utilizar en la depuración.
+        voltaje_nominal (float o None): El voltaje nominal del punto de medición.
+        perfil_armonico (PerfilArmonico o None): Los límites por orden de los armónicos.
+
+    Retorna:
+        bool: True si el archivo se encoló.
+    """
+    try:
+        # Con la detección automática, cada archivo puede ser de un analizador distinto
+        if analizador_id == ANALIZADOR_AUTOMATICO:
+            analizador = resolver_analizador(
+                archivo, analizador_id, categoria.id)
+
+        # Crear un nuevo archivo a partir del archivo actual, con el hash de su contenido
+        nuevo_archivo = preparar_archivo(
+            archivo, categoria, tipo, analizador, voltaje_nominal, perfil_armonico=perfil_armonico)
+
+        # Guardar el archivo y encolar su depuración en la base de datos
+        with transaction.atomic():
+            nuevo_archivo.save()
+            encolar_trabajo(nuevo_archivo, valor_porcentaje)
+
+        # Mostrar un mensaje de éxito si el archivo se encoló correctamente
+        messages.success(
+            request, f'Archivo {nombre} encolado para su procesamiento.')
+        return True
+
+    except DatabaseError as e:
+        # Si ocurre un error de base de datos antes de la depuración, no es necesario eliminar nada
+        messages.error(request, f'Error de base de datos: {e}')
+
+    except (ValueError, Analizador.DoesNotExist) as e:
+        # Si no se pudo detectar el analizador, se continúa con el resto del lote
+        messages.error(request, str(e))
+
+    return False
+
+
+def encolar_zip(request, archivo_zip, categoria, tipo, analizador_id, analizador, valor_porcentaje, voltaje_nominal=None,
+                perfil_armonico=None):
+    """
+    Encola la depuración de cada libro de un archivo zip. Los miembros se leen uno por uno desde
+    el zip, y la depuración la realiza el procesador de trabajos con sus hilos o procesos.
+    """
+    encolados = 0
+    errores = 0
+    omitidos = 0
+
+    try:
+        for nombre, miembro, error in iterar_miembros(archivo_zip):
+            if error is not None:
+                errores += 1
+                messages.error(
+                    request, f'No se pudo descomprimir {archivo_zip.name}/{nombre}: {error}')
+                continue
+            if miembro is None:
+                omitidos += 1
+                continue
+
+            if encolar_archivo(request, miembro, f'{archivo_zip.name}/{nombre}', categoria, tipo,
+                               analizador_id, analizador, valor_porcentaje, voltaje_nominal, perfil_armonico):
+                encolados += 1
+            else:
+                errores += 1
+
+    except (zipfile.BadZipFile, EOFError) as e:
+        messages.error(
+            request, f'El archivo {archivo_zip.name} no es un zip válido: {e}')
+
+    except ValueError as e:
+        # El zip supera los límites de la configuración
+        messages.error(request, f'El archivo {archivo_zip.name} no se puede procesar: {e}')
+
+    messages.info(
+        request, f'{archivo_zip.name}: {encolados} encolados, {errores} con error, {omitidos} omitidos.')
+
+
 def eliminar_archivo(request, archivo_id, redireccion_vista):
     """
     Elimina un archivo y redirige a la vista de armonicos o tendencias.
@@ -445,19 +551,3 @@ def eliminar_archivo(request, archivo_id, redireccion_vista):
 
         # Redirigir a la página con el mensaje
         return redirect(redireccion_vista)
-
-
-def eliminar_archivo_referencia(nuevo_archivo):
-    # Obtener la ruta del archivo
-    ruta_archivo = nuevo_archivo.archivo.path
-
-    # Eliminar el archivo del servidor
-    nuevo_archivo.delete()
-
-    # Verificar si el archivo existe en el sistema de archivos
-    if os.path.exists(ruta_archivo):
-        # Eliminar el archivo del sistema de archivos
-        os.remove(ruta_archivo)
-
-        # Mostrar mensaje en el backend
-        print("\nArchivo eliminado correctamente.\n")
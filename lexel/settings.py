@@ -89,6 +89,22 @@ DATABASES = {
 }
 
 
+# Caché
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    # Caché local en memoria de cada proceso, guarda el detalle renderizado de los archivos
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lexel',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -136,3 +152,31 @@ MEDIA_URL = '/media/'
 
 # Ruta donde se almacenarán los archivos cargados
 MEDIA_ROOT = BASE_DIR / 'media/'
+
+# Carpeta de los archivos temporales de las cargas por partes. Debe estar en el mismo disco
+# que MEDIA_ROOT, así al finalizar la carga el archivo se mueve sin copiarlo
+CARGAS_ROOT = MEDIA_ROOT / 'cargas'
+
+# Tokens de los clientes de la API de cargas por partes, enviados en 'Authorization: Bearer <token>'.
+# Sin tokens la API de cargas rechaza todas las solicitudes
+TOKENS_CARGAS = []
+
+# Guardar una sola vez en el disco los archivos con el mismo contenido (SHA-256)
+DEDUPLICAR_ARCHIVOS = False
+
+# Límites de los zip de la carga en lote: cantidad de miembros y bytes descomprimidos de cada
+# miembro. Se comprueban antes y durante la descompresión, el tamaño declarado puede ser falso
+ZIP_MAX_MIEMBROS = 1000
+ZIP_MAX_BYTES_MIEMBRO = 200 * 1024 * 1024
+
+# Minutos en proceso tras los que 'procesar_trabajos --recuperar' vuelve a encolar un trabajo.
+# Debe ser mayor que la depuración más lenta, para no repetir trabajos que siguen en curso
+RECUPERAR_TRABAJOS_MINUTOS = 60
+
+# Ventanas de tiempo de los resultados por período como {nombre: (ancho, paso)} en horas.
+# Si el paso es menor que el ancho la ventana es móvil
+VENTANAS_DEPURACION = {
+    'diaria': (24, 24),
+    'semanal': (168, 168),
+    'movil': (168, 24),
+}
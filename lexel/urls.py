@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from calidad_producto.api import metricas
 
 
 urlpatterns = [
@@ -23,6 +24,8 @@ urlpatterns = [
     path('', include('principal.urls')),
     path('calidad-producto/', include('calidad_producto.urls')),
     path('calidad-servicio-tecnico/', include('calidad_servicio_tecnico.urls')),
+    # Métricas de la depuración para Prometheus
+    path('metrics', metricas, name='metricas'),
 ]
 
 # Añadir la ruta de los archivos multimedia